@@ -1,12 +1,29 @@
 import requests
+import urllib3
 import json
+import gzip
 import sys
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from tools.results import Result
+from tools.precheck import check_input_data, print_report
+from tools.input2json import encode_json
 
 url_1well = "https://home-test.make234.com/api/v1/get_1well"
 url_1site = "https://home-test.make234.com/api/v1/get_1site"
 url_ksites = "https://home-test.make234.com/api/v1/get_ksites"
 
+# response encodings that requests can decode, e.g. "gzip,deflate"
+ACCEPT_ENCODING = urllib3.util.request.ACCEPT_ENCODING
+# status codes that may come from a compressed request body the server can't read:
+# 415 always means it, the others only if the error message says so
+_compression_unsupported = 415
+_compression_maybe_rejected = (400, 422, 500)
+# urls that answered 415 to compressed requests
+_uncompressed_urls = set()
+
 
 
 # %%
@@ -17,11 +34,16 @@ def get_1well(input_data, # formatted json data
             index=None,
             getContour=0,
 
-            filepath='output.json', # filepath to save response content
+            filepath='output.json', # filepath to save response content, None: don't save
             show=0, # show full response
+            result=0, # 1: return a typed Result (NumPy arrays), 0: return the dict
             
             timeout=300,
             url=url_1well, # API server url
+            cache=None, # ResponseCache, reuse saved responses of identical requests
+            compress=None, # None, "gzip" or "zstd": compress the request body
+            precheck=0, # 1: check the wells locally first, don't send if any error
+            store=None, # ResultStore (tools.result_store), also add the result to it
             ):
      return APIhandler(url, # API server url
                 input_data, # formatted json data
@@ -30,7 +52,12 @@ def get_1well(input_data, # formatted json data
 
                 filepath=filepath, # filepath to save response content
                 show=show, # show full response
+                result=result,
                 timeout=timeout,
+                cache=cache,
+                compress=compress,
+                precheck=precheck,
+                store=store,
                 )
 
 # %%
@@ -39,11 +66,16 @@ def get_1site(input_data, # formatted json data
               indices=None, # indices of wells to be extracted from response
               getContours=0,
               
-            filepath='output.json', # filepath to save response content
+            filepath='output.json', # filepath to save response content, None: don't save
             show=0, # show full response
+            result=0, # 1: return a typed Result (NumPy arrays), 0: return the dict
 
             timeout=300,
             url=url_1site, # API server url
+            cache=None, # ResponseCache, reuse saved responses of identical requests
+            compress=None, # None, "gzip" or "zstd": compress the request body
+            precheck=0, # 1: check the wells locally first, don't send if any error
+            store=None, # ResultStore (tools.result_store), also add the result to it
             ):
     
     return APIhandler(url, # API server url
@@ -53,7 +85,12 @@ def get_1site(input_data, # formatted json data
 
                 filepath=filepath, # filepath to save response content
                 show=show, # show full response
+                result=result,
                 timeout=timeout,
+                cache=cache,
+                compress=compress,
+                precheck=precheck,
+                store=store,
                 )
 # %%
 # ***********************************************************************
@@ -61,11 +98,16 @@ def get_ksites(input_data, # formatted json data
               indices=None, # indices of wells to be extracted from response
               getContours=0,
 
-            filepath='output.json', # filepath to save response content
+            filepath='output.json', # filepath to save response content, None: don't save
             show=0, # show full response
+            result=0, # 1: return a typed Result (NumPy arrays), 0: return the dict
 
             timeout=300,
             url=url_ksites, # API server url
+            cache=None, # ResponseCache, reuse saved responses of identical requests
+            compress=None, # None, "gzip" or "zstd": compress the request body
+            precheck=0, # 1: check the wells locally first, don't send if any error
+            store=None, # ResultStore (tools.result_store), also add the result to it
             ):
     
     return APIhandler(url, # API server url
@@ -75,7 +117,12 @@ def get_ksites(input_data, # formatted json data
 
                 filepath=filepath, # filepath to save response content
                 show=show, # show full response
+                result=result,
                 timeout=timeout,
+                cache=cache,
+                compress=compress,
+                precheck=precheck,
+                store=store,
                 )
 
 
@@ -91,95 +138,320 @@ def APIhandler(url, # API server url
             indices=None, # indices of wells for 1site & ksites
             getContours=0, # whether to get the cost contours of each well
 
-            filepath='output.json', # filepath to save response content
+            filepath='output.json', # filepath to save response content, None: don't save
             show=0, # show full response
+            result=0, # 1: return a typed Result (NumPy arrays), 0: return the dict
 
             timeout=300,
+            cache=None, # ResponseCache, reuse saved responses of identical requests
+            compress=None, # None, "gzip" or "zstd": compress the request body
+            precheck=0, # 1: check the wells locally first, don't send if any error
+            store=None, # ResultStore (tools.result_store), also add the result to it
             ):
-    # Set request headers
-    headers = {
-        'Content-Type': 'application/json'
-    }
-
     print(f"requesting from {url}")
     try:
-        # if the last word of url is "get_1well"
-        if url.split("/")[-1]=="get_1well":
-            if index is None: # automatically computes the 1st well (index=0)
-                input_data["other"]={"getContour":getContour}
-                pass 
-            elif isinstance(index, int):
-                if (index<0) or index>=input_data['FIELDOPT INPUT BLOCK']['n']['VALUE']:
-                    print(f"index out of range [0, {input_data['FIELDOPT INPUT BLOCK']['n']['VALUE']}]")
-                    return None
-                # add parameters for computing the specified well
-                input_data["other"]={"index":index, "getContour":getContour}
-            else:
-                print("index must be an integer or unspecified(None)")
-                return None
-            response = requests.post(url, json=input_data, headers=headers, timeout=timeout)
-
-        elif url.split("/")[-1]=="get_1site":
-            if indices is None: # automatically computes all well as 1-site problem
-                input_data["other"]={"getContours":getContours}
-                pass 
-            elif isinstance(indices, list):
-                for ind in indices:
-                    if not isinstance(ind, int):
-                        print(f"index must be an integer")
-                        return None
-                    if (ind<0) or ind>=input_data['FIELDOPT INPUT BLOCK']['n']['VALUE']:
-                        print(f"index out of range [0, {input_data['FIELDOPT INPUT BLOCK']['n']['VALUE']}]")
-                        return None
-                # add parameters for computing the specified wells
-                input_data["other"]={"indices":indices, "getContours":getContours}
-            else:
-                print("indices must be a list of integers or unspecified(None)")
-                return None
-            response = requests.post(url, json=input_data, headers=headers, timeout=timeout)
-
-        elif url.split("/")[-1]=="get_ksites":
-            if indices is None: # automatically computes all well as k-sites problem
-                input_data["other"]={"getContours":getContours}
-                pass 
-            elif isinstance(indices, list):
-                for ind in indices:
-                    if not isinstance(ind, int):
-                        print(f"index must be an integer")
-                        return None
-                    if (ind<0) or ind>=input_data['FIELDOPT INPUT BLOCK']['n']['VALUE']:
-                        print(f"index out of range [0, {input_data['FIELDOPT INPUT BLOCK']['n']['VALUE']}]")
-                        return None
-                # add parameters for computing the specified wells
-                input_data["other"]={"indices":indices, "getContours":getContours}
-            else:
-                print("indices must be a list of integers or unspecified(None)")
-                return None
-            response = requests.post(url, json=input_data, headers=headers, timeout=timeout)
-        
-        # Check response status
-        response.raise_for_status()
-        print("Status code:", response.status_code)
-
-        # format response content to JSON format
-        output=json.dumps(response.json(), indent=2)
+        set_other(url, input_data,
+                  index=index, getContour=getContour,
+                  indices=indices, getContours=getContours)
+    except ValueError as e:
+        print(e)
+        return None
+
+    if precheck==1:
+        report = check_input_data(input_data)
+        print_report(report)
+        if any(issue["level"]=="error" for issue in report["issues"]):
+            return None
+
+    try:
+        content, response = fetch(url, input_data, timeout=timeout, cache=cache,
+                                  compress=compress)
+        if response is None:
+            print("Response loaded from cache")
+        else:
+            print("Status code:", response.status_code)
+            print("Transfer:", format_report(response.report))
 
         # Print response results
         if show==1:
             print("Response content:")
-            print(output)
+            print(json.dumps(content, indent=2))
 
         # Save response content to JSON file
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(response.json(), f, indent=2)
-        print(f"Response content has been saved to \"{filepath}\"")
+        if filepath is not None:
+            with open(filepath, 'w', encoding='utf-8') as f:
+                json.dump(content, f, indent=2)
+            print(f"Response content has been saved to \"{filepath}\"")
+
+        # Add response content to the binary result store
+        if store is not None:
+            tags = input_data['FIELDOPT INPUT BLOCK'].get('tag', {}).get('VALUE')
+            wells = indices if index is None else [index] # tags of the returned wells
+            if tags is not None and wells is not None:
+                tags = [tags[i] for i in wells]
+            try:
+                run_id = store.add(content, endpoint=url.split("/")[-1].replace("get_", ""), tags=tags)
+                print(f"Response content has been added to \"{store.path}\" as run \"{run_id}\"")
+            except ValueError as e: # e.g. a tag longer than 32 bytes, the content is still returned
+                print(f"Response content not added to \"{store.path}\":", e)
 
         # return response content
-        return json.loads(output)
+        if result==1:
+            return Result.from_dict(content)
+        return content
     except requests.exceptions.Timeout:
         print("Request timeout (exceeded 5 minutes)")
     except requests.exceptions.RequestException as e:
         print("Request error:", e)
+    except ValueError as e: # not valid JSON, see fetch
+        print(e)
+
+
+# %%
+# *********************************************************************
+def set_other(url, # API server url
+            input_data, # formatted json data
+            index=None, # index of well for 1well
+            getContour=0, # whether to get the cost contour of the well
+
+            indices=None, # indices of wells for 1site & ksites
+            getContours=0, # whether to get the cost contours of each well
+            ):
+    """
+    Check the well index(indices) and add the "other" block to input_data.
+    Raises ValueError with the same messages APIhandler prints.
+    """
+    def n(): # number of wells, only read when an index needs checking
+        return input_data['FIELDOPT INPUT BLOCK']['n']['VALUE']
+
+    # if the last word of url is "get_1well"
+    if url.split("/")[-1]=="get_1well":
+        if index is None: # automatically computes the 1st well (index=0)
+            input_data["other"]={"getContour":getContour}
+        elif isinstance(index, int):
+            if (index<0) or index>=n():
+                raise ValueError(f"index out of range [0, {n()}]")
+            # add parameters for computing the specified well
+            input_data["other"]={"index":index, "getContour":getContour}
+        else:
+            raise ValueError("index must be an integer or unspecified(None)")
+
+    elif url.split("/")[-1] in ("get_1site", "get_ksites"):
+        if indices is None: # automatically computes all well as 1-site/k-sites problem
+            input_data["other"]={"getContours":getContours}
+        elif isinstance(indices, list):
+            for ind in indices:
+                if not isinstance(ind, int):
+                    raise ValueError("index must be an integer")
+                if (ind<0) or ind>=n():
+                    raise ValueError(f"index out of range [0, {n()}]")
+            # add parameters for computing the specified wells
+            input_data["other"]={"indices":indices, "getContours":getContours}
+        else:
+            raise ValueError("indices must be a list of integers or unspecified(None)")
+
+    return input_data
+
+
+# %%
+# *********************************************************************
+def post_request(url, # API server url
+                input_data, # formatted json data, with the "other" block
+                timeout=300,
+                compress=None, # None, "gzip" or "zstd": compress the request body
+                ):
+    """
+    Send one request and check its status. Errors are raised, not printed.
+
+    The response is always requested with Accept-Encoding (decoded by requests).
+    If compress is set but the server rejects the compressed body (see
+    compression_rejected), the request is sent again uncompressed. After a 415,
+    the url is not compressed again.
+
+    The byte counts and timing are attached as response.report (dict):
+        sent, sent_raw: request body size on the wire / uncompressed (bytes)
+        received, received_raw: response body size on the wire / decoded (bytes)
+        elapsed: total time of the call (s)
+        compress: encoding actually used for the request body
+    """
+    tic = time.time()
+    body = encode_json(input_data)
+
+    # Set request headers
+    headers = {
+        'Content-Type': 'application/json',
+        'Accept-Encoding': ACCEPT_ENCODING,
+    }
+    if compress is not None and url in _uncompressed_urls:
+        compress = None
+
+    if compress is not None:
+        data = compress_body(body, compress)
+        response = requests.post(url, data=data,
+                                 headers={**headers, 'Content-Encoding': compress},
+                                 timeout=timeout)
+        if compression_rejected(response, compress):
+            # the server can't read the compressed body, fall back
+            print(f"{url} rejected {compress} request (status {response.status_code}), "
+                  "sending uncompressed")
+            if response.status_code == _compression_unsupported:
+                _uncompressed_urls.add(url)
+            compress = None
+    if compress is None:
+        data = body
+        response = requests.post(url, data=data, headers=headers, timeout=timeout)
+
+    # Check response status
+    response.raise_for_status()
+
+    received_raw = len(response.content)
+    response.report = {
+        "sent": len(data),
+        "sent_raw": len(body),
+        "received": int(response.headers.get("Content-Length", received_raw)),
+        "received_raw": received_raw,
+        "elapsed": time.time()-tic,
+        "compress": compress,
+    }
+    return response
+
+
+def compression_rejected(response, compress):
+    """
+    Whether the server refused the request because of its compressed body: status 415,
+    or 400/422/500 with an error message about the encoding. Any other error is a
+    genuine one, and the request isn't sent again.
+    """
+    if response.status_code == _compression_unsupported:
+        return True
+    if response.status_code not in _compression_maybe_rejected:
+        return False
+    text = response.text.lower()
+    return ("encoding" in text or compress in text) and \
+        any(word in text for word in ("unsupported", "not supported", "cannot decode", "can't decode"))
+
+
+def compress_body(body, compress):
+    """
+    Compress the request body (bytes) with "gzip" or "zstd".
+    zstd needs the optional `zstandard` package.
+    """
+    if compress == "gzip":
+        return gzip.compress(body, compresslevel=6)
+    if compress == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError("compress='zstd' requires the zstandard package "
+                              "(pip install zstandard), or use compress='gzip'")
+        return zstandard.ZstdCompressor(level=3).compress(body)
+    raise ValueError(f"compress must be None, 'gzip' or 'zstd', got {compress!r}")
+
+
+def format_report(report):
+    """
+    One-line summary of response.report.
+    """
+    def kb(b):
+        return f"{b/1024:.1f} KB"
+    return (f"sent {kb(report['sent'])} (raw {kb(report['sent_raw'])}, "
+            f"{report['compress'] or 'uncompressed'}), "
+            f"received {kb(report['received'])} (raw {kb(report['received_raw'])}), "
+            f"{report['elapsed']:.2f} s")
+
+
+# %%
+# *********************************************************************
+def fetch(url, # API server url
+        input_data, # formatted json data, with the "other" block
+        timeout=300,
+        cache=None, # ResponseCache or None
+        compress=None, # None, "gzip" or "zstd": compress the request body
+        ):
+    """
+    Get the response content (dict) from the cache, or from the server.
+    Successful server responses are saved to the cache.
+
+    Raises ValueError if the response is not valid JSON (the raw text is in the message).
+
+    return:
+        content, response (None if loaded from the cache)
+    """
+    if cache is not None:
+        content = cache.get(url, input_data)
+        if content is not None:
+            return content, None
+
+    response = post_request(url, input_data, timeout=timeout, compress=compress)
+    try:
+        content = response.json()
     except json.JSONDecodeError:
-        print("Response is not valid JSON format")
-        print("Raw response:", response.text)
\ No newline at end of file
+        raise ValueError(f"Response is not valid JSON format. Raw response: {response.text}")
+    if cache is not None and content.get("status")=="success":
+        cache.put(url, input_data, content)
+    return content, response
+
+
+# %%
+# =======================================================================
+# =======================================================================
+# =======================================================================
+def get_batch(input_list, # list of formatted json data, e.g. from input2json
+            url=url_1well, # API server url, decides the problem type
+            index=None, # index of well for 1well, same for all items
+            getContour=0,
+            indices=None, # indices of wells for 1site & ksites, same for all items
+            getContours=0,
+
+            max_workers=4, # maximum number of requests running at the same time
+            timeout=300,
+            cache=None, # ResponseCache, shared by all items
+            result=0, # 1: output is a typed Result (NumPy arrays), 0: the dict
+            compress=None, # None, "gzip" or "zstd": compress the request body
+            precheck=0, # 1: check the wells locally first, don't send if any error
+            ):
+    """
+    Run a batch of requests to the same API with bounded concurrency.
+
+    Each item is sent as its own request through a thread pool of size
+    max_workers. Nothing is saved to disk and nothing is printed per item.
+
+    return:
+        list (same order as input_list) of dict:
+            output: response content (dict or Result), None if failed
+            error: error message (str), None if succeeded
+            elapsed: wall-clock time of the item (s)
+            report: byte counts and timing of the request (see post_request),
+                    None if failed or loaded from the cache
+    """
+    def run_one(input_data):
+        tic = time.time()
+        # shallow copy, so the "other" block of one item can't leak into another
+        input_data = dict(input_data)
+        try:
+            set_other(url, input_data,
+                      index=index, getContour=getContour,
+                      indices=indices, getContours=getContours)
+            if precheck==1:
+                errors = [issue for issue in check_input_data(input_data)["issues"]
+                          if issue["level"]=="error"]
+                if errors:
+                    raise ValueError(f"pre-check failed: {errors}")
+            content, response = fetch(url, input_data, timeout=timeout, cache=cache,
+                                      compress=compress)
+            if result==1:
+                content = Result.from_dict(content)
+            return {"output": content, "error": None,
+                    "elapsed": time.time()-tic,
+                    "report": None if response is None else response.report}
+        except requests.exceptions.Timeout:
+            error = f"Request timeout (exceeded {timeout} seconds)"
+        except Exception as e:
+            # any error (bad input, request, invalid JSON) is kept for this item only
+            error = f"{type(e).__name__}: {e}"
+        return {"output": None, "error": error, "elapsed": time.time()-tic,
+                "report": None}
+
+    with ThreadPoolExecutor(max_workers=max(1, int(max_workers))) as executor:
+        # executor.map keeps the input order
+        return list(executor.map(run_one, input_list))
@@ -0,0 +1,46 @@
+"""
+benchmark of API.get_batch against the local stub server.
+
+Each request takes `delay` seconds on the stub server. With max_workers
+requests in flight, the wall-clock time should be about
+    ceil(n_items / max_workers) * delay
+i.e., near-linear speedup until the concurrency cap (or n_items) is reached.
+
+Run from the repository root:
+    python benchmarks/bench_batch.py
+"""
+import json
+import os
+import sys
+import time
+
+rootpath = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(rootpath)
+
+from API import get_batch
+from tools.stub_server import StubServer
+
+
+def main(n_items=16, delay=0.5, workers_list=(1, 2, 4, 8, 16)):
+    with open(os.path.join(rootpath, "Demos/get_1well/ex2/input_free.json")) as f:
+        input_data = json.load(f)
+    input_list = [input_data]*n_items
+
+    with StubServer(delay=delay) as server:
+        url = server.url("get_1well")
+        print(f"{n_items} requests, {delay} s each on the stub server")
+        print(f"{'max_workers':>12} {'wall time (s)':>14} {'speedup':>8} {'ideal':>6}")
+        t_serial = None
+        for max_workers in workers_list:
+            tic = time.time()
+            results = get_batch(input_list, url=url, max_workers=max_workers)
+            toc = time.time() - tic
+            assert all(r["error"] is None for r in results)
+            if t_serial is None:
+                t_serial = toc
+            ideal = n_items / -(-n_items // max_workers) # n / ceil(n/w)
+            print(f"{max_workers:>12} {toc:>14.2f} {t_serial/toc:>8.2f} {ideal:>6.1f}")
+
+
+if __name__ == "__main__":
+    main()
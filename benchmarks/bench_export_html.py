@@ -0,0 +1,75 @@
+"""
+size of the exported HTML figures, write_html vs. tools.export_html.
+
+The Demo figures are rebuilt from the saved outputs, as in the notebooks:
+    1site_ex1, 1site_ex2: trajectories (PlotSurvey) + site cost contour (PlotContour)
+    1well_ex2: trajectory + target direction (PlotArrow) + 15 offset wells (PlotSurvey)
+before: the figure JSON as write_html writes it (float64 UTM coordinates)
+after: the figure JSON of compact_figure (local origin, float32 quantized to 0.01,
+       real x, y of the hover in customdata)
+Only the figure JSON is compared: plotly.js (~4.8 MB embedded, or from the CDN)
+doesn't depend on the figure.
+"parse" is the time to parse the figure JSON (a proxy of the page's data load time).
+
+Run from the repository root:
+    python benchmarks/bench_export_html.py
+"""
+import json
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+rootpath = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(rootpath)
+
+from tools.PlotSurvey_plotly import PlotSurvey
+from tools.PlotContour_plotly import PlotContour
+from tools.PlotArrow_plotly import PlotArrow
+from tools.export_html import export_html
+
+
+def load(path):
+    with open(os.path.join(rootpath, path)) as f:
+        return json.load(f)
+
+
+def figure_1site(example):
+    data = load(f"Demos/get_1site/{example}/output.json")["data"]
+    fig = None
+    for i, wellbore in enumerate(data["Trajectories"]):
+        fig = PlotSurvey(wellbore, fig=fig, style=['k-', 'r-', 'g-', 'b-'][i % 4],
+                         name=f'Well #{i+1}', show=0)
+    contour = data["CostASite"]
+    return PlotContour(X=np.array(contour['X'], dtype=float), Y=np.array(contour['Y'], dtype=float),
+                       Contour_Val=np.array(contour['cost'], dtype=float), fig=fig,
+                       name='cost contour site', azim=-65, elev=40, show=0)
+
+
+def figure_1well_ex2():
+    data = load("Demos/get_1well/ex2/output_anticollision.json")["data"]
+    block = load("Demos/get_1well/ex2/input_anticollision.json")['FIELDOPT INPUT BLOCK']
+    offsets = load("Demos/get_1well/ex2/survey_data.json")
+    wellbore = data["Trajectories"][0]
+    fig = PlotSurvey(wellbore, style='r-', name='New well', show=0)
+    target = [wellbore['X'][-1], wellbore['Y'][-1], wellbore['Z'][-1]]
+    vector = np.array(block['VTM']['VALUE'][0], dtype=float)
+    fig = PlotArrow(target, vector/np.linalg.norm(vector)*300, style='r-', fig=fig)
+    for tag, survey in zip(offsets["tags"], offsets["SURVEY"]):
+        fig = PlotSurvey(survey, fig=fig, name=f'Offset Well {tag}', show=0)
+    return fig
+
+
+def main():
+    figures = {"1site_ex1": figure_1site("ex1"), "1site_ex2": figure_1site("ex2"),
+               "1well_ex2": figure_1well_ex2()}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, fig in figures.items():
+            export_html(fig, os.path.join(tmp, f"figure_{name}.html"),
+                        full_html=True, div_id="plotly-div", config={"responsive": True})
+            print()
+
+
+if __name__ == "__main__":
+    main()
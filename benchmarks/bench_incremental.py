@@ -0,0 +1,120 @@
+"""
+incremental re-planning (tools.incremental) vs. a full recompute, after moving one target.
+
+The field is Demos/get_1site/ex1 (4 wells, XRange/YRange fixed to the grid of its
+output); the target of well #2 is moved by (dx, dy). Both results are compared on
+    cost: sum of the trajectory COST (the field cost the incremental result gives up)
+    site: the drill site (start of the trajectories)
+    requests, time
+and the planner's site gap estimate (report["site_gap"]).
+
+stub (default): a local 1-site server with straight-line costs (L + 1830) on a
+    100 m grid, whose site is the off-grid optimum (geometric median of the targets),
+    as the real server's site is off the grid nodes. It takes per_well seconds per
+    well of the input (the server plans every well it gets), so the times compare
+    the wells sent: 2 x 1 incremental, 4 full
+--server: the real server in API.py (url_1site), the actual cost of the approximation
+
+Run from the repository root:
+    python benchmarks/bench_incremental.py [--server] [dx dy]
+"""
+import copy
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+per_well = 0.05 # stub time per well of the input (s)
+
+rootpath = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(rootpath)
+
+from API import get_1site
+from tools.incremental import IncrementalPlanner
+from tools.stub_server import StubServer
+
+
+def stub_response(endpoint, input_data):
+    block = input_data['FIELDOPT INPUT BLOCK']
+    other = input_data.get("other", {})
+    PT = np.array(block['PTM']['VALUE'], dtype=np.float64)
+    PK = block['PKM']['VALUE']
+    time.sleep(per_well*len(PT))
+    x = np.arange(block['XRange']['VALUE'][0], block['XRange']['VALUE'][1] + 1, 100.0)
+    y = np.arange(block['YRange']['VALUE'][0], block['YRange']['VALUE'][1] + 1, 100.0)
+    X, Y = np.meshgrid(x, y)
+    wells = np.array([np.hypot(X - p[0], Y - p[1]) + 1830 for p in PT])
+
+    # geometric median (Weiszfeld), unless the KOP x, y are given
+    site = PT[:, :2].mean(axis=0)
+    for _ in range(200):
+        d = np.maximum(np.hypot(*(PT[:, :2] - site).T), 1e-9)
+        site = (PT[:, :2]/d[:, None]).sum(axis=0)/(1/d).sum()
+    indices = other.get("indices") or list(range(len(PT)))
+    trajectories = []
+    for w in indices:
+        start = np.array(PK[w][:2], dtype=np.float64) if PK[w][0] is not None else site
+        cost = float(np.hypot(*(PT[w, :2] - start))) + 1830
+        trajectories.append({"X": [start[0], PT[w, 0]], "Y": [start[1], PT[w, 1]], "Z": [0.0, PT[w, 2]],
+                             "MD": [0.0, cost], "COST": cost})
+    get = other.get("getContours", 0)
+    return {"status": "success",
+            "data": {"Trajectories": trajectories,
+                     "CostASite": {"X": X.ravel().tolist(), "Y": Y.ravel().tolist(),
+                                   "cost": wells.sum(axis=0).ravel().tolist()},
+                     "CostKSites": None,
+                     "CostNWells": {"X": X.ravel().tolist(), "Y": Y.ravel().tolist(),
+                                    "cost": wells[indices].reshape(len(indices), -1).tolist() if get else []}},
+            "message": "", "error_details": None}
+
+
+def summary(output):
+    trajectories = output["data"]["Trajectories"]
+    cost = sum(t["COST"] for t in trajectories)
+    return cost, (trajectories[0]["X"][0], trajectories[0]["Y"][0])
+
+
+def main(server=False, dx=150.0, dy=-100.0):
+    with open(os.path.join(rootpath, "Demos/get_1site/ex1/input.json")) as f:
+        input_data = json.load(f)
+    # the grid of the Demo output, fixed: a grid that follows the targets forces a full recompute
+    input_data['FIELDOPT INPUT BLOCK']['XRange']['VALUE'] = [514000.0, 519900.0]
+    input_data['FIELDOPT INPUT BLOCK']['YRange']['VALUE'] = [6781000.0, 6785900.0]
+    moved = copy.deepcopy(input_data)
+    PT = moved['FIELDOPT INPUT BLOCK']['PTM']['VALUE'][1]
+    moved['FIELDOPT INPUT BLOCK']['PTM']['VALUE'][1] = [PT[0] + dx, PT[1] + dy, PT[2]]
+
+    def run(url):
+        planner = IncrementalPlanner(url=url, max_gap=np.inf) # always merge, to measure it
+        planner.plan(input_data)
+        tic = time.time()
+        incremental = planner.plan(moved)
+        t_incremental = time.time() - tic
+        tic = time.time()
+        full = get_1site(copy.deepcopy(moved), url=url, filepath=None)
+        t_full = time.time() - tic
+        return planner.report, incremental, t_incremental, full, t_full
+
+    if server:
+        from API import url_1site
+        report, incremental, t_incremental, full, t_full = run(url_1site)
+    else:
+        with StubServer(delay=0.0, response=stub_response) as stub:
+            report, incremental, t_incremental, full, t_full = run(stub.url("get_1site"))
+
+    print(f"\nwell #2 target moved by ({dx:g}, {dy:g}) m, {'server' if server else 'stub'}")
+    print(f"{'':>12} {'cost':>10} {'site x':>12} {'site y':>12} {'requests':>9} {'time (s)':>9}")
+    for name, output, requests, t in (("incremental", incremental, report["requests"], t_incremental),
+                                      ("full", full, 1, t_full)):
+        cost, site = summary(output)
+        print(f"{name:>12} {cost:>10.2f} {site[0]:>12.2f} {site[1]:>12.2f} {requests:>9} {t:>9.2f}")
+    gap = summary(incremental)[0] - summary(full)[0]
+    print(f"cost gap {gap:.2f} ({gap/summary(full)[0]:.3%}), "
+          f"site gap estimate {report['site_gap']:.3%}, mode {report['mode']}")
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if a != "--server"]
+    main("--server" in sys.argv, *[float(a) for a in args[:2]])
@@ -0,0 +1,98 @@
+"""
+micro-benchmark of input2json encoding on the Demos/get_1well/ex2 anticollision inputs.
+
+Both sides build the full input2json dict (every FIELDOPT INPUT BLOCK key) from the
+same arguments and differ only in the encoding:
+old: json.dumps(cls=NumpyEncoder) + json.loads, as input2json did
+new: to_jsonable (vectorized NaN -> null) + one encode_json, with the json and
+     orjson backends
+
+The offset wells [2,3,4,5,6] are the ones used in 1well_ex2.ipynb,
+"all" uses the 15 wells in survey_data.json.
+
+Run from the repository root:
+    python benchmarks/bench_input2json.py
+"""
+import contextlib
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+rootpath = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(rootpath)
+
+import tools.input2json
+from tools.input2json import NumpyEncoder, input2json, orjson
+
+
+def build_inputs(wells):
+    with open(os.path.join(rootpath, "Demos/get_1well/ex2/survey_data.json")) as f:
+        surveys = json.load(f)["SURVEY"]
+    Nodes_offset_list = [np.array([surveys[w]['X'], surveys[w]['Y'],
+                                   surveys[w]['Z'], surveys[w]['MD']], dtype=np.float64).T
+                         for w in wells]
+    anticol_con = {
+        "Nodes_offset_list": Nodes_offset_list,
+        "safeDist_offset_f_list": ["2.5+(md/300)**2"]*len(wells),
+        "safeDist_new_f_list": ["2.5+(md/500)**2"]*len(wells),
+        "opt_factor_list": [2]*len(wells),
+        "SF_list": [1]*len(wells),
+    }
+    DLSM = np.array([[2.0, 2.5, 3.0]])
+    return dict(n=1,
+                PTM=np.array([[-503.27, -7075.19, -3150.74]]),
+                VTM=np.array([[8.17, -32.92, -0.11]]),
+                PKM=np.array([[-1336.47, -4518.5, -386.6]]),
+                VKM=np.array([[0.0, 0.0, -1.0]]),
+                DLSM=DLSM, rM=30*180/DLSM/np.pi,
+                anticol_con=anticol_con,
+                filepath=None)
+
+
+@contextlib.contextmanager
+def old_encoder():
+    # input2json with its encoding steps swapped for the old ones
+    module = tools.input2json
+    saved = module.to_jsonable, module.encode_json
+    module.to_jsonable = lambda obj: obj
+    module.encode_json = lambda obj, backend: json.dumps(obj, cls=NumpyEncoder)
+    try:
+        yield
+    finally:
+        module.to_jsonable, module.encode_json = saved
+
+
+def old_encode(kwargs):
+    with old_encoder():
+        _, out_json = input2json(**kwargs, return_bytes=1)
+    return json.loads(out_json), out_json
+
+
+def timeit(func, repeat=20):
+    func() # warm up
+    tic = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - tic)/repeat
+
+
+def main():
+    backends = ["json"] + (["orjson"] if orjson is not None else [])
+    print(f"{'wells':<6} {'nodes':>7} {'old (ms)':>9} " +
+          " ".join(f"{'new ' + b + ' (ms)':>16}" for b in backends))
+    for label, wells in (("ex2", [2, 3, 4, 5, 6]), ("all", list(range(15)))):
+        kwargs = build_inputs(wells)
+        nodes = sum(a.shape[0] for a in kwargs["anticol_con"]["Nodes_offset_list"])
+        old, new = old_encode(kwargs)[0], input2json(**kwargs, backend="json")
+        assert old == new, "old and new encodings differ"
+        t_old = timeit(lambda: old_encode(kwargs))
+        t_new = [timeit(lambda: input2json(**kwargs, backend=b, return_bytes=1)) for b in backends]
+        print(f"{label:<6} {nodes:>7} {t_old*1e3:>9.2f} " +
+              " ".join(f"{t*1e3:>16.2f}" for t in t_new))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+benchmark of the local K-sites re-optimizer (tools.ksites_local) for economic what-ifs.
+
+The per-well contours are built from the 19 targets of Demos/get_ksites/ex1
+(vertical to the KOP at 1830 m, then build-hold with DLS 3°/30m, cost "L + 1830",
+NaN where the target is inside the turning circle or farther than 4 km), on a
+100 m grid, i.e. what get_ksites(getContours=1) returns for this field.
+
+Each what-if changes cst_Site / cst_WH and re-solves for cluster_min..cluster_max sites.
+local: KSitesLocal.solve
+server: one get_ksites round-trip with the same input (only with --server, it sends
+        the Demo input to the test server in API.py)
+
+Run from the repository root:
+    python benchmarks/bench_ksites_local.py [--server]
+"""
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+rootpath = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(rootpath)
+
+from tools.ksites_local import KSitesLocal
+
+
+def build_contours(input_data, resolution=100.0, reach=4000.0):
+    block = input_data['FIELDOPT INPUT BLOCK']
+    PT = np.array(block['PTM']['VALUE'], dtype=np.float64)
+    DLS = np.array(block['DLSM']['VALUE'], dtype=np.float64)[:, 0]
+    kop = 1830.0
+    r = 30*180/DLS/np.pi
+    x = np.arange(PT[:, 0].min() - 2000, PT[:, 0].max() + 2000, resolution)
+    y = np.arange(PT[:, 1].min() - 2000, PT[:, 1].max() + 2000, resolution)
+    X, Y = np.meshgrid(x, y)
+
+    # build-hold from (X, Y, -kop) downwards to PT
+    a = -kop - PT[:, 2, None, None] # vertical drop below the KOP
+    b = np.hypot(PT[:, 0, None, None] - X, PT[:, 1, None, None] - Y) # horizontal departure
+    rr = r[:, None, None]
+    D2 = a**2 + (b - rr)**2
+    with np.errstate(invalid="ignore"):
+        t = np.sqrt(D2 - rr**2)
+        theta = np.arctan2(b - rr, a) + np.arctan2(rr, t)
+    L = rr*theta + t
+    cost = L + kop
+    cost[(D2 <= rr**2) | (b > reach)] = np.nan
+    return {"X": X.ravel(), "Y": Y.ravel(), "cost": cost.reshape(len(PT), -1)}
+
+
+def whatifs():
+    for cst_Site in (200, 500, 1000, 2000, 5000):
+        for cst_WH in ([70, 70, 70, 70, 70, 20], [300, 250, 200, 150, 100, 50]):
+            yield cst_Site, cst_WH
+
+
+def main(server=False):
+    with open(os.path.join(rootpath, "Demos/get_ksites/ex1/input.json")) as f:
+        input_data = json.load(f)
+    contours = build_contours(input_data)
+    tic = time.perf_counter()
+    ks = KSitesLocal(contours)
+    t_init = time.perf_counter() - tic
+    print(f"{ks.n} wells, {ks.grid.cost.shape[1]}x{ks.grid.cost.shape[2]} grid, setup {t_init:.3f} s")
+
+    print(f"{'cst_Site':>8} {'cst_WH':>28} {'k':>3} {'cost':>10} {'local (s)':>10}")
+    times = []
+    for cst_Site, cst_WH in whatifs():
+        tic = time.perf_counter()
+        layout = ks.solve(cst_Site=cst_Site, slot=[6, 5, 4, 3, 2, 1], cst_WH=cst_WH,
+                          cluster_min=2, cluster_max=6)
+        times.append(time.perf_counter() - tic)
+        print(f"{cst_Site:>8} {str(cst_WH):>28} {layout['k']:>3} {layout['cost']:>10.1f} {times[-1]:>10.3f}")
+    print(f"local: {len(times)} what-ifs in {sum(times):.2f} s, {np.mean(times):.3f} s each")
+
+    if server:
+        from API import get_ksites
+        tic = time.perf_counter()
+        get_ksites(input_data, filepath=None)
+        t_server = time.perf_counter() - tic
+        print(f"server: one get_ksites round-trip {t_server:.2f} s, "
+              f"{len(times)} what-ifs ~{t_server*len(times):.1f} s")
+
+
+if __name__ == "__main__":
+    main(server="--server" in sys.argv)
@@ -0,0 +1,61 @@
+"""
+benchmark of plotting many offset wells: one trace per well vs. one batched trace.
+
+The 15 wells of Demos/get_1well/ex2/survey_data.json are copied on a grid of
+field positions (shifted in X/Y) up to n wells.
+loop: PlotSurvey once per well (one trace each, layout updated each time)
+batched: PlotSurveys, all wells in one trace, layout set once
+batched + tol: PlotSurveys with tol=1.0 m display decimation
+The figure JSON size is what the browser has to parse and render.
+
+Run from the repository root:
+    python benchmarks/bench_plot_surveys.py [n]
+"""
+import os
+import sys
+import time
+
+rootpath = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(rootpath)
+
+from tools.PlotSurvey_plotly import PlotSurvey, PlotSurveys
+from tools.survey_store import SurveyStore
+
+
+def field_wells(n):
+    store = SurveyStore.from_json(os.path.join(rootpath, "Demos/get_1well/ex2/survey_data.json"))
+    base = [store.well(i) for i in range(len(store))]
+    wells = []
+    for k in range(n):
+        well = base[k % len(base)].copy()
+        shift = k//len(base)
+        well["X"] += 3000.0*(shift % 10)
+        well["Y"] += 3000.0*(shift//10)
+        wells.append(well)
+    return wells
+
+
+def main(n=300):
+    wells = field_wells(n)
+    print(f"{n} wells, {sum(w.shape[0] for w in wells)} nodes")
+    print(f"{'':>14} {'traces':>7} {'build (s)':>10} {'json (MB)':>10}")
+
+    def report(label, build):
+        tic = time.perf_counter()
+        fig = build()
+        t = time.perf_counter() - tic
+        size = len(fig.to_json())/1e6
+        print(f"{label:>14} {len(fig.data):>7} {t:>10.2f} {size:>10.2f}")
+
+    def loop():
+        fig = None
+        for w, well in enumerate(wells):
+            fig = PlotSurvey(well, fig=fig, name=f"#{w+1}", show=0)
+        return fig
+    report("loop", loop)
+    report("batched", lambda: PlotSurveys(wells, show=0))
+    report("batched + tol", lambda: PlotSurveys(wells, tol=1.0, show=0))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 300)
@@ -0,0 +1,66 @@
+"""
+decode time and memory of the API response, old path vs typed Result.
+
+old: response.json() twice + json.dumps(indent=2) + json.loads, as APIhandler did
+new: one json.loads + Result.from_dict (NumPy arrays)
+
+"retained" is the memory still held by the returned object,
+"peak" is the highest traced memory during the decode.
+
+Run from the repository root:
+    python benchmarks/bench_results.py
+"""
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+rootpath = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(rootpath)
+
+from tools.results import Result
+
+
+def decode_old(raw):
+    content = json.loads(raw) # response.json()
+    output = json.dumps(content, indent=2)
+    json.loads(raw) # 2nd response.json() for the file dump
+    return json.loads(output)
+
+
+def decode_new(raw):
+    return Result.from_dict(json.loads(raw))
+
+
+def measure(func, raw, repeat=5):
+    tic = time.perf_counter()
+    for _ in range(repeat):
+        func(raw)
+    elapsed = (time.perf_counter() - tic)/repeat
+
+    gc.collect()
+    tracemalloc.start()
+    out = func(raw)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del out
+    return elapsed, peak, retained
+
+
+def main():
+    files = ["Demos/get_1site/ex1/output.json",
+             "Demos/get_1site/ex2/output.json",
+             "Demos/get_1well/ex2/output_anticollision.json"]
+    print(f"{'file':<46} {'path':<4} {'time (ms)':>10} {'peak (KB)':>10} {'retained (KB)':>14}")
+    for file in files:
+        with open(os.path.join(rootpath, file), "rb") as f:
+            raw = f.read()
+        for name, func in (("old", decode_old), ("new", decode_new)):
+            elapsed, peak, retained = measure(func, raw)
+            print(f"{file:<46} {name:<4} {elapsed*1e3:>10.2f} {peak/1024:>10.1f} {retained/1024:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+scaling of field problems with spatial sharding (tools.sharding), on the stub server.
+
+The stub 1-site server takes c*n**2 seconds for n wells (the server time grows
+steeply with n), and returns per-well contours on a 100 m grid around the targets.
+Wall-clock time versus n:
+    whole field: one get_1site request with all the wells
+    sharded: shards of at most max_wells wells, max_workers requests in parallel
+
+Run from the repository root:
+    python benchmarks/bench_sharding.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+rootpath = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(rootpath)
+
+from API import get_1site
+from tools.input2json import input2json
+from tools.sharding import solve_sharded
+from tools.stub_server import StubServer
+
+
+def field_input(n, seed=0):
+    rng = np.random.default_rng(seed)
+    side = 1000*np.sqrt(n) # about 1 well per km^2
+    PTM = np.column_stack((rng.uniform(0, side, n), rng.uniform(0, side, n), np.full(n, -3000.0)))
+    VTM = np.tile([0.0, 0.0, -1.0], (n, 1))
+    PKM = np.tile([np.nan, np.nan, -1830.0], (n, 1))
+    VKM = np.tile([0.0, 0.0, -1.0], (n, 1))
+    DLSM = np.full((n, 2), 3.0)
+    return input2json(n, PTM, VTM, PKM, VKM, DLSM, filepath=None)
+
+
+def stub_response(c):
+    def response(endpoint, input_data):
+        block = input_data['FIELDOPT INPUT BLOCK']
+        PT = np.array(block['PTM']['VALUE'], dtype=np.float64)
+        time.sleep(c*len(PT)**2)
+        x = np.arange(np.floor(PT[:, 0].min()/100)*100 - 500, PT[:, 0].max() + 600, 100.0)
+        y = np.arange(np.floor(PT[:, 1].min()/100)*100 - 500, PT[:, 1].max() + 600, 100.0)
+        X, Y = np.meshgrid(x, y)
+        get = input_data.get("other", {}).get("getContours", 0)
+        cost = [(np.hypot(X - p[0], Y - p[1]) + 1830).ravel().tolist() for p in PT] if get else []
+        site = PT[:, :2].mean(axis=0)
+        return {"status": "success",
+                "data": {"Trajectories": [{"X": [site[0], p[0]], "Y": [site[1], p[1]], "Z": [0.0, p[2]],
+                                           "MD": [0.0, 1.0]} for p in PT],
+                         "CostASite": {"X": [], "Y": [], "cost": []}, "CostKSites": None,
+                         "CostNWells": {"X": X.ravel().tolist(), "Y": Y.ravel().tolist(), "cost": cost}},
+                "message": "", "error_details": None}
+    return response
+
+
+def main(n_list=(50, 100, 200, 400, 800), c=5e-6, max_wells=25, max_workers=8):
+    print(f"stub server time {c:g}*n^2 s, shards of <= {max_wells} wells, {max_workers} in parallel")
+    print(f"{'n':>5} {'shards':>7} {'whole (s)':>10} {'sharded (s)':>12} {'speedup':>8}")
+    with StubServer(delay=0.0, response=stub_response(c)) as server:
+        url = server.url("get_1site")
+        for n in n_list:
+            input_data = field_input(n)
+            tic = time.time()
+            get_1site(input_data, url=url, filepath=None)
+            t_whole = time.time() - tic
+            out = solve_sharded(input_data, url=url, max_wells=max_wells,
+                                max_workers=max_workers)
+            assert out["status"] == "success" and all(t is not None for t in out["data"]["Trajectories"])
+            print(f"{n:>5} {len(out['data']['Shards']):>7} {t_whole:>10.2f} {out['elapsed']:>12.2f} "
+                  f"{t_whole/out['elapsed']:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
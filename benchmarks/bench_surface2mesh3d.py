@@ -0,0 +1,75 @@
+"""
+micro-benchmark of surface2mesh3d triangulation on cost-contour-like grids.
+
+old: the per-cell Python double loop surface2mesh3d used before
+new: tools.PlotContour_plotly.surface2mesh3d, vectorized over all cells
+
+The grid has NaN outside a disc and at random holes, like a cost contour with
+infeasible regions. Both versions must give the same triangles.
+
+Run from the repository root:
+    python benchmarks/bench_surface2mesh3d.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+rootpath = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(rootpath)
+
+from tools.PlotContour_plotly import surface2mesh3d
+
+
+def old_triangles(z, rows, cols):
+    i, j, k = [], [], []
+    for r in range(rows - 1):
+        for c in range(cols - 1):
+            p0 = r * cols + c
+            p1 = p0 + 1
+            p2 = p0 + cols
+            p3 = p2 + 1
+            count = np.count_nonzero(~np.isnan(z[[p0,p1,p2,p3]]))
+            if count>=3:
+                if not np.isnan(z[p0]) and not np.isnan(z[p3]):
+                    i += [p0, p0]
+                    j += [p1, p3]
+                    k += [p3, p2]
+                else:
+                    i += [p1, p0]
+                    j += [p3, p1]
+                    k += [p2, p2]
+    return i, j, k
+
+
+def build_grid(m, seed=0):
+    x = np.linspace(0, 3000, m)
+    X, Y = np.meshgrid(x, x)
+    C = np.hypot(X - 1500, Y - 1500)
+    C[C > 1400] = np.nan
+    C[np.random.default_rng(seed).random(C.shape) < 0.02] = np.nan
+    Z = np.full_like(C, 50.0)
+    Z[np.isnan(C)] = np.nan
+    return X, Y, Z, C
+
+
+def main():
+    print(f"{'grid':>10} {'triangles':>10} {'old (s)':>9} {'new (s)':>9} {'speedup':>8}")
+    for m in (100, 500, 1000):
+        X, Y, Z, C = build_grid(m)
+        tic = time.perf_counter()
+        mesh = surface2mesh3d(X, Y, Z, C=C)
+        t_new = time.perf_counter() - tic
+        assert mesh['i'].dtype == np.int32
+
+        tic = time.perf_counter()
+        i, j, k = old_triangles(Z.ravel(), m, m)
+        t_old = time.perf_counter() - tic
+        assert np.array_equal(mesh['i'], i) and np.array_equal(mesh['j'], j) \
+            and np.array_equal(mesh['k'], k)
+        print(f"{m:>4}x{m:<5} {len(i):>10} {t_old:>9.3f} {t_new:>9.4f} {t_old/t_new:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,6 @@
+import os
+import sys
+
+rootpath = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if rootpath not in sys.path:
+    sys.path.insert(0, rootpath)
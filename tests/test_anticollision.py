@@ -0,0 +1,60 @@
+"""
+tools.anticollision against brute force and the server's AnticolReport of Demos/get_1well/ex2.
+"""
+import json
+import os
+
+import numpy as np
+import pytest
+
+from tools.anticollision import check_anticollision, nearest_on_trajectory
+
+demo = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Demos", "get_1well", "ex2")
+
+
+def load_demo():
+    with open(os.path.join(demo, "input_anticollision.json")) as f:
+        anticol_con = json.load(f)['FIELDOPT INPUT BLOCK']['anticol_con']
+    with open(os.path.join(demo, "output_anticollision.json")) as f:
+        output = json.load(f)
+    anticol_con = {key: item['VALUE'] if isinstance(item, dict) else item for key, item in anticol_con.items()}
+    return anticol_con, output["data"]
+
+
+def brute_force(P, xyz):
+    A, AB = xyz[:-1], np.diff(xyz, axis=0)
+    t = np.clip(np.einsum("kij,ij->ki", P[:, None] - A, AB)/np.einsum("ij,ij->i", AB, AB), 0, 1)
+    return np.linalg.norm(P[:, None] - (A + t[..., None]*AB), axis=-1).min(axis=1)
+
+
+def test_nearest_is_exact():
+    # a hairpin: the nearest segment is not next to the nearest node
+    xyz = np.array([[0.0, 0, 0], [100, 0, 0], [100, 10, 0], [0, 10, 0], [0, 10, -300]])
+    md = np.concatenate([[0], np.cumsum(np.linalg.norm(np.diff(xyz, axis=0), axis=1))])
+    P = np.random.default_rng(0).uniform([-50, -50, -350], [150, 60, 50], size=(2000, 3))
+    d, Q, md_Q = nearest_on_trajectory(P, xyz, md)
+    np.testing.assert_allclose(d, brute_force(P, xyz), atol=1e-9)
+    np.testing.assert_allclose(np.linalg.norm(P - Q, axis=1), d, atol=1e-9)
+    # the nearest node (50, 0, 65) is 35 m away, the first segment 30 m
+    xyz = np.array([[0.0, 0, 0], [100, 0, 0], [100, 0, 100], [50, 0, 65], [50, 0, 200]])
+    md = np.concatenate([[0], np.cumsum(np.linalg.norm(np.diff(xyz, axis=0), axis=1))])
+    d, _, md_Q = nearest_on_trajectory(np.array([[50.0, 0, 30]]), xyz, md)
+    assert d[0] == pytest.approx(30.0) and md_Q[0] == pytest.approx(50.0)
+
+
+def test_demo_anticol_report():
+    anticol_con, data = load_demo()
+    report = check_anticollision(data["Trajectories"][0], anticol_con["Nodes_offset_list"],
+                                 anticol_con["safeDist_offset_f_list"], anticol_con["safeDist_new_f_list"],
+                                 anticol_con["SF_list"])
+    assert len(report) == len(data["AnticolReport"])
+    for w, (ours, server) in enumerate(zip(report, data["AnticolReport"])):
+        margin = server["Danger_Distance"] - server["Minimum_Safe_Distance"]
+        if w == 1:
+            # the server's offset point is between two offset nodes: within 0.5 m / 0.2 m
+            assert ours["Danger_Distance"] == pytest.approx(server["Danger_Distance"], abs=0.5)
+            assert ours["Margin"] == pytest.approx(margin, abs=0.2)
+            continue
+        assert ours["Danger_Distance"] == pytest.approx(server["Danger_Distance"], abs=1e-6)
+        assert ours["Margin"] == pytest.approx(margin, abs=1e-6)
+        np.testing.assert_allclose(ours["Danger_Point_New"], server["Danger_Point_New"], atol=1e-6)
@@ -0,0 +1,54 @@
+"""
+API client against the local stub server (tools.stub_server), no real server needed.
+"""
+import json
+import os
+
+from API import get_1well
+from tools.stub_server import StubServer
+
+rootpath = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_input():
+    with open(os.path.join(rootpath, "Demos/get_1well/ex1/input.json")) as f:
+        return json.load(f)
+
+
+def test_non_json_response(capsys):
+    with StubServer(delay=0, response=b"<html>502 Bad Gateway</html>") as server:
+        output = get_1well(load_input(), url=server.url("get_1well"), filepath=None)
+    assert output is None
+    out = capsys.readouterr().out
+    assert "Response is not valid JSON format" in out
+    assert "<html>502 Bad Gateway</html>" in out
+
+
+def test_get_batch_mixed():
+    from API import get_batch
+    good = load_input()
+    bad = {"other": {}} # no 'FIELDOPT INPUT BLOCK': KeyError when checking the index
+    with StubServer(delay=0) as server:
+        results = get_batch([good, bad, good], url=server.url("get_1well"), index=0)
+    assert [r["error"] is None for r in results] == [True, False, True]
+    assert results[0]["output"]["status"] == "success"
+    assert results[2]["output"]["status"] == "success"
+    assert results[1]["output"] is None
+    assert results[1]["error"].startswith("KeyError")
+
+
+def test_compression_fallback_only_when_rejected():
+    import API
+    error = {"status": "error", "data": None, "message": "solver failed", "error_details": None}
+    with StubServer(delay=0, response=lambda endpoint, input_data: (500, error)) as server:
+        url = server.url("get_1well")
+        output = get_1well(load_input(), url=url, filepath=None, compress="gzip")
+        assert output is None
+        assert server.n_requests == 1 # a genuine error isn't sent again uncompressed
+        assert url not in API._uncompressed_urls
+
+    with StubServer(delay=0, gzip=False) as server: # 415 to compressed bodies
+        url = server.url("get_1well")
+        output = get_1well(load_input(), url=url, filepath=None, compress="gzip")
+        assert output["status"] == "success"
+        assert url in API._uncompressed_urls
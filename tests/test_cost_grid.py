@@ -0,0 +1,43 @@
+"""
+tools.cost_grid on the get_1site ex1 demo contours.
+"""
+import json
+import os
+
+import numpy as np
+import pytest
+
+from tools.cost_grid import CostContour, inside_polygon
+
+rootpath = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_data():
+    with open(os.path.join(rootpath, "Demos/get_1site/ex1/output.json")) as f:
+        return json.load(f)["data"]
+
+
+def test_empty_cost():
+    # CostNWells of a getContours=0 run: nodes, no cost
+    with pytest.raises(ValueError, match="getContours=0"):
+        CostContour.from_dict(load_data()["CostNWells"])
+
+
+def test_memmap_load_is_lazy(tmp_path):
+    grid = CostContour.from_dict(load_data()["CostASite"])
+    grid.save(str(tmp_path / "site.npy"))
+    loaded = CostContour.load(str(tmp_path / "site.npy"))
+    assert isinstance(loaded.cost, np.memmap)
+    assert "valid" not in vars(loaded)
+    np.testing.assert_array_equal(loaded.valid, grid.valid)
+    assert loaded.argmin() == grid.argmin()
+
+
+def test_inside_polygon_batch():
+    # one polygon at a time or padded together (as site_whatif packs them): same nodes
+    X, Y = np.meshgrid(np.arange(-1.0, 11.0, 0.5), np.arange(-1.0, 11.0, 0.5))
+    square = [(0, 0), (10, 0), (10, 10), (0, 10)]
+    notch = [(0, 0), (10, 0), (5, 5), (10, 10), (0, 10), (0, 10)] # last vertex repeated
+    single = [inside_polygon(X, Y, p) for p in (square + [(0, 10)]*2, notch)]
+    np.testing.assert_array_equal(inside_polygon(X, Y, [square + [(0, 10)]*2, notch]), single)
+    assert single[0][X.shape[0]//2, X.shape[1]//2] and not single[1][np.argmin(abs(Y[:, 0] - 5)), 18]
@@ -0,0 +1,44 @@
+"""
+tools.export_html: the compact figure still shows the real coordinates.
+"""
+import numpy as np
+import plotly.graph_objects as go
+
+from tools.export_html import compact_figure
+
+
+def utm_figure(axis_range=True):
+    x = 516437.55 + np.arange(5)*10.123
+    y = 6782424.71 + np.arange(5)*7.456
+    fig = go.Figure(go.Scatter3d(x=x, y=y, z=-np.arange(5)*30.0, customdata=np.column_stack([np.arange(5)*30.0]),
+                                 hovertemplate="East: %{x:.2f}<br>North: %{y:.2f}<extra>MD: %{customdata[0]:.2f}</extra>"))
+    fig.add_trace(go.Scatter3d(x=x, y=y, z=np.zeros(5))) # default hover
+    if axis_range:
+        fig.update_layout(scene=dict(xaxis=dict(range=[516000, 517000]), yaxis=dict(range=[6782000, 6783000])))
+    return fig, x, y
+
+
+def test_hover_real_coordinates():
+    fig, x, y = utm_figure()
+    out = compact_figure(fig)
+    first, second = out.data
+    assert first.hovertemplate == "East: %{customdata[1]:.2f}<br>North: %{customdata[2]:.2f}" \
+        "<extra>MD: %{customdata[0]:.2f}</extra>"
+    custom = np.asarray(first.customdata)
+    np.testing.assert_allclose(custom[:, 0], np.arange(5)*30.0)
+    np.testing.assert_allclose(custom[:, 1], x, atol=0.005)
+    np.testing.assert_allclose(custom[:, 2], y, atol=0.005)
+    assert "%{x" not in second.hovertemplate and "%{y" not in second.hovertemplate
+    np.testing.assert_allclose(np.asarray(second.customdata)[:, 0], x, atol=0.005)
+    # the plotted x, y are local
+    assert np.abs(np.asarray(first.x)).max() < 1000
+
+
+def test_ticks_without_range():
+    fig, x, _ = utm_figure(axis_range=False)
+    out = compact_figure(fig)
+    axis = out.layout.scene.xaxis
+    assert axis.range is None
+    labels = np.array(axis.ticktext, dtype=float)
+    assert labels.min() >= x.min() and labels.max() <= x.max()
+    np.testing.assert_allclose(np.array(axis.tickvals) + 516400, labels)
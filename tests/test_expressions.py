@@ -0,0 +1,50 @@
+"""
+tools.expressions whitelists, with the constraint examples of the Demos notebooks.
+"""
+import numpy as np
+import pytest
+
+from tools.expressions import compile_expr, validate_expr, LAYER_VARS, NECON_VARS
+from tools.layer_check import check_layer_constraints
+
+
+@pytest.mark.parametrize("expr", ["-inclD_L+81", "-aziD_L+180", "P_L[0]-100", "P_L[2]+1300",
+                                  "(x_L-2450)**2+(y_L-1550)**2-100000", "-azD_L+180"])
+def test_layer_vars(expr):
+    assert validate_expr(expr, LAYER_VARS) is None
+
+
+@pytest.mark.parametrize("expr", ["-PK[0]+516000", "-PK[1]+6782000", "-angDT+90", "-inclD+81"])
+def test_necon_vars(expr):
+    assert validate_expr(expr, NECON_VARS) is None
+
+
+def test_unknown_layer_var():
+    with pytest.raises(ValueError, match="unknown variable"):
+        compile_expr("-azi_L+180", LAYER_VARS)
+
+
+def test_layer_constraints_documented_names():
+    # straight slanted well: x = 200 + 0.5*depth, azimuth 90 (east), inclination ~26.57
+    depth = np.arange(0.0, 2001.0, 100.0)
+    traj = {"X": 200 + 0.5*depth, "Y": np.zeros_like(depth), "Z": -depth,
+            "MD": depth*np.sqrt(1.25), "INCL": np.full_like(depth, np.degrees(np.arctan(0.5))),
+            "AZ": np.full_like(depth, 90.0)}
+    lay_conM = [[{"layer": -1300, "con": ["-inclD_L+81", "-aziD_L+180", "P_L[0]-100",
+                                          "P_L[0]-900", "-azD_L+45"]}]]
+    report = check_layer_constraints([traj], lay_conM)
+    margins = {row["constraint"]: row["margin"] for row in report}
+    assert margins["-inclD_L+81"] == pytest.approx(81 - np.degrees(np.arctan(0.5)))
+    assert margins["-aziD_L+180"] == pytest.approx(90)
+    assert margins["P_L[0]-100"] == pytest.approx(750)
+    assert margins["-azD_L+45"] == pytest.approx(-45)
+    assert [row["satisfied"] for row in report] == [True, True, True, False, False]
+    assert report[0]["aziD_L"] == pytest.approx(90)
+
+
+def test_comparison_only_in_where():
+    f = compile_expr("where(md > 1000, md/100, 2.5)")
+    np.testing.assert_allclose(f(md=np.array([500.0, 2000.0])), [2.5, 20.0])
+    for expr in ("md > 1000", "(md > 1000)*2", "where(1, md > 1000, 2)", "sin(md > 1)"):
+        with pytest.raises(ValueError, match="where"):
+            compile_expr(expr)
@@ -0,0 +1,92 @@
+"""
+tools.incremental against a local stub 1-site server.
+"""
+import copy
+import json
+import os
+
+import numpy as np
+
+from tools.incremental import IncrementalPlanner, site_gap
+from tools.stub_server import StubServer
+
+rootpath = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+X = [0.0, 100.0, 200.0]*2
+Y = [0.0]*3 + [100.0]*3
+
+
+def stub(endpoint, input_data):
+    # well cost: distance to the target + 1000, NaN beyond 150 m
+    block = input_data['FIELDOPT INPUT BLOCK']
+    other = input_data.get("other", {})
+    PT = np.array(block['PTM']['VALUE'], dtype=np.float64)
+    wells = np.array([np.hypot(np.array(X) - p[0], np.array(Y) - p[1]) for p in PT])
+    wells = np.where(wells > 150, np.nan, wells + 1000)
+    indices = other.get("indices") or list(range(len(PT)))
+    PK = block['PKM']['VALUE']
+    trajectories = [{"X": [PK[w][0] if PK[w][0] is not None else 100.0, PT[w, 0]],
+                     "Y": [PK[w][1] if PK[w][1] is not None else 50.0, PT[w, 1]],
+                     "Z": [0.0, PT[w, 2]], "MD": [0.0, 1.0], "COST": 1.0} for w in indices]
+    cost = [[None if np.isnan(c) else c for c in row] for row in wells[indices]]
+    return {"status": "success",
+            "data": {"Trajectories": trajectories, "CostKSites": None,
+                     "CostASite": {"X": X, "Y": Y, "cost": [None if np.isnan(c) else c for c in wells.sum(axis=0)]},
+                     "CostNWells": {"X": X, "Y": Y, "cost": cost if other.get("getContours") else []}},
+            "message": "", "error_details": None}
+
+
+def test_site_gap():
+    old = np.array([3.0, 1.0, 2.0])
+    assert site_gap(old, np.array([3.0, 1.0, 2.0])) == 0
+    assert site_gap(old, np.array([1.0, 2.0, 4.0])) == 1.0
+    assert site_gap(old, np.array([1.0, np.nan, 4.0])) == np.inf
+
+
+def _field(n):
+    with open(os.path.join(rootpath, "Demos/get_1site/ex1/input.json")) as f:
+        input_data = json.load(f)
+    block = input_data['FIELDOPT INPUT BLOCK']
+    block['n']['VALUE'] = n
+    for key in ("PTM", "VTM", "PKM", "VKM", "DLSM", "tag"):
+        if block[key]['VALUE'] is not None:
+            block[key]['VALUE'] = block[key]['VALUE'][:n]
+    block['XRange']['VALUE'] = [0.0, 200.0] # the grid of the stub, fixed
+    block['YRange']['VALUE'] = [0.0, 100.0]
+    return input_data
+
+
+def test_merged_site_cost_is_well_sum():
+    input_data = _field(3)
+    # well 2 can't reach x=0
+    input_data["FIELDOPT INPUT BLOCK"]["PTM"]["VALUE"] = [[100.0, 0.0, -1500.0], [200.0, 100.0, -1500.0],
+                                                          [100.0, 100.0, -1500.0]]
+    moved = copy.deepcopy(input_data)
+    moved["FIELDOPT INPUT BLOCK"]["PTM"]["VALUE"][1] = [50.0, 100.0, -1500.0] # now it can, not x=200
+
+    with StubServer(delay=0, response=stub) as server:
+        planner = IncrementalPlanner(url=server.url("get_1site"), max_gap=np.inf)
+        planner.plan(input_data)
+        output = planner.plan(moved)
+        requests = server.n_requests
+    assert planner.report["mode"] == "incremental"
+    assert requests == 3 # full, then the changed well twice, alone
+    site = np.array(output["data"]["CostASite"]["cost"], dtype=np.float64)
+    wells = np.array(output["data"]["CostNWells"]["cost"], dtype=np.float64)
+    np.testing.assert_array_equal(np.isnan(site), np.isnan(wells).any(axis=0))
+    np.testing.assert_allclose(site, wells.sum(axis=0))
+    assert output["data"]["Trajectories"][1]["X"] == [100.0, 50.0] # pinned at the solved site
+
+
+def test_full_when_not_cheaper():
+    input_data = _field(2)
+    input_data["FIELDOPT INPUT BLOCK"]["PTM"]["VALUE"] = [[100.0, 0.0, -1500.0], [200.0, 100.0, -1500.0]]
+    moved = copy.deepcopy(input_data)
+    moved["FIELDOPT INPUT BLOCK"]["PTM"]["VALUE"][1] = [50.0, 100.0, -1500.0]
+
+    with StubServer(delay=0, response=stub) as server:
+        planner = IncrementalPlanner(url=server.url("get_1site"), max_gap=np.inf)
+        planner.plan(input_data)
+        planner.plan(moved)
+    assert planner.report["mode"] == "full" and planner.report["requests"] == 1
+    assert planner.plan(moved) is planner.output and planner.report["mode"] == "cached"
@@ -0,0 +1,20 @@
+"""
+tools.input2json encoding.
+"""
+import json
+
+import numpy as np
+import pytest
+
+from tools.input2json import encode_json
+
+
+def test_backends_same_payload():
+    pytest.importorskip("orjson")
+    obj = {"a": float("nan"), "b": [1.5, float("nan"), None], "c": np.array([[1.0, np.nan]]),
+           "d": np.float64("nan"), "e": "text", "f": 3}
+    out_json = encode_json(obj, backend="json")
+    out_orjson = encode_json(obj, backend="orjson")
+    assert b"NaN" not in out_json
+    assert json.loads(out_json) == json.loads(out_orjson) == \
+        {"a": None, "b": [1.5, None, None], "c": [[1.0, None]], "d": None, "e": "text", "f": 3}
@@ -0,0 +1,30 @@
+"""
+tools.jobs against the local stub server: a failed job runs again when resubmitted.
+"""
+import json
+import os
+
+import pytest
+
+from tools.jobs import JobError, submit
+from tools.stub_server import StubServer, default_response
+
+rootpath = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_resubmit_failed_job(tmp_path):
+    with open(os.path.join(rootpath, "Demos/get_1well/ex1/input.json")) as f:
+        input_data = json.load(f)
+    replies = [b"<html>502 Bad Gateway</html>", default_response]
+    with StubServer(delay=0, response=lambda endpoint, data: replies[0]) as server:
+        url = server.url("get_1well")
+        job = submit(url, input_data, index=0, job_root=str(tmp_path))
+        with pytest.raises(JobError, match="JSON"):
+            job.wait(max_wait=30, interval=0.1)
+        assert job.poll() == "failed"
+
+        replies.pop(0)
+        again = submit(url, input_data, index=0, job_root=str(tmp_path))
+        assert again.handle == job.handle
+        assert again.wait(max_wait=30, interval=0.1)["status"] == "success"
+        assert server.n_requests == 2
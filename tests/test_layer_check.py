@@ -0,0 +1,83 @@
+"""
+tools.layer_check on the get_1well ex1 demo (validated by the server).
+"""
+import json
+import os
+
+import numpy as np
+import pytest
+
+from tools.layer_check import check_lay_conM, check_layer_constraints, layer_points
+
+demo = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Demos", "get_1well", "ex1")
+
+
+def load_demo():
+    with open(os.path.join(demo, "input.json")) as f:
+        input_data = json.load(f)
+    with open(os.path.join(demo, "output.json")) as f:
+        output = json.load(f)
+    return input_data, output
+
+
+def test_1well_ex1_satisfied():
+    # the circle constraint is active: margin ~0 on the arc (the chord gave -50.57)
+    report = check_lay_conM(*load_demo())
+    assert len(report) == 1
+    assert report[0]["satisfied"]
+    assert abs(report[0]["margin"]) < 1e-3
+
+
+def test_arc_hits_layer_and_matches_nodes():
+    _, output = load_demo()
+    traj = output["data"]["Trajectories"][0]
+    Z = np.asarray(traj["Z"])
+    points = layer_points(traj, [-1500.0, Z[40], 10.0])
+    assert points["z_L"][0] == pytest.approx(-1500.0)
+    # a layer at a station: the station itself
+    assert points["x_L"][1] == pytest.approx(traj["X"][40])
+    assert points["inclD_L"][1] == pytest.approx(traj["INCL"][40])
+    assert points["md_L"][1] == pytest.approx(traj["MD"][40])
+    assert np.isnan(points["x_L"][2]) # not reached
+
+
+def test_surface_points():
+    _, output = load_demo()
+    traj = output["data"]["Trajectories"][0]
+    # flat surface at -1500 as scattered points: same as the depth
+    xy = np.array([[0, 0], [5000, 0], [0, 5000], [5000, 5000], [2500, 1000]], dtype=float)
+    surface = np.column_stack([xy, np.full(len(xy), -1500.0)])
+    flat = layer_points(traj, [-1500.0])
+    scattered = layer_points(traj, [surface])
+    for name in ("x_L", "y_L", "z_L", "md_L", "inclD_L", "aziD_L"):
+        assert scattered[name][0] == pytest.approx(flat[name][0])
+    # tilted surface: the crossing is on it
+    tilted = surface.copy()
+    tilted[:, 2] = -1400.0 - 0.05*tilted[:, 0]
+    p = layer_points(traj, [tilted])
+    assert p["z_L"][0] == pytest.approx(-1400.0 - 0.05*p["x_L"][0])
+
+
+def test_chord_without_angles():
+    traj = {"X": [0.0, 0.0, 100.0], "Y": [0.0, 0.0, 0.0], "Z": [0.0, -100.0, -200.0], "MD": [0.0, 100.0, 241.4]}
+    p = layer_points(traj, [-150.0])
+    assert p["x_L"][0] == pytest.approx(50.0)
+    assert np.isnan(p["inclD_L"][0])
+
+
+def test_bad_layer_points():
+    with pytest.raises(ValueError, match="layer"):
+        layer_points({"X": [0, 1], "Y": [0, 1], "Z": [0, -1], "MD": [0, 1.5]}, [[[0, 0, -1], [1, 1, -1]]])
+
+
+def test_wells_batched_like_single():
+    # the points of all wells are evaluated together: same margins as one well at a time
+    _, output = load_demo()
+    traj = output["data"]["Trajectories"][0]
+    lay_conM = [[{"layer": -1500.0, "con": ["-inclD_L+36", "md_L-1000"]}],
+                None,
+                [{"layer": -1000.0, "con": ["md_L-1000"]}, {"layer": -1500.0, "con": ["-inclD_L+36"]}]]
+    batched = check_layer_constraints([traj]*3, lay_conM)
+    single = [row for w in (0, 2) for row in check_layer_constraints([traj], [lay_conM[w]])]
+    assert [row["well"] for row in batched] == [0, 0, 2, 2]
+    assert [row["margin"] for row in batched] == pytest.approx([row["margin"] for row in single])
@@ -0,0 +1,57 @@
+"""
+tools.PlotSurvey_plotly.PlotSurveys: the wells packed in one trace, on the Demo survey store.
+"""
+import os
+
+import numpy as np
+
+from tools.decimate import decimate_survey
+from tools.PlotSurvey_plotly import PlotSurveys
+from tools.survey_store import SurveyStore
+
+rootpath = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+store = SurveyStore.from_json(os.path.join(rootpath, "Demos/get_1well/ex2/survey_data.json"))
+
+
+def unpack(fig):
+    trace = fig.data[0]
+    xyz = np.column_stack([np.asarray(trace.x, dtype=np.float64), np.asarray(trace.y, dtype=np.float64),
+                           np.asarray(trace.z, dtype=np.float64)])
+    return xyz, np.asarray(trace.customdata, dtype=np.float64)
+
+
+def check_wells(fig, wells):
+    # one block per well, a NaN row between wells, customdata[4] = well index
+    xyz, custom = unpack(fig)
+    assert len(fig.data) == 1
+    assert xyz.shape[0] == custom.shape[0] == sum(w.shape[0] for w in wells) + len(wells) - 1
+    row = 0
+    for i, well in enumerate(wells):
+        m = well.shape[0]
+        np.testing.assert_allclose(xyz[row:row+m], np.column_stack([well["X"], well["Y"], well["Z"]]))
+        np.testing.assert_allclose(custom[row:row+m, 0], well["MD"], rtol=1e-6)
+        assert (custom[row:row+m, 4] == i).all()
+        if i < len(wells) - 1:
+            assert np.isnan(xyz[row + m]).all() # separator
+        row += m + 1
+
+
+def test_separators_and_customdata():
+    fig = PlotSurveys(store, show=0)
+    check_wells(fig, [well for _, well in store])
+
+
+def test_tol_keeps_decimated_rows():
+    fig = PlotSurveys(store, tol=5.0, show=0)
+    wells = []
+    for _, well in store:
+        nodes = np.column_stack([well["X"], well["Y"], well["Z"], well["MD"]])
+        _, info = decimate_survey(nodes, tol=5.0, incl=well["INCL"], az=well["AZ"])
+        wells.append(well[info["kept"]])
+    assert sum(w.shape[0] for w in wells) < sum(w.shape[0] for _, w in store)
+    check_wells(fig, wells)
+
+
+def test_empty():
+    fig = PlotSurveys([], show=0)
+    assert len(fig.data) == 0
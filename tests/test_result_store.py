@@ -0,0 +1,73 @@
+"""
+tools.result_store: round trip of the Demo outputs, and recovery of an interrupted add.
+"""
+import json
+import os
+
+import numpy as np
+import pytest
+
+from tools.result_store import ResultStore
+
+rootpath = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def demo(path):
+    return os.path.join(rootpath, "Demos", path)
+
+
+def sizes(path):
+    return {name: os.path.getsize(os.path.join(path, name)) for name in sorted(os.listdir(path))}
+
+
+def test_other_data_kept(tmp_path):
+    store = ResultStore(str(tmp_path))
+    run = store.import_json(demo("get_1well/ex2/output_anticollision.json"))
+    with open(demo("get_1well/ex2/output_anticollision.json")) as f:
+        data = json.load(f)["data"]
+    content = ResultStore(str(tmp_path), readonly=1).content(run)
+    assert content["data"]["AnticolReport"] == data["AnticolReport"]
+    assert set(content["data"]) == set(data)
+    np.testing.assert_allclose(content["data"]["Trajectories"][0]["X"], data["Trajectories"][0]["X"])
+
+
+def test_long_tag_rejected(tmp_path):
+    store = ResultStore(str(tmp_path))
+    store.import_json(demo("get_1site/ex1/output.json"))
+    before = sizes(str(tmp_path))
+    with open(demo("get_1site/ex1/output.json")) as f:
+        content = json.load(f)
+    with pytest.raises(ValueError, match="longer than 32 bytes"):
+        store.add(content, tags=["A1", "x"*33, "A3", "A4"])
+    assert sizes(str(tmp_path)) == before
+    assert len(store) == 1
+
+
+def test_uncommitted_run_dropped(tmp_path):
+    path = str(tmp_path)
+    store = ResultStore(path)
+    run = store.import_json(demo("get_1site/ex1/output.json"))
+    committed = sizes(path)
+    store.add({"status": "success", "data": {}}, run_id="empty")
+    committed_empty = sizes(path)
+    # an add interrupted before its runs.jsonl line: the index and data files grew
+    with open(demo("get_1site/ex2/output.json")) as f:
+        content = json.load(f)
+    store.add(content, run_id="crashed")
+    with open(os.path.join(path, "runs.jsonl"), "rb+") as f:
+        lines = f.read().splitlines(keepends=True)
+        f.seek(0)
+        f.truncate()
+        f.write(b"".join(lines[:-1]) + lines[-1][:10]) # line cut by the crash
+
+    reader = ResultStore(path, readonly=1)
+    assert len(reader) == 2
+    assert reader.find(tag="well0").shape[0] == 1 # not the record of the crashed run
+    assert sizes(path) != committed_empty
+
+    writer = ResultStore(path)
+    assert sizes(path) == committed_empty
+    assert committed["wells.idx"] == committed_empty["wells.idx"]
+    writer.add(content, run_id="again")
+    assert writer.trajectory("again", well=0).X[0] == pytest.approx(content["data"]["Trajectories"][0]["X"][0])
+    assert writer.trajectory(run, well=0) is not None
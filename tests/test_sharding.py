@@ -0,0 +1,53 @@
+"""
+tools.sharding shard inputs, on the get_ksites ex1 demo.
+"""
+import json
+import os
+
+import numpy as np
+import pytest
+
+from tools.sharding import partition_wells, shard_inputs
+
+demo = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Demos", "get_ksites", "ex1")
+
+
+def load_demo():
+    with open(os.path.join(demo, "input.json")) as f:
+        return json.load(f)
+
+
+def test_ksites_clusters_split():
+    input_data = load_demo()
+    block = input_data["FIELDOPT INPUT BLOCK"]
+    shards = partition_wells(block["PTM"]["VALUE"], max_wells=7)
+    inputs = shard_inputs(input_data, shards)
+    cluster_max = [i["FIELDOPT INPUT BLOCK"]["cluster_max"]["VALUE"] for i in inputs]
+    cluster_min = [i["FIELDOPT INPUT BLOCK"]["cluster_min"]["VALUE"] for i in inputs]
+    assert sum(cluster_max) == block["cluster_max"]["VALUE"]
+    assert min(cluster_min) >= 1
+    assert all(lo <= hi for lo, hi in zip(cluster_min, cluster_max))
+
+
+def test_too_many_shards():
+    input_data = load_demo()
+    shards = partition_wells(input_data["FIELDOPT INPUT BLOCK"]["PTM"]["VALUE"], max_wells=2)
+    with pytest.raises(ValueError, match="cluster_max"):
+        shard_inputs(input_data, shards)
+
+
+def test_ranges_clipped():
+    input_data = load_demo()
+    block = input_data["FIELDOPT INPUT BLOCK"]
+    block["XRange"]["VALUE"] = [-1000.0, 18000.0]
+    block["resolution"]["VALUE"] = 50
+    PTM = np.asarray(block["PTM"]["VALUE"])
+    shards = partition_wells(PTM, max_wells=7)
+    for idx, sub in zip(shards, shard_inputs(input_data, shards, margin=300)):
+        x0, x1 = sub["FIELDOPT INPUT BLOCK"]["XRange"]["VALUE"]
+        y0, y1 = sub["FIELDOPT INPUT BLOCK"]["YRange"]["VALUE"]
+        # within the field, on its grid, around the shard targets
+        assert -1000.0 <= x0 and x1 <= 18000.0
+        assert (x0 + 1000.0) % 50 == 0 and y0 % 50 == 0
+        assert x0 <= max(PTM[idx, 0].min() - 300, -1000.0) and x1 >= min(PTM[idx, 0].max() + 300, 18000.0)
+        assert y0 <= PTM[idx, 1].min() - 300 and y1 >= PTM[idx, 1].max() + 300
@@ -0,0 +1,32 @@
+"""
+tools.site_whatif on the get_1site ex1 demo contours.
+"""
+import json
+import os
+
+import numpy as np
+
+from tools.site_whatif import SiteWhatIf
+
+rootpath = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_whatif():
+    with open(os.path.join(rootpath, "Demos/get_1site/ex1/output.json")) as f:
+        data = json.load(f)["data"]
+    return SiteWhatIf(data["CostASite"], data["CostNWells"])
+
+
+def test_empty_batch():
+    out = load_whatif().batch([])
+    assert set(out) == {"x", "y", "cost", "delta", "feasible"}
+    assert all(value.shape == (0,) for value in out.values())
+
+
+def test_relocate_out_of_circle():
+    whatif = load_whatif()
+    x0, y0, cost0 = whatif.base
+    out = whatif.relocate(circles=[(x0, y0, 300)])
+    assert out["feasible"]
+    assert np.hypot(out["x"] - x0, out["y"] - y0) > 300
+    assert out["delta"] >= 0
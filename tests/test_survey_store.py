@@ -0,0 +1,76 @@
+"""
+tools.survey_store: the byte-span scanner against json.load, and the binary round trip.
+"""
+import json
+import os
+
+import numpy as np
+import pytest
+
+from tools.survey_store import SurveyStore, normalize
+
+rootpath = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+demo = os.path.join(rootpath, "Demos/get_1well/ex2/survey_data.json")
+
+
+def assert_same(well, expected):
+    # field by field, structured arrays don't compare NaN as equal
+    for name in expected.dtype.names:
+        np.testing.assert_array_equal(well[name], expected[name])
+
+
+def tricky_file(path):
+    # strings with escaped quotes, backslashes and brackets, before and inside the surveys
+    surveys = [{"name": 'a "[quoted]" {well}', "X": [1.0, 2.0], "Y": [3.0, 4.0], "Z": [0.0, -10.0],
+                "MD": [0.0, 10.0], "note": "ends with a backslash \\"},
+               {"MD": [0.0, 5.5, 11.0], "EAST": [5.0, 5.0, 5.0], "NORTH": [6.0, 6.0, 6.0],
+                "TVD": [0.0, -5.5, -11.0], "INCL": [0.0, None, 1.5], "remark": "}]\\\"[{"}]
+    data = {"comment": 'x "SURVEY" [ { \\', "tags": ["#1 \"a\"", "[b]"], "SURVEY": surveys,
+            "after": [[1, 2], {"SURVEY": []}]}
+    with open(path, "w") as f:
+        json.dump(data, f, indent=1)
+    return data
+
+
+@pytest.mark.parametrize("chunk", [1, 3, 7, 64, 1 << 20])
+def test_scan_matches_json_load(tmp_path, chunk):
+    for path, data in ((demo, None), (str(tmp_path / "tricky.json"), "tricky")):
+        if data is not None:
+            data = tricky_file(path)
+        else:
+            with open(path) as f:
+                data = json.load(f)
+        store = SurveyStore.from_json(path, chunk=chunk)
+        assert store.tags == [str(tag) for tag in data["tags"]]
+        assert len(store) == len(data["SURVEY"])
+        for i, survey in enumerate(data["SURVEY"]):
+            assert_same(store.well(i), normalize(survey))
+
+
+def test_plain_list(tmp_path):
+    path = str(tmp_path / "list.json")
+    surveys = tricky_file(str(tmp_path / "tricky.json"))["SURVEY"]
+    with open(path, "w") as f:
+        json.dump(surveys, f)
+    store = SurveyStore.from_json(path, chunk=5)
+    assert store.tags == ["#1", "#2"]
+    assert_same(store.well("#2"), normalize(surveys[1]))
+
+
+def test_no_survey_key(tmp_path):
+    path = str(tmp_path / "surveys.json")
+    with open(path, "w") as f:
+        json.dump({"surveys": [{"X": [0.0], "Y": [0.0], "Z": [0.0], "MD": [0.0]}]}, f)
+    with pytest.raises(ValueError, match="SURVEY"):
+        SurveyStore.from_json(path)
+
+
+@pytest.mark.parametrize("mmap", [0, 1])
+def test_save_load(tmp_path, mmap):
+    store = SurveyStore.from_json(demo)
+    store.save(str(tmp_path / "offsets.npy"))
+    loaded = SurveyStore.load(str(tmp_path / "offsets.npy"), mmap=mmap)
+    assert loaded.tags == store.tags and len(loaded) == len(store)
+    for (tag, well), (tag0, well0) in zip(loaded, store):
+        assert tag == tag0
+        assert well.tobytes() == well0.tobytes() # NaN included
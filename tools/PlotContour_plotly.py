@@ -11,6 +11,10 @@ Contour_ValM: (n, ?,?), 3D array, n wells' Contour_Val
 
 show: if show==1, show the figure right now
       else, wait for futher plots
+
+Large grids: PlotContour(..., max_vertices=20000) draws a level of detail mesh
+(see lod_mesh), the hover values are the full-resolution node costs, and
+RefineContour adds the full-resolution contour of a window on demand.
 """
 import plotly.graph_objects as go
 import numpy as np
@@ -33,7 +37,9 @@ def PlotContour(X,Y,Contour_Val,
                 azim=-135, elev=20, # view angle
                 show=1, # immediately show the plot
 
-                plotz=50): # plot contour on the plane z=plotz
+                plotz=50, # plot contour on the plane z=plotz
+                max_vertices=None): # level of detail: target number of mesh vertices (see lod_mesh)
+                                    # None: all grid nodes
     if isinstance(X, list):
         X=np.array(X, dtype=np.float64)
     if isinstance(Y, list):
@@ -118,8 +124,37 @@ def PlotContour(X,Y,Contour_Val,
     # )
 
     # %% go.Mesh3d
-    mesh_data=surface2mesh3d(X, Y, Z, C=Contour_Val)
-    fig.add_trace( go.Mesh3d(
+    if max_vertices is None:
+        mesh_data=surface2mesh3d(X, Y, Z, C=Contour_Val)
+    else:
+        mesh_data=lod_mesh(X, Y, Z, Contour_Val, max_vertices=max_vertices)
+    fig.add_trace(contour_trace(mesh_data, name, legendgroup=legendgroup,
+                                showscale=showscale, showlegend=showlegend, visible=visible,
+                                cmin=cmin, cmax=cmax))
+    # ==================================================================================
+    # %%
+    update_contour_layout(fig, X, Y, width=width, height=height, margin=margin,
+                          azim=azim, elev=elev)
+
+    # show fig or preserve it for further modification
+    if show == 1:
+        fig.show()
+
+    return fig
+
+#################################################################
+#################################################################
+# %%
+def contour_trace(mesh_data, name,
+                  legendgroup=None,
+                  showscale=False, showlegend=True, visible=True,
+                  cmin=None, cmax=None):
+    """
+    go.Mesh3d of one contour, mesh_data from surface2mesh3d or lod_mesh.
+    """
+    if legendgroup is None:
+        legendgroup = name
+    return go.Mesh3d(
             x=mesh_data['x'],
             y=mesh_data['y'],
             z=mesh_data['z'],
@@ -129,7 +164,6 @@ def PlotContour(X,Y,Contour_Val,
             intensity=mesh_data['intensity'],
             colorscale='jet',
 
-            text=Contour_Val.round(2),
             name=name,
 
             showscale=showscale,
@@ -150,9 +184,15 @@ def PlotContour(X,Y,Contour_Val,
                 font_color="black"       
             )
         )
-    )
-    # ==================================================================================
-    # %%
+
+
+def update_contour_layout(fig, X, Y,
+                          width=600, height=450, # fig size
+                          margin=[10,10,10,10], # [left, top, right, bottom]
+                          azim=-135, elev=20): # view angle
+    """
+    Axes, equal X/Y ranges covering X, Y and the existing ranges, legend and view angle.
+    """
     # Basic layout
     fig.update_layout(
         scene = dict( xaxis=dict(title='X (East, m)',),
@@ -221,11 +261,6 @@ def PlotContour(X,Y,Contour_Val,
             )
         )
 
-    # show fig or preserve it for further modification
-    if show == 1:
-        fig.show()
-
-    return fig
 
 #################################################################
 #################################################################
@@ -244,46 +279,123 @@ def PlotContours(X, Y, Contour_ValM,
                         azim=-135, elev=20, # view angle
                         show=1, # immediately show the plot
 
-                        plotz=50): # plot contour on the plane z=plotz
-    
+                        plotz=50, # plot contour on the plane z=plotz
+                        max_vertices=None): # level of detail per contour, see PlotContour
+    """
+    All the contours share the X/Y grid: the grid nodes and cells are set up once,
+    the triangles of all wells are computed in one pass (only the NaN pattern differs),
+    and the layout is updated once.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    Y = np.asarray(Y, dtype=np.float64)
+    Contour_ValM = np.asarray(Contour_ValM, dtype=np.float64)
     num_contour = Contour_ValM.shape[0]
 
+    if X.ndim==1: # if X is 1D array, convert it to 2D array
+        n2=np.sum(Y==Y[0])
+        n1=Y.shape[0]//n2
+        X=X.reshape(n1,n2)
+        Y=Y.reshape(n1,n2)
+    rows, cols = X.shape
+    Contour_ValM=Contour_ValM.reshape(num_contour, rows, cols)
+
     if name_list is None:
         name_list = [f'contour #{i+1}' for i in range(num_contour)]
     elif len(name_list) < num_contour:
         name_list.extend([f'contour #{i+1}' for i in range(len(name_list), num_contour)])
 
     if separate:
-        cmin = None
-        cmax = None
+        cmin = np.nanmin(Contour_ValM.round(2), axis=(1,2))
+        cmax = np.nanmax(Contour_ValM.round(2), axis=(1,2))
     else:
-        cmin = np.nanmin(Contour_ValM)
-        cmax = np.nanmax(Contour_ValM)
-
-    for i in range(num_contour):
-        fig=PlotContour(X,Y,Contour_ValM[i,:,:], 
-                fig=fig,
-                name= name_list[i],
+        cmin = np.full(num_contour, np.nanmin(Contour_ValM))
+        cmax = np.full(num_contour, np.nanmax(Contour_ValM))
 
-                width=width, height=height, # fig size
-                margin=margin, # [left, top, right, bottom]
+    if not fig:
+        fig = go.Figure()
 
-                showscale=showscale, # True: show scale color bar
-                showlegend=showlegend, # True: show legend
-                cmin=cmin, cmax=cmax, # color scale min and max
+    real = ~np.isnan(Contour_ValM)
+    planes = plotz + 0.1*np.arange(num_contour) # plot on different planes
+    ZM = np.where(real, planes[:, None, None], np.nan)
+    if max_vertices is None:
+        # shared topology: node indices of the cells, for every well
+        node = np.arange(rows*cols, dtype=np.int32).reshape(rows, cols)
+        p = [np.broadcast_to(q, real[:, 1:, 1:].shape)
+             for q in (node[:-1, :-1], node[:-1, 1:], node[1:, :-1], node[1:, 1:])]
+        r = (real[:, :-1, :-1], real[:, :-1, 1:], real[:, 1:, :-1], real[:, 1:, 1:])
+        i, j, k = cell_triangles(*p, *r)
+        # triangles of each well, in well order
+        count = r[0].astype(np.int8) + r[1] + r[2] + r[3]
+        bounds = np.concatenate(([0], np.cumsum(2*np.count_nonzero(count >= 3, axis=(1,2)))))
+        x, y = X.ravel(), Y.ravel()
+        meshes = [{'x': x, 'y': y, 'z': ZM[w].ravel(),
+                   'i': i[bounds[w]:bounds[w+1]],
+                   'j': j[bounds[w]:bounds[w+1]],
+                   'k': k[bounds[w]:bounds[w+1]],
+                   'intensity': Contour_ValM[w].ravel()} for w in range(num_contour)]
+    else:
+        meshes = [lod_mesh(X, Y, ZM[w], Contour_ValM[w], max_vertices=max_vertices)
+                  for w in range(num_contour)]
 
-                azim=azim, elev=elev, # view angle
-                show=0, # immediately show the plot
+    fig.add_traces([contour_trace(meshes[w], name_list[w],
+                                  showscale=showscale, showlegend=showlegend,
+                                  cmin=cmin[w], cmax=cmax[w]) for w in range(num_contour)])
+    update_contour_layout(fig, X, Y, width=width, height=height, margin=margin,
+                          azim=azim, elev=elev)
 
-                plotz=plotz+i*0.1, # plot on different planes
-                ) 
-    
     if show == 1 and fig is not None:
         fig.show()
 
     return fig
 
 
+#################################################################
+#################################################################
+# %%
+def RefineContour(X, Y, Contour_Val, fig,
+                  xlim, ylim, # [min, max] window to show at full resolution
+                  name=None, # name of the level of detail contour in fig, default: the last Mesh3d
+                  show=1, # immediately show the plot
+                  dz=0.05): # plot the refined window slightly above the contour
+    """
+    Add the full-resolution contour of a window on top of a level of detail
+    contour (PlotContour(..., max_vertices=...)), with the same color scale.
+    """
+    X, Y, Contour_Val = (np.asarray(a, dtype=np.float64) for a in (X, Y, Contour_Val))
+    if X.ndim==1: # if X is 1D array, convert it to 2D array
+        n2=np.sum(Y==Y[0])
+        n1=Y.shape[0]//n2
+        X=X.reshape(n1,n2)
+        Y=Y.reshape(n1,n2)
+        Contour_Val=Contour_Val.reshape(n1,n2)
+
+    traces = [t for t in fig.data if t.type == 'mesh3d' and (name is None or t.name == name)]
+    if not traces:
+        print(f"no contour named {name} in the figure")
+        return fig
+    base = traces[-1]
+
+    # grid rows/columns in the window, plus one node around it
+    cols = np.flatnonzero((X[0] >= xlim[0]) & (X[0] <= xlim[1]))
+    rows = np.flatnonzero((Y[:, 0] >= ylim[0]) & (Y[:, 0] <= ylim[1]))
+    if cols.size == 0 or rows.size == 0:
+        print("no grid node in the window")
+        return fig
+    r = slice(max(rows[0]-1, 0), rows[-1]+2)
+    c = slice(max(cols[0]-1, 0), cols[-1]+2)
+
+    plotz = np.nanmax(base.z) + dz
+    return PlotContour(X[r, c], Y[r, c], Contour_Val[r, c],
+                       fig=fig,
+                       name=f'{base.name} (refined)',
+                       width=fig.layout.width, height=fig.layout.height,
+                       showlegend=False,
+                       legendgroup=base.legendgroup,
+                       cmin=base.cmin, cmax=base.cmax,
+                       show=show,
+                       plotz=plotz)
+
+
 #################################################################
 #################################################################
 # %%
@@ -358,7 +470,7 @@ def surface2mesh3d(X, Y, Z, C=None, dense=1):
     return:
         dict:
             x, y, z: coordinate location
-            i, j, k: triangle indices
+            i, j, k: triangle indices, int32 arrays (2 triangles per cell)
             intensity: color at each node
     """
     import numpy as np
@@ -423,47 +535,27 @@ def surface2mesh3d(X, Y, Z, C=None, dense=1):
     # default color C=z
     intensity = C_Dense.ravel() if C_Dense is not None else z
 
-    # build triangle indices
-    i, j, k = [], [], []
-    for r in range(rows - 1):
-        for c in range(cols - 1):
-            p0 = r * cols + c
-            p1 = p0 + 1
-            p2 = p0 + cols
-            p3 = p2 + 1
-
-            """
-            p0rc - - p0c - - p1c - - p1rc
-             |        |       |       |
-             |        |       |       |
-            p0r - - - 0 - - - 1 - - - p1r  
-             |        |       |       |
-             |        |       |       |
-            p2r - - - 2 - - - 3 - - - p3r
-             |        |       |       |
-             |        |       |       |
-            p2rc - - p2c - - p3c - - p3rc
-            """
-            # number of real values in the 4 points
-            count = np.count_nonzero(~np.isnan(z[[p0,p1,p2,p3]]))
-            if count>=3:
-                # clockwise or anticlockwise of the 3 points matters a lot!
-                # clockwise
-                if not np.isnan(z[p0]) and not np.isnan(z[p3]):
-                    # separated by 0--3 
-                    # two triangles: (p0, p1, p3), (p0, p3, p2)
-                    i += [p0, p0]
-                    j += [p1, p3]
-                    k += [p3, p2]
-                else: 
-                    # separated 1--2 
-                    # two triangles: (p1, p3，p2), (p0, p1, p2)
-                    i += [p1, p0]
-                    j += [p3, p1]
-                    k += [p2, p2]
-            elif count == 2:
-                # try Obtuse triangle？
-                pass
+    # build triangle indices, for all cells at once
+    """
+    p0rc - - p0c - - p1c - - p1rc
+     |        |       |       |
+     |        |       |       |
+    p0r - - - 0 - - - 1 - - - p1r  
+     |        |       |       |
+     |        |       |       |
+    p2r - - - 2 - - - 3 - - - p3r
+     |        |       |       |
+     |        |       |       |
+    p2rc - - p2c - - p3c - - p3rc
+    """
+    node = np.arange(rows*cols, dtype=np.int32).reshape(rows, cols)
+    p0 = node[:-1, :-1]
+    p1 = node[:-1, 1:]
+    p2 = node[1:, :-1]
+    p3 = node[1:, 1:]
+    real = ~np.isnan(z.reshape(rows, cols))
+    i, j, k = cell_triangles(p0, p1, p2, p3,
+                             real[:-1, :-1], real[:-1, 1:], real[1:, :-1], real[1:, 1:])
 
     return {
         'x': x,
@@ -474,3 +566,119 @@ def surface2mesh3d(X, Y, Z, C=None, dense=1):
         'k': k,
         'intensity': intensity
     }
+
+
+def cell_triangles(p0, p1, p2, p3, r0, r1, r2, r3):
+    """
+    Triangles of quad cells with corners p0 p1 (top) p2 p3 (bottom), see surface2mesh3d.
+    p0..p3: node indices, r0..r3: True if the node value is real, arrays of the same shape
+
+    return: i, j, k int32 arrays, 2 triangles per cell with >= 3 real corners
+    """
+    # number of real values in the 4 points
+    count = r0.astype(np.int8) + r1 + r2 + r3
+    cell = count >= 3 # count == 2: try Obtuse triangle？
+    # clockwise or anticlockwise of the 3 points matters a lot!
+    # clockwise
+    # p0, p3 real: separated by 0--3, two triangles: (p0, p1, p3), (p0, p3, p2)
+    # else: separated 1--2, two triangles: (p1, p3，p2), (p0, p1, p2)
+    diag03 = (r0 & r3)[cell]
+    p0, p1, p2, p3 = (np.asarray(p, dtype=np.int32)[cell] for p in (p0, p1, p2, p3))
+    # (cells, 2): the two triangles of each cell, in the same order as the cells
+    i = np.column_stack((np.where(diag03, p0, p1), p0)).ravel()
+    j = np.column_stack((np.where(diag03, p1, p3), np.where(diag03, p3, p1))).ravel()
+    k = np.column_stack((np.where(diag03, p3, p2), p2)).ravel()
+    return i, j, k
+
+
+#################################################################
+#################################################################
+# %%
+def lod_mesh(X, Y, Z, C, max_vertices=20000):
+    """
+    Level of detail version of surface2mesh3d for large contours:
+    the grid is split in s x s blocks, and only as many blocks as the vertex budget
+    allows keep all their nodes, the others are drawn as one coarse cell between
+    their corner nodes. Blocks are refined in this order, alternating:
+        blocks on a NaN boundary (partly NaN), lowest cost first
+        blocks without NaN, lowest cost first (the minimum-cost region)
+    Blocks entirely NaN are dropped.
+    The contour is flat (Z = plotz), so coarse and fine cells join without gaps.
+    Every vertex is an original grid node, with its full-resolution cost.
+
+    parameter:
+        X, Y, Z, C: 2D numpy arrays as surface2mesh3d, np.nan in Z and C corresponding
+        max_vertices: target number of vertices
+
+    return:
+        dict as surface2mesh3d, only the used vertices, plus
+            'node': (vertices,) index of each vertex in the flattened grid
+            'block': block size s
+    """
+    rows, cols = X.shape
+    if rows*cols <= max_vertices or rows < 3 or cols < 3:
+        mesh = surface2mesh3d(X, Y, Z, C=C)
+        mesh.update(node=np.arange(rows*cols), block=1)
+        return mesh
+
+    # block size: the coarse lattice takes at most half of the budget
+    s = 2
+    while (np.ceil((rows-1)/s) + 1)*(np.ceil((cols-1)/s) + 1) > max_vertices/2 and s < max(rows, cols):
+        s *= 2
+    rb = np.append(np.arange(0, rows-1, s), rows-1) # lattice rows
+    cb = np.append(np.arange(0, cols-1, s), cols-1) # lattice columns
+    h, w = np.diff(rb), np.diff(cb) # block size in cells
+
+    real = ~np.isnan(Z)
+    cost = np.where(real, C, np.inf)
+    # per cell, then per block (cells rb[b]..rb[b+1]-1)
+    c_any = real[:-1, :-1] | real[:-1, 1:] | real[1:, :-1] | real[1:, 1:]
+    c_all = real[:-1, :-1] & real[:-1, 1:] & real[1:, :-1] & real[1:, 1:]
+    c_min = np.minimum(np.minimum(cost[:-1, :-1], cost[:-1, 1:]), np.minimum(cost[1:, :-1], cost[1:, 1:]))
+    def block_reduce(ufunc, a):
+        return ufunc.reduceat(ufunc.reduceat(a, rb[:-1], axis=0), cb[:-1], axis=1)
+    b_any = block_reduce(np.logical_or, c_any)
+    b_all = block_reduce(np.logical_and, c_all)
+    b_min = block_reduce(np.minimum, c_min)
+
+    # refinement order, alternating boundary and low-cost blocks
+    boundary = (b_any & ~b_all).ravel()
+    inner = b_all.ravel()
+    rank = np.full(boundary.size, np.inf)
+    for group, offset in ((boundary, 0), (inner, 1)):
+        idx = np.flatnonzero(group)
+        rank[idx[np.argsort(b_min.ravel()[idx], kind="stable")]] = 2*np.arange(idx.size) + offset
+    order = np.argsort(rank, kind="stable")[:np.count_nonzero(np.isfinite(rank))]
+    # extra nodes of a refined block: its nodes minus the 4 corners
+    extra = ((h[:, None] + 1)*(w[None, :] + 1) - 4).ravel()
+    budget = max_vertices - len(rb)*len(cb)
+    refined = np.zeros(boundary.size, dtype=bool)
+    refined[order[np.cumsum(extra[order]) <= budget]] = True
+    refined = refined.reshape(len(h), len(w))
+
+    node = np.arange(rows*cols).reshape(rows, cols)
+    # fine cells, in refined blocks
+    fine = np.repeat(np.repeat(refined, h, axis=0), w, axis=1)
+    p = (node[:-1, :-1][fine], node[:-1, 1:][fine], node[1:, :-1][fine], node[1:, 1:][fine])
+    tri_fine = cell_triangles(*p, *(real.ravel()[q] for q in p))
+    # coarse cells, one per other block (entirely NaN blocks have no real corner)
+    coarse = ~refined & b_any
+    B = node[np.ix_(rb, cb)]
+    p = (B[:-1, :-1][coarse], B[:-1, 1:][coarse], B[1:, :-1][coarse], B[1:, 1:][coarse])
+    tri_coarse = cell_triangles(*p, *(real.ravel()[q] for q in p))
+
+    i, j, k = (np.concatenate((a, b)) for a, b in zip(tri_fine, tri_coarse))
+    # keep the used vertices only
+    used = np.unique(np.concatenate((i, j, k)))
+    i, j, k = (np.searchsorted(used, a).astype(np.int32) for a in (i, j, k))
+    return {
+        'x': X.ravel()[used],
+        'y': Y.ravel()[used],
+        'z': Z.ravel()[used],
+        'i': i,
+        'j': j,
+        'k': k,
+        'intensity': C.ravel()[used],
+        'node': used,
+        'block': s,
+    }
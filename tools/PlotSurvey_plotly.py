@@ -2,18 +2,24 @@
 plot discretized trajectory.
 
 Input:
-survey: dict or pandas DataFrame
+survey: dict, pandas DataFrame, (m, 4~7) array [X, Y, Z, MD, (INCL, AZ, DLS)],
+        or structured array (tools.survey_store)
 
 fig: fig handle for the plot
 
 show: if show==1, show the figure right now
       else, wait for futher plots
+
+PlotSurveys: many wells in one trace (NaN separators), layout set once,
+             optional decimation for display
 """
 
 import plotly.graph_objects as plt
 import numpy as np
 import pandas as pd
 
+from tools.survey_store import SurveyStore, normalize, survey_array
+
 def PlotSurvey(survey, 
                     fig=None,
                     name= None, # name of the trajectory in the plot
@@ -41,37 +47,10 @@ def PlotSurvey(survey,
     if legendgroup is None:
         legendgroup = name
 
-    # format survey data to numpy array [X, Y, Z, MD...]
-    if isinstance(survey, pd.DataFrame) or isinstance(survey, dict):
-        try:
-            survey_array = np.array([survey['X'], survey['Y'], survey['Z'], survey['MD']]).T
-        except:
-            survey_array = np.array([survey['EAST'], survey['NORTH'], survey['TVD'], survey['MD']]).T
-        assert survey_array.shape[1] == 4, "Survey data must contain at least X, Y, Z, and MD columns."
-
-        inclination_keys = ['INCL', 'Inclination', 'Incl',  'Inc', 'incl']
-        for key in inclination_keys:
-            if key in survey:
-                survey_array = np.column_stack((survey_array, survey[key]))
-                break
-
-        azimuth_keys = ['AZ', 'Azimuth', 'Az', 'AZIM', 'Azi', 'azi', 'AZIM_GN']
-        for key in azimuth_keys:
-            if key in survey:
-                survey_array = np.column_stack((survey_array, survey[key]))
-                break
-        
-        dls_keys = ['DLS', 'dls', 'Dls', 'dls_deg', 'DLS_deg']
-        for key in dls_keys:
-            if key in survey:
-                survey_array = np.column_stack((survey_array, survey[key]))
-        
-        # re-assign survey
-        if survey_array.shape[1] >= 4:
-            survey=survey_array
-        else:
-            # Keep only X, Y, Z, MD if no Inclination, Azimuth, or DLS data
-            survey=survey_array[:, :4]  
+    # format survey data to numpy array [X, Y, Z, MD, (INCL, AZ, DLS)]
+    # the column names (X/EAST, INCL/Inclination, AZ/AZIM_GN, ...) are resolved in survey_store
+    if isinstance(survey, (pd.DataFrame, dict)) or survey.dtype.names is not None:
+        survey = survey_array(normalize(survey))
 
     # use survey np.ndarray to plot
     if type(survey) == np.ndarray:
@@ -104,6 +83,109 @@ def PlotSurvey(survey,
 
     # ========================================================================================
     # ========================================================================================
+    update_survey_layout(fig, survey[:, 0], survey[:, 1], width=width, height=height,
+                         margin=margin, azim=azim, elev=elev)
+
+    # show fig or preserve it for further modification
+    if show == 1:
+        fig.show()
+
+    return fig
+
+# ###############################################################
+def PlotSurveys(surveys, # list of surveys (any format PlotSurvey takes), or a SurveyStore
+                fig=None,
+                name='Offset Wells', # legend name of the trace
+                style='k-', # line style of all wells
+                linewidth=1.5,
+                tol=None, # m, decimate each well for display (see tools.decimate), None: all nodes
+                width=600, height=450, # fig size
+                margin=[10,10,10,10], # [left, top, right, bottom]
+                showlegend=True,
+                legendgroup=None,
+                azim=-135, elev=20, # view angle
+                show=1): # show fig immediately
+    """
+    Plot many wells as one Scatter3d trace: the wells are joined with NaN
+    separators (no line is drawn across), and the hover shows each node's well
+    index (in surveys), MD, inclination, azimuth and DLS from customdata.
+    The layout is set once, from the extents of all wells.
+
+    For wells that need their own legend entry or style, call it once per group.
+    """
+    from tools.decimate import decimate_survey
+    if fig is None:
+        fig = plt.Figure()
+    if legendgroup is None:
+        legendgroup = name
+    wells = (well for _, well in surveys) if isinstance(surveys, SurveyStore) \
+        else (normalize(survey) for survey in surveys)
+
+    # wells -> one [X, Y, Z] and one [MD, INCL, AZ, DLS, well] block, NaN row between wells
+    xyz, custom = [], []
+    for w, well in enumerate(wells):
+        if tol is not None and well.shape[0] > 2:
+            nodes = np.column_stack([well["X"], well["Y"], well["Z"], well["MD"]])
+            incl, az = well["INCL"], well["AZ"]
+            has_angles = not (np.isnan(incl).any() or np.isnan(az).any())
+            _, info = decimate_survey(nodes, tol=tol, incl=incl if has_angles else None,
+                                      az=az if has_angles else None)
+            well = well[info["kept"]]
+        block = np.empty((well.shape[0] + 1, 3))
+        block[:-1, 0], block[:-1, 1], block[:-1, 2] = well["X"], well["Y"], well["Z"]
+        block[-1] = np.nan
+        xyz.append(block)
+        cd = np.full((well.shape[0] + 1, 5), np.nan, dtype=np.float32)
+        for j, col in enumerate(("MD", "INCL", "AZ", "DLS")):
+            cd[:-1, j] = well[col]
+        cd[:, 4] = w
+        custom.append(cd)
+    if not xyz:
+        return fig
+    xyz = np.concatenate(xyz)[:-1] # no separator after the last well
+    custom = np.concatenate(custom)[:-1]
+
+    hovertemplate = "Well %{customdata[4]}<br>East: %{x:.2f}<br>North: %{y:.2f}<br>Depth: %{z:.2f}" + \
+        "<extra>MD: %{customdata[0]:.2f}"
+    if not np.isnan(custom[:, 1]).all():
+        hovertemplate += "<br>Inclination: %{customdata[1]:.2f}°"
+    if not np.isnan(custom[:, 2]).all():
+        hovertemplate += "<br>Azimuth: %{customdata[2]:.2f}°"
+    if not np.isnan(custom[:, 3]).all():
+        hovertemplate += "<br>DLS: %{customdata[3]:.2f}°/30m "
+    hovertemplate += "</extra>"
+
+    fig.add_trace(plt.Scatter3d(
+        x=xyz[:, 0],
+        y=xyz[:, 1],
+        z=xyz[:, 2],
+        name=name,
+        customdata=custom,
+        mode='lines',
+        line=style_map(style, linewidth),
+        connectgaps=False,
+        hovertemplate=hovertemplate,
+        showlegend=bool(showlegend),
+        legendgroup=legendgroup,
+        ))
+
+    update_survey_layout(fig, xyz[:, 0], xyz[:, 1], width=width, height=height,
+                         margin=margin, azim=azim, elev=elev)
+
+    # show fig or preserve it for further modification
+    if show == 1:
+        fig.show()
+
+    return fig
+
+# ###############################################################
+def update_survey_layout(fig, F_x, F_y, # x, y of the new survey node(s), NaN ignored
+                         width=600, height=450, # fig size
+                         margin=[10,10,10,10], # [left, top, right, bottom]
+                         azim=-135, elev=20): # view angle
+    """
+    Axes, X/Y ranges covering F_x, F_y and the existing ranges, legend and view angle.
+    """
     # Basic layout
     fig.update_layout(
         scene = dict( xaxis=dict(title='X (East, m)',),
@@ -120,21 +202,21 @@ def PlotSurvey(survey,
         )
     
     # Ensure equal aspect ratio for X and Y axes
-    F_x = survey[:, 0]
-    F_y = survey[:, 1]
-    x_range = max(F_x)-min(F_x)
-    y_range = max(F_y)-min(F_y)
+    x_min, x_max = float(np.nanmin(F_x)), float(np.nanmax(F_x))
+    y_min, y_max = float(np.nanmin(F_y)), float(np.nanmax(F_y))
+    x_range = x_max-x_min
+    y_range = y_max-y_min
     if fig.layout.scene.xaxis.range is None: # for new fig
-        x_limits = [min(F_x), max(F_x)]
+        x_limits = [x_min, x_max]
     else: # for existing fig
-        x_limits = [min(min(F_x)-0.1*x_range, min(fig.layout.scene.xaxis.range)), 
-                    max(max(F_x)+0.1*x_range, max(fig.layout.scene.xaxis.range))]
+        x_limits = [min(x_min-0.1*x_range, min(fig.layout.scene.xaxis.range)), 
+                    max(x_max+0.1*x_range, max(fig.layout.scene.xaxis.range))]
 
     if fig.layout.scene.yaxis.range is None: # for new fig
-        y_limits = [min(F_y), max(F_y)]
+        y_limits = [y_min, y_max]
     else: # for existing fig
-        y_limits = [min(min(F_y)-0.1*y_range, min(fig.layout.scene.yaxis.range)), 
-                    max(max(F_y)+0.1*y_range, max(fig.layout.scene.yaxis.range))]
+        y_limits = [min(y_min-0.1*y_range, min(fig.layout.scene.yaxis.range)), 
+                    max(y_max+0.1*y_range, max(fig.layout.scene.yaxis.range))]
         
     
     x_ratio=float((x_limits[1]-x_limits[0])/(y_limits[1]-y_limits[0]))
@@ -180,10 +262,6 @@ def PlotSurvey(survey,
         )
 
 
-    # show fig or preserve it for further modification
-    if show == 1:
-        fig.show()
-
     return fig
 
 # ###############################################################
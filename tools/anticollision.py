@@ -0,0 +1,137 @@
+"""
+local anticollision check of a returned trajectory against offset wells.
+
+For every offset node, the nearest point on the new trajectory polyline is found
+with a KD-tree over the trajectory nodes: a point of a segment closer than the
+nearest node is within (nearest node distance + segment length) of the segment
+start, so the node is projected on every segment starting that close (MD is
+interpolated there). The offset wells are taken at their nodes; the server also
+interpolates between them at times, so its Danger_Point_Offset may lie between two
+offset nodes (0.4 m closer on the Demos/get_1well/ex2 well 2).
+The safe distance of the pair is
+    SF * (safeDist_offset(md_offset) + safeDist_new(md_new))
+and the margin is centre-to-centre distance - safe distance.
+
+The report has the same shape as the server's AnticolReport, one dict per offset
+well, at the pair of points with the smallest margin:
+    Danger_Distance: centre-to-centre distance (m)
+    Minimum_Safe_Distance: safe distance at these points (m)
+    Danger_Point_Offset, Danger_Point_New: [x, y, z]
+    Margin: Danger_Distance - Minimum_Safe_Distance, < 0 means collision risk
+
+Usage:
+    report = check_anticol_con(output["data"]["Trajectories"][0], anticol_con)
+    pd.DataFrame(report)
+"""
+import numpy as np
+from scipy.spatial import cKDTree
+
+from tools.expressions import eval_md_expr
+
+
+def _trajectory_arrays(trajectory):
+    # dict from the response, Trajectory (tools.results), or (m, 4) [x, y, z, MD] array
+    if isinstance(trajectory, np.ndarray):
+        return trajectory[:, :3].astype(np.float64), trajectory[:, 3].astype(np.float64)
+    xyz = np.column_stack([np.asarray(trajectory[k], dtype=np.float64) for k in ('X', 'Y', 'Z')])
+    return xyz, np.asarray(trajectory['MD'], dtype=np.float64)
+
+
+# %%
+# *********************************************************************
+def nearest_on_trajectory(P, xyz, md, tree=None):
+    """
+    Nearest point on the trajectory polyline (xyz, md) for each point in P (k, 3).
+
+    return: distance (k,), nearest point (k, 3), MD at the nearest point (k,)
+    """
+    if tree is None:
+        tree = cKDTree(xyz)
+    m = xyz.shape[0]
+    if m == 1:
+        return np.linalg.norm(P - xyz[0], axis=1), np.repeat(xyz[:1], len(P), axis=0), np.full(len(P), md[0])
+    d_node, _ = tree.query(P, k=1)
+
+    # candidate (point, segment) pairs: segments starting within d_node + the longest segment
+    L = np.linalg.norm(np.diff(xyz, axis=0), axis=1)
+    near = tree.query_ball_point(P, d_node + L.max(), return_sorted=False)
+    point = np.repeat(np.arange(len(P)), [len(a) for a in near])
+    a = np.concatenate([np.asarray(a, dtype=np.intp) for a in near])
+    point, a = point[a < m-1], a[a < m-1] # the last node starts no segment
+
+    A, AB = xyz[a], xyz[a+1] - xyz[a]
+    L2 = L[a]**2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = np.where(L2 > 0, np.einsum("ij,ij->i", P[point] - A, AB)/L2, 0.0)
+    t = np.clip(t, 0.0, 1.0)
+    Q = A + t[:, None]*AB
+    d = np.linalg.norm(P[point] - Q, axis=1)
+
+    # the nearest pair of each point (the segments around its nearest node are always in)
+    order = np.lexsort((d, point))
+    first = order[np.unique(point[order], return_index=True)[1]]
+    return d[first], Q[first], md[a[first]] + t[first]*(md[a[first]+1] - md[a[first]])
+
+
+def check_anticollision(trajectory, # new well trajectory
+                        Nodes_offset_list, # list of (?, 4) arrays [x, y, z, MD]
+                        safeDist_offset_f_list=None, # list of str expressions of md (or numbers)
+                        safeDist_new_f_list=None,
+                        SF_list=None,
+                        ):
+    """
+    return: list of dict per offset well, same keys as AnticolReport plus Margin
+    """
+    xyz, md = _trajectory_arrays(trajectory)
+    tree = cKDTree(xyz)
+    n_off = len(Nodes_offset_list)
+    safeDist_offset_f_list = [0.0]*n_off if safeDist_offset_f_list is None else safeDist_offset_f_list
+    safeDist_new_f_list = [0.0]*n_off if safeDist_new_f_list is None else safeDist_new_f_list
+    SF_list = [1.0]*n_off if SF_list is None else SF_list
+
+    # all offset nodes in one query
+    nodes_list = [np.asarray(nodes, dtype=np.float64) for nodes in Nodes_offset_list]
+    nodes = np.concatenate(nodes_list, axis=0)
+    dist, Q, md_new = nearest_on_trajectory(nodes[:, :3], xyz, md, tree=tree)
+    bounds = np.cumsum([0] + [n.shape[0] for n in nodes_list])
+
+    report = []
+    for w in range(n_off):
+        s = slice(bounds[w], bounds[w+1])
+        safe = SF_list[w]*(eval_md_expr(safeDist_offset_f_list[w], nodes[s, 3]) +
+                           eval_md_expr(safeDist_new_f_list[w], md_new[s]))
+        margin = dist[s] - safe
+        k = int(np.argmin(margin))
+        report.append({
+            "Danger_Distance": float(dist[s][k]),
+            "Minimum_Safe_Distance": float(safe[k]),
+            "Danger_Point_Offset": nodes[s][k, :3].tolist(),
+            "Danger_Point_New": Q[s][k].tolist(),
+            "Margin": float(margin[k]),
+        })
+    return report
+
+
+def check_anticol_con(trajectory, anticol_con):
+    """
+    Same as check_anticollision, with the anticol_con dict given to input2json.
+    """
+    return check_anticollision(trajectory,
+                               anticol_con["Nodes_offset_list"],
+                               anticol_con.get("safeDist_offset_f_list"),
+                               anticol_con.get("safeDist_new_f_list"),
+                               anticol_con.get("SF_list"))
+
+
+def distance_profile(trajectory, Nodes_offset_list):
+    """
+    Minimum centre-to-centre distance to any offset well along the new well's MD.
+
+    return: MD (m,), distance (m,), offset well index of the nearest node (m,)
+    """
+    xyz, md = _trajectory_arrays(trajectory)
+    nodes_list = [np.asarray(nodes, dtype=np.float64) for nodes in Nodes_offset_list]
+    well = np.repeat(np.arange(len(nodes_list)), [n.shape[0] for n in nodes_list])
+    offset_tree = cKDTree(np.concatenate(nodes_list, axis=0)[:, :3])
+    dist, k = offset_tree.query(xyz, k=1)
+    return md, dist, well[k]
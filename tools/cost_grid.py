@@ -0,0 +1,243 @@
+"""
+regular cost grid from the CostASite / CostNWells contours.
+
+The API returns a contour as flat X, Y, cost lists (X varies fastest). The grid
+is detected once and stored as
+    origin: (x0, y0), location of node [0, 0]
+    step: (dx, dy)
+    shape: (ny, nx)
+    cost: float32 (ny, nx), or (n, ny, nx) for one contour per well, NaN where infeasible
+    valid: bool, ~np.isnan(cost), computed when used (a memory-mapped cost isn't read at load)
+and answers vectorized queries:
+    lookup(x, y): bilinear cost at arbitrary points (NaN outside or next to NaN)
+    topk(k): k lowest-cost nodes
+    argmin(exclude): lowest-cost node outside excluded regions (see exclusion_mask)
+    save(path) / CostContour.load(path, mmap=1): .npy cost + .json grid metadata
+
+Usage:
+    grid = CostContour.from_dict(output["data"]["CostASite"]) # or result.cost_a_site.grid()
+    grid.lookup([516250, 516420], [6782310, 6782450])
+    exclude = grid.exclusion_mask(circles=[(516500, 6782400, 300)])
+    x, y, cost = grid.argmin(exclude)
+"""
+import json
+import os
+
+import numpy as np
+
+
+# %%
+# *********************************************************************
+class CostContour:
+    def __init__(self,
+                 origin, # (x0, y0)
+                 step, # (dx, dy)
+                 cost, # (ny, nx) or (n, ny, nx)
+                 ):
+        self.origin = (float(origin[0]), float(origin[1]))
+        self.step = (float(step[0]), float(step[1]))
+        self.cost = cost if isinstance(cost, np.memmap) else np.asarray(cost, dtype=np.float32)
+        self.shape = self.cost.shape[-2:]
+
+    @classmethod
+    def from_nodes(cls, X, Y, cost):
+        """
+        From flat grid nodes X, Y (m,) and cost (m,) or (n, m), in any node order.
+        Raises ValueError if the nodes are not a full regular grid, or if there is no
+        cost for each node (e.g. an empty CostNWells cost with getContours=0).
+        """
+        X = np.asarray(X, dtype=np.float64).ravel()
+        Y = np.asarray(Y, dtype=np.float64).ravel()
+        cost = np.array(cost, dtype=np.float64) # None (null) -> nan
+        if cost.size == 0:
+            raise ValueError("the contour has no cost values (getContours=0?)")
+        if cost.shape[-1] != X.size or Y.size != X.size:
+            raise ValueError(f"cost of shape {cost.shape} for {X.size} X and {Y.size} Y nodes")
+        x, y = np.unique(X), np.unique(Y)
+        nx, ny = x.size, y.size
+        if nx < 2 or ny < 2 or nx*ny != X.size:
+            raise ValueError(f"{X.size} nodes are not a full regular grid ({nx} x, {ny} y)")
+        dx, dy = (x[-1] - x[0])/(nx - 1), (y[-1] - y[0])/(ny - 1)
+        if not (np.allclose(np.diff(x), dx, rtol=1e-6) and np.allclose(np.diff(y), dy, rtol=1e-6)):
+            raise ValueError("the grid spacing is not uniform")
+
+        ix = np.rint((X - x[0])/dx).astype(np.intp)
+        iy = np.rint((Y - y[0])/dy).astype(np.intp)
+        grid = np.full(cost.shape[:-1] + (ny, nx), np.nan, dtype=np.float32)
+        grid[..., iy, ix] = cost
+        return cls((x[0], y[0]), (dx, dy), grid)
+
+    @classmethod
+    def from_dict(cls, contour): # {"X": [...], "Y": [...], "cost": [...]}
+        return cls.from_nodes(contour["X"], contour["Y"], contour["cost"])
+
+    @classmethod
+    def from_contour(cls, contour): # tools.results.Contour
+        if contour.cost is None:
+            raise ValueError("the contour has no cost values (getContours=0?)")
+        return cls.from_nodes(contour.X, contour.Y, contour.cost)
+
+    # ==================================================================================
+    @property
+    def valid(self): # bool, shape of cost, not NaN
+        return ~np.isnan(self.cost)
+
+    @property
+    def x(self): # (nx,) node x
+        return self.origin[0] + self.step[0]*np.arange(self.shape[1])
+
+    @property
+    def y(self): # (ny,) node y
+        return self.origin[1] + self.step[1]*np.arange(self.shape[0])
+
+    @property
+    def X(self): # (ny, nx), as np.meshgrid, for PlotContour
+        return np.broadcast_to(self.x, self.shape)
+
+    @property
+    def Y(self):
+        return np.broadcast_to(self.y[:, None], self.shape)
+
+    def well(self, w):
+        """
+        CostContour of well w, for one contour per well.
+        """
+        return CostContour(self.origin, self.step, self.cost[w])
+
+    def node_xy(self, index):
+        # flat node index (of the (ny, nx) grid) -> x, y
+        iy, ix = np.unravel_index(index, self.shape)
+        return self.origin[0] + self.step[0]*ix, self.origin[1] + self.step[1]*iy
+
+    # ==================================================================================
+    def lookup(self, x, y):
+        """
+        Bilinear cost at the points (x, y), arrays of any (same) shape.
+        NaN outside the grid, or if one of the 4 surrounding nodes is NaN.
+
+        return: cost, float64, shape of x (or (n,) + shape of x)
+        """
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        ny, nx = self.shape
+        fx = (x - self.origin[0])/self.step[0]
+        fy = (y - self.origin[1])/self.step[1]
+        inside = (fx >= 0) & (fx <= nx - 1) & (fy >= 0) & (fy <= ny - 1)
+        ix = np.clip(np.floor(fx), 0, nx - 2).astype(np.intp)
+        iy = np.clip(np.floor(fy), 0, ny - 2).astype(np.intp)
+        tx = np.where(inside, fx - ix, 0.0)
+        ty = np.where(inside, fy - iy, 0.0)
+
+        c = self.cost
+        value = 0.0
+        for dy_, dx_, w in ((0, 0, (1 - tx)*(1 - ty)), (0, 1, tx*(1 - ty)),
+                            (1, 0, (1 - tx)*ty), (1, 1, tx*ty)):
+            # a NaN node only counts if it has some weight (exact node lookups stay valid)
+            value = value + np.where(w > 0, w*c[..., iy+dy_, ix+dx_], 0.0)
+        return np.where(inside, value, np.nan)
+
+    def topk(self, k=10, exclude=None):
+        """
+        k lowest-cost nodes (of a single contour), lowest first.
+        exclude: (ny, nx) bool, nodes that can't be used
+
+        return: x, y, cost (k,) arrays
+        """
+        cost = self._masked(exclude)
+        k = min(k, int(np.isfinite(cost).sum()))
+        if k == 0:
+            return np.empty(0), np.empty(0), np.empty(0)
+        idx = np.argpartition(cost, k-1)[:k]
+        idx = idx[np.argsort(cost[idx], kind="stable")]
+        x, y = self.node_xy(idx)
+        return x, y, cost[idx].astype(np.float64)
+
+    def argmin(self, exclude=None):
+        """
+        Lowest-cost node (of a single contour) outside the excluded nodes.
+
+        return: x, y, cost; None if no node is available
+        """
+        cost = self._masked(exclude)
+        idx = int(np.argmin(cost))
+        if not np.isfinite(cost[idx]):
+            return None
+        x, y = self.node_xy(idx)
+        return float(x), float(y), float(cost[idx])
+
+    def _masked(self, exclude):
+        if self.cost.ndim != 2:
+            raise ValueError("one contour per well: select one with well(w)")
+        cost = np.asarray(self.cost, dtype=np.float32).ravel()
+        cost = np.where(np.isnan(cost), np.inf, cost)
+        if exclude is not None:
+            cost[np.asarray(exclude, dtype=bool).ravel()] = np.inf
+        return cost
+
+    # ==================================================================================
+    def exclusion_mask(self,
+                       circles=None, # [(x, y, radius), ...]
+                       polygons=None, # [[(x, y), (x, y), ...], ...], closed automatically
+                       ):
+        """
+        (ny, nx) bool, True for nodes inside any circle or polygon.
+        """
+        return exclusion_mask(self.X, self.Y, circles, polygons)
+
+    # ==================================================================================
+    def save(self, path):
+        """
+        Save to path (.npy cost, float32) and the .json next to it (origin, step, shape).
+        """
+        stem = os.path.splitext(path)[0]
+        np.save(stem + ".npy", np.asarray(self.cost, dtype=np.float32))
+        with open(stem + ".json", "w") as f:
+            json.dump({"origin": self.origin, "step": self.step,
+                       "shape": list(self.cost.shape)}, f)
+
+    @classmethod
+    def load(cls, path, mmap=1): # mmap==1: memory-map the cost (read only)
+        stem = os.path.splitext(path)[0]
+        with open(stem + ".json") as f:
+            meta = json.load(f)
+        cost = np.load(stem + ".npy", mmap_mode="r" if mmap == 1 else None)
+        return cls(meta["origin"], meta["step"], cost)
+
+    def __repr__(self):
+        return (f"CostContour(origin={self.origin}, step={self.step}, "
+                f"shape={self.cost.shape}, valid={int(self.valid.sum())})")
+
+
+# %%
+# *********************************************************************
+def exclusion_mask(X, Y, circles=None, polygons=None):
+    """
+    True for the points (X, Y) inside any circle (x, y, radius) or polygon [(x, y), ...].
+    """
+    X = np.asarray(X, dtype=np.float64)
+    Y = np.asarray(Y, dtype=np.float64)
+    mask = np.zeros(np.broadcast_shapes(X.shape, Y.shape), dtype=bool)
+    for cx, cy, r in circles or []:
+        mask |= (X - cx)**2 + (Y - cy)**2 <= r**2
+    for polygon in polygons or []:
+        mask |= inside_polygon(X, Y, polygon)
+    return mask
+
+
+def inside_polygon(X, Y, polygon):
+    """
+    Even-odd rule, vectorized over the points, one pass per polygon edge.
+    polygon: (V, 2) vertices, or (G, V, 2) for G polygons at once (padded by
+    repeating a vertex), then the result has a leading axis G.
+    """
+    P = np.asarray(polygon, dtype=np.float64)
+    shape = np.broadcast_shapes(np.shape(X), np.shape(Y))
+    # (V, G..., 1 per point axis, 2)
+    P = np.moveaxis(P, -2, 0).reshape((P.shape[-2],) + P.shape[:-2] + (1,)*len(shape) + (2,))
+    inside = np.zeros(P.shape[1:-1 - len(shape)] + shape, dtype=bool)
+    for (x1, y1), (x2, y2) in zip(np.moveaxis(P, -1, 1), np.moveaxis(np.roll(P, -1, axis=0), -1, 1)):
+        crosses = (y1 > Y) != (y2 > Y) # never on a horizontal edge
+        with np.errstate(divide="ignore", invalid="ignore"):
+            x_cross = x1 + (Y - y1)*(x2 - x1)/(y2 - y1)
+        inside ^= crosses & (X < x_cross)
+    return inside
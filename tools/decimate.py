@@ -0,0 +1,177 @@
+"""
+geometry-preserving decimation of offset surveys for anticol_con.
+
+Each [x, y, z, MD] survey is reduced to the fewest nodes whose polyline stays
+within `tol` (m) of the original path (3D Douglas-Peucker). The first and last
+nodes are always kept, and the kept nodes keep their original values, so MD
+stays consistent with the full survey.
+
+If inclination and azimuth (degrees) are given, the deviation is also checked at
+the minimum-curvature midpoint of every original survey interval, i.e., against
+the curved well path between stations rather than just the stations.
+
+Usage:
+    anticol_con, report = decimate_anticol_con(anticol_con, tol=1.0)
+    print_report(report)
+"""
+import numpy as np
+
+
+# %%
+# *********************************************************************
+def _segment_distance(P, A, B):
+    """
+    Distance of the points P (m, 3) to the segment A-B.
+    """
+    AB = B - A
+    L2 = AB @ AB
+    if L2 == 0:
+        return np.linalg.norm(P - A, axis=1)
+    t = np.clip((P - A) @ AB / L2, 0.0, 1.0)
+    return np.linalg.norm(P - (A + t[:, None]*AB), axis=1)
+
+
+def min_curvature_midpoints(xyz, MD, incl, az):
+    """
+    Positions at the middle MD of each survey interval, on the minimum-curvature arc.
+    xyz: (m, 3) [East, North, Z], Z upwards (depth is negative)
+    incl, az: (m,) degrees
+
+    return: (m-1, 3)
+    """
+    I = np.radians(incl)
+    A = np.radians(az)
+    # unit tangent, Z upwards
+    t = np.column_stack((np.sin(I)*np.sin(A), np.sin(I)*np.cos(A), -np.cos(I)))
+    t1, t2 = t[:-1], t[1:]
+    dMD = np.diff(MD)
+    beta = np.arccos(np.clip(np.einsum("ij,ij->i", t1, t2), -1.0, 1.0)) # dogleg angle
+    phi = beta/2
+
+    mid = 0.5*(xyz[:-1] + xyz[1:]) # straight interval
+    curved = beta > 1e-9
+    if curved.any():
+        b, p = beta[curved], phi[curved]
+        R = dMD[curved]/b
+        # integral of the slerp tangent from 0 to phi
+        c1 = (np.cos(b - p) - np.cos(b))/np.sin(b)
+        c2 = (1 - np.cos(p))/np.sin(b)
+        mid[curved] = xyz[:-1][curved] + R[:, None]*(c1[:, None]*t1[curved] + c2[:, None]*t2[curved])
+    return mid
+
+
+# %%
+# *********************************************************************
+def decimate_survey(nodes, # (m, 4) [x, y, z, MD]
+                    tol=1.0, # maximum allowed deviation from the original path (m)
+                    incl=None, az=None, # (m,) degrees, optional, for minimum-curvature checks
+                    ):
+    """
+    return:
+        nodes_kept: (k, 4) array
+        info: dict(nodes, nodes_kept, reduction, max_deviation,
+                   kept: (k,) indices of the kept nodes in nodes)
+    """
+    nodes = np.asarray(nodes, dtype=np.float64)
+    m = nodes.shape[0]
+    xyz = nodes[:, :3]
+
+    # points to check for every original interval [i, i+1]:
+    # the station i+1, and optionally the curved midpoint
+    mids = None
+    if incl is not None and az is not None and m > 1:
+        mids = min_curvature_midpoints(xyz, nodes[:, 3], np.asarray(incl, dtype=np.float64),
+                                       np.asarray(az, dtype=np.float64))
+
+    keep = np.zeros(m, dtype=bool)
+    keep[[0, -1]] = True
+    stack = [(0, m-1)] if m > 2 else []
+    while stack:
+        i, j = stack.pop()
+        A, B = xyz[i], xyz[j]
+        d = _segment_distance(xyz[i+1:j], A, B) # stations between i and j
+        k = int(np.argmax(d)) + i + 1 if d.size else None
+        dmax = d.max() if d.size else 0.0
+        if mids is not None:
+            dm = _segment_distance(mids[i:j], A, B) # midpoints of intervals i..j-1
+            if dm.max() > dmax and dm.max() > tol:
+                # split at the station closest to the worst midpoint
+                km = int(np.argmax(dm)) + i
+                k = km + 1 if km + 1 < j else km
+                k = k if i < k < j else None
+                dmax = max(dmax, dm.max())
+        if dmax > tol and k is not None:
+            keep[k] = True
+            stack.append((i, k))
+            stack.append((k, j))
+
+    kept = nodes[keep]
+    info = {"nodes": m,
+            "nodes_kept": int(keep.sum()),
+            "reduction": 1 - keep.sum()/m if m else 0.0,
+            "max_deviation": max_deviation(nodes, kept, mids),
+            "kept": np.flatnonzero(keep)}
+    return kept, info
+
+
+def max_deviation(nodes, kept, mids=None):
+    """
+    Largest distance of the original stations (and midpoints) to the kept polyline.
+    """
+    xyz, kxyz = nodes[:, :3], kept[:, :3]
+    if kxyz.shape[0] < 2:
+        return 0.0
+    # each original node belongs to the kept segment spanning its MD
+    seg = np.clip(np.searchsorted(kept[:, 3], nodes[:, 3], side="right") - 1, 0, kxyz.shape[0]-2)
+    dev = _batch_segment_distance(xyz, kxyz[seg], kxyz[seg+1])
+    if mids is not None and mids.shape[0]:
+        mid_md = 0.5*(nodes[:-1, 3] + nodes[1:, 3])
+        seg = np.clip(np.searchsorted(kept[:, 3], mid_md, side="right") - 1, 0, kxyz.shape[0]-2)
+        dev = np.concatenate((dev, _batch_segment_distance(mids, kxyz[seg], kxyz[seg+1])))
+    return float(dev.max())
+
+
+def _batch_segment_distance(P, A, B):
+    # distance of P[i] to segment A[i]-B[i]
+    AB = B - A
+    L2 = np.einsum("ij,ij->i", AB, AB)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = np.where(L2 > 0, np.einsum("ij,ij->i", P - A, AB)/L2, 0.0)
+    t = np.clip(t, 0.0, 1.0)
+    return np.linalg.norm(P - (A + t[:, None]*AB), axis=1)
+
+
+# %%
+# *********************************************************************
+def decimate_anticol_con(anticol_con, # dict for input2json
+                         tol=1.0, # maximum allowed deviation (m), scalar or one per offset well
+                         incl_list=None, az_list=None, # optional, one array per offset well
+                         ):
+    """
+    Decimate every survey in anticol_con['Nodes_offset_list'].
+
+    return:
+        anticol_con: a new dict, other keys unchanged
+        report: list of dict per offset well (nodes, nodes_kept, reduction, max_deviation, kept)
+    """
+    nodes_list = anticol_con["Nodes_offset_list"]
+    tols = np.broadcast_to(np.asarray(tol, dtype=np.float64), (len(nodes_list),))
+    new_list, report = [], []
+    for w, nodes in enumerate(nodes_list):
+        incl = incl_list[w] if incl_list is not None else None
+        az = az_list[w] if az_list is not None else None
+        kept, info = decimate_survey(nodes, tol=tols[w], incl=incl, az=az)
+        new_list.append(kept)
+        report.append(info)
+    return {**anticol_con, "Nodes_offset_list": new_list}, report
+
+
+def print_report(report):
+    print(f"{'well':>4} {'nodes':>7} {'kept':>6} {'reduction':>10} {'max dev (m)':>12}")
+    for w, info in enumerate(report):
+        print(f"{w:>4} {info['nodes']:>7} {info['nodes_kept']:>6} "
+              f"{info['reduction']*100:>9.1f}% {info['max_deviation']:>12.3f}")
+    total = sum(info["nodes"] for info in report)
+    kept = sum(info["nodes_kept"] for info in report)
+    if total:
+        print(f"{'all':>4} {total:>7} {kept:>6} {(1-kept/total)*100:>9.1f}%")
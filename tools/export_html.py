@@ -0,0 +1,219 @@
+"""
+size-optimized HTML export of the 3D result figures (PlotSurvey, PlotContour, PlotArrow).
+
+fig.write_html embeds every coordinate as a float64 UTM value (e.g. 516437.54758477403)
+and, by default, the whole plotly.js bundle (~4.8 MB). compact_figure makes a copy with
+    local origin: x, y of every trace minus (x0, y0), a round number below the data,
+        so float32 keeps ~1 mm; the axis ticks are relabelled with the real
+        coordinates (tickvals/ticktext), and the hover shows them from two float64
+        columns appended to customdata (%{x} -> %{customdata[c]} in the hovertemplate)
+    quantized values: x, y, z, intensity and customdata rounded to `precision` and
+        stored as float32 (the real x, y of the hover as float64), mesh indices as
+        the smallest unsigned int type
+    binary typed arrays: every array is a NumPy array, so plotly writes it as base64
+        "bdata" instead of JSON number lists
+    no redundant hover data: text / hovertext / customdata not used by the
+        hovertemplate are dropped, and mesh vertices not used by any triangle
+        (the NaN nodes of a contour) are removed
+and export_html writes it, with plotly.js from the CDN by default, and reports the
+figure JSON sizes before/after (plotly.js is the same ~4.8 MB either way, or none
+with the CDN, so the page sizes are not compared).
+
+Usage:
+    report = export_html(fig1, "docs/figure_1site_ex1.html", div_id="plotly-div",
+                         config={"responsive": True})
+"""
+import gzip
+import json
+import time
+
+import numpy as np
+import plotly.graph_objects as go
+
+
+# %%
+# *********************************************************************
+def compact_figure(fig,
+                   origin=None, # (x0, y0) local origin, None: rounded down minimum of the data
+                   precision=0.01, # rounding of the values (m, cost), None: float32 only
+                   round_to=100.0, # the automatic origin is a multiple of round_to
+                   ):
+    """
+    return: new figure (the input figure is not changed)
+    """
+    out = go.Figure(fig)
+    if origin is None:
+        origin = _auto_origin(out, round_to)
+    x0, y0 = float(origin[0]), float(origin[1])
+
+    for trace in out.data:
+        template = trace.hovertemplate if "hovertemplate" in trace else None
+        template = template if isinstance(template, str) else None
+        used = template or ""
+
+        for key in ("text", "hovertext"):
+            if key in trace and _is_array(trace[key]) and f"%{{{key}" not in used:
+                trace[key] = None
+        if "customdata" in trace and trace.customdata is not None and "customdata" not in used:
+            trace.customdata = None
+
+        if trace.type == "mesh3d":
+            _drop_unused_vertices(trace)
+        if not _hover_real_xy(trace, template, precision) and "customdata" in trace \
+                and trace.customdata is not None:
+            custom = np.asarray(trace.customdata)
+            if custom.dtype.kind == "f":
+                trace.customdata = _quantize(custom, precision)
+        for key, shift in (("x", x0), ("y", y0), ("z", 0.0)):
+            if key in trace and _is_array(trace[key]):
+                trace[key] = _quantize(np.asarray(trace[key], dtype=np.float64) - shift, precision)
+        for key in ("intensity", "u", "v", "w"):
+            if key in trace and _is_array(trace[key]):
+                trace[key] = _quantize(np.asarray(trace[key], dtype=np.float64), precision)
+
+    # axes: ranges shifted, ticks labelled with the real coordinates (from the data
+    # extent if the axis has no range)
+    scene = out.layout.scene
+    for axis, key, shift in ((scene.xaxis, "x", x0), (scene.yaxis, "y", y0)):
+        lo, hi = axis.range if axis.range is not None else _extent(fig, key)
+        if not lo <= hi:
+            continue
+        ticks = _nice_ticks(lo, hi)
+        axis.update(tickvals=(ticks - shift).tolist(), ticktext=[f"{t:.0f}" for t in ticks])
+        if axis.range is not None:
+            axis.range = [lo - shift, hi - shift]
+    return out
+
+
+def export_html(fig,
+                filepath,
+                include_plotlyjs="cdn", # "cdn": load plotly.js from the CDN, True: embed it (~4.8 MB)
+                compact=1, # 1: compact_figure first
+                origin=None,
+                precision=0.01,
+                report=1, # 1: print the sizes before/after
+                **kwargs, # passed to write_html, e.g. div_id, config, full_html
+                ):
+    """
+    Write fig to filepath as HTML.
+
+    return: dict of the figure JSON sizes (bytes) and parse times (s) before
+            (full precision) and after
+    """
+    out = compact_figure(fig, origin=origin, precision=precision) if compact == 1 else fig
+    out.write_html(filepath, include_plotlyjs=include_plotlyjs, **kwargs)
+    if report != 1:
+        return None
+    sizes = {"before": _figure_stats(fig.to_json()), "after": _figure_stats(out.to_json())}
+    print_report(sizes, filepath)
+    return sizes
+
+
+def print_report(sizes, name=""):
+    print(f"{name}")
+    print(f"{'':>8} {'figure':>10} {'fig gzip':>10} {'parse':>9}")
+    for key in ("before", "after"):
+        s = sizes[key]
+        print(f"{key:>8} {s['figure']/1024:>8.1f}KB {s['figure_gzip']/1024:>8.1f}KB {s['parse']*1e3:>7.2f}ms")
+
+
+# %%
+# *********************************************************************
+def _figure_stats(figure_json):
+    # size of the figure data, and the time to parse it (proxy of the browser's
+    # load time for the data)
+    tic = time.perf_counter()
+    json.loads(figure_json)
+    parse = time.perf_counter() - tic
+    figure = figure_json.encode("utf-8")
+    return {"figure": len(figure), "figure_gzip": len(gzip.compress(figure, compresslevel=6)),
+            "parse": parse}
+
+
+def _is_array(value):
+    return value is not None and not isinstance(value, str) and np.ndim(value) > 0
+
+
+def _quantize(values, precision):
+    if precision is not None:
+        values = np.round(values/precision)*precision
+    return values.astype(np.float32)
+
+
+def _hover_real_xy(trace, template, precision):
+    # append the real x, y to customdata, and hover on them instead of the shifted
+    # x, y; traces without a hovertemplate get one like the default hover.
+    # customdata is float32 if it keeps the real x, y to precision, else float64.
+    # return: True if customdata was replaced
+    if not ("x" in trace and "y" in trace and _is_array(trace.x) and _is_array(trace.y)
+            and np.ndim(trace.x) == 1 and np.shape(trace.x) == np.shape(trace.y)):
+        return False # e.g. a surface, x and y are its grid axes
+    if "hoverinfo" in trace and trace.hoverinfo in ("none", "skip"):
+        return False
+    if template is None:
+        template = "x: %{x:.2f}<br>y: %{y:.2f}<br>z: %{z:.2f}"
+    elif "%{x" not in template and "%{y" not in template:
+        return False
+    xy = np.column_stack([np.asarray(trace.x, dtype=np.float64), np.asarray(trace.y, dtype=np.float64)])
+    custom = trace.customdata if "customdata" in trace else None
+    c = 0 if custom is None else np.asarray(custom).reshape(xy.shape[0], -1).shape[1]
+    if custom is not None and np.asarray(custom).dtype.kind not in "fiu":
+        custom = np.column_stack([np.asarray(custom, dtype=object).reshape(xy.shape[0], -1), xy])
+    else:
+        custom = xy if custom is None else \
+            np.column_stack([np.asarray(custom, dtype=np.float64).reshape(xy.shape[0], -1), xy])
+        if precision is not None:
+            custom = np.round(custom/precision)*precision
+        # float32 is exact to ~|value|*2**-24
+        if precision is not None and np.nanmax(np.abs(xy), initial=0.0) <= precision*2**23:
+            custom = custom.astype(np.float32)
+    trace.customdata = custom
+    trace.hovertemplate = template.replace("%{x", f"%{{customdata[{c}]").replace("%{y", f"%{{customdata[{c+1}]")
+    return True
+
+
+def _extent(fig, key):
+    # (min, max) of the finite values of key ("x" or "y") over all traces
+    lo, hi = np.inf, -np.inf
+    for trace in fig.data:
+        if key in trace and _is_array(trace[key]):
+            values = np.asarray(trace[key], dtype=np.float64)
+            if np.isfinite(values).any():
+                lo, hi = min(lo, np.nanmin(values)), max(hi, np.nanmax(values))
+    return lo, hi
+
+
+def _auto_origin(fig, round_to):
+    x_min, y_min = _extent(fig, "x")[0], _extent(fig, "y")[0]
+    for axis, key in ((fig.layout.scene.xaxis, "x"), (fig.layout.scene.yaxis, "y")):
+        if axis.range is not None:
+            low = min(axis.range)
+            x_min, y_min = (min(x_min, low), y_min) if key == "x" else (x_min, min(y_min, low))
+    x_min = 0.0 if not np.isfinite(x_min) else x_min
+    y_min = 0.0 if not np.isfinite(y_min) else y_min
+    return np.floor(x_min/round_to)*round_to, np.floor(y_min/round_to)*round_to
+
+
+def _drop_unused_vertices(trace):
+    # keep only the vertices used by a triangle, and renumber i, j, k
+    if not (_is_array(trace.i) and _is_array(trace.x)):
+        return
+    i, j, k = (np.asarray(trace[key], dtype=np.int64) for key in ("i", "j", "k"))
+    n = np.asarray(trace.x).shape[0]
+    used = np.zeros(n, dtype=bool)
+    used[i], used[j], used[k] = True, True, True
+    new_index = np.cumsum(used) - 1
+    for key in ("x", "y", "z", "intensity", "vertexcolor", "customdata"):
+        if key in trace and _is_array(trace[key]) and np.asarray(trace[key]).shape[0] == n:
+            trace[key] = np.asarray(trace[key])[used]
+    dtype = np.uint16 if used.sum() <= np.iinfo(np.uint16).max else np.uint32
+    trace.update(i=new_index[i].astype(dtype), j=new_index[j].astype(dtype),
+                 k=new_index[k].astype(dtype))
+
+
+def _nice_ticks(lo, hi, n=5):
+    # about n round tick values in [lo, hi]
+    step = (hi - lo)/n if hi > lo else 1.0
+    magnitude = 10**np.floor(np.log10(step))
+    step = min((s*magnitude for s in (1, 2, 5, 10) if s*magnitude >= step), default=step)
+    return np.arange(np.ceil(lo/step)*step, hi + step*1e-9, step)
@@ -0,0 +1,201 @@
+"""
+safe, compiled evaluation of the expression strings in the API input:
+    anticol_con   safe distance, e.g. "2.5+(md/300)**2"
+    lay_conM      layer constraints, e.g. "(x_L-2450)**2+(y_L-1550)**2-100000", "-inclD_L+36",
+                  "P_L[0]-100", "-aziD_L+180"
+    neconM        non-equal constraints, e.g. "-PK[0]+516000", "-angDT+90"
+    ObjM          objective, e.g. "L + 1830.0", "2*Lc+Ls*(1+np.sin(incl))"
+
+The expression is parsed once, checked against a whitelist of syntax (numbers,
+variables, + - * / // % **, unary -, math functions, constant subscripts like
+PK[0], and < <= > >= as the condition of where(...)) and compiled to a NumPy callable. Compiled expressions are cached, and the
+variables can be arrays, so evaluating over 10^6 points is a few NumPy passes.
+Anything else (attribute access, lambdas, comprehensions, strings, ...) is rejected
+with ValueError, before a request is sent.
+
+Usage:
+    f = compile_expr("2.5+(md/300)**2", variables=SAFE_DIST_VARS)
+    f(md=np.arange(0, 3000, 30.))
+    evaluate("-inclD_L+36", inclD_L=incl)
+"""
+import ast
+from functools import lru_cache
+
+import numpy as np
+
+
+# variables of each kind of expression (as used in the Demos)
+SAFE_DIST_VARS = frozenset({"md"})
+# P_L, inclD_L, aziD_L as documented in the Demos (azD_L: alias of aziD_L)
+LAYER_VARS = frozenset({"P_L", "x_L", "y_L", "z_L", "md_L", "incl_L", "az_L",
+                        "inclD_L", "aziD_L", "azD_L"})
+NECON_VARS = frozenset({"PK", "PT", "VK", "VT", "angDK", "angDT", "angDC", "inclD", "incl", "az",
+                        "aziD", "azD"})
+OBJ_VARS = frozenset({"L", "Lc", "Ls", "incl", "inclD", "az", "azD"})
+
+# functions callable as name(...) or np.name(...)
+FUNCTIONS = {
+    name: getattr(np, name) for name in (
+        "sin", "cos", "tan", "arcsin", "arccos", "arctan", "arctan2",
+        "sinh", "cosh", "tanh", "exp", "log", "log10", "log2", "sqrt",
+        "abs", "fabs", "floor", "ceil", "minimum", "maximum", "radians", "degrees",
+        "sign", "hypot", "clip", "where")
+}
+FUNCTIONS.update({"min": np.minimum, "max": np.maximum, "pow": np.power})
+CONSTANTS = {"pi": np.pi, "e": np.e}
+
+_BINOPS = (ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow)
+_UNARYOPS = (ast.UAdd, ast.USub)
+_COMPARE = (ast.Lt, ast.LtE, ast.Gt, ast.GtE) # only inside where(...)
+
+
+class _Checker(ast.NodeTransformer):
+    def __init__(self, variables):
+        self.variables = variables
+        self.names = set()
+
+    def generic_visit(self, node):
+        raise ValueError(f"{type(node).__name__} is not allowed")
+
+    def visit_Expression(self, node):
+        node.body = self.visit(node.body)
+        return node
+
+    def visit_Constant(self, node):
+        if isinstance(node.value, bool) or not isinstance(node.value, (int, float)):
+            raise ValueError(f"constant {node.value!r} is not allowed")
+        # float, so 9**9**9 overflows instead of building a huge integer
+        return ast.copy_location(ast.Constant(float(node.value)), node)
+
+    def visit_Name(self, node):
+        if node.id in CONSTANTS or node.id in FUNCTIONS:
+            return node
+        if node.id.startswith("_"):
+            raise ValueError(f"name {node.id!r} is not allowed")
+        if self.variables is not None and node.id not in self.variables:
+            raise ValueError(f"unknown variable {node.id!r}, expected one of {sorted(self.variables)}")
+        self.names.add(node.id)
+        return node
+
+    def visit_BinOp(self, node):
+        if not isinstance(node.op, _BINOPS):
+            raise ValueError(f"operator {type(node.op).__name__} is not allowed")
+        node.left, node.right = self.visit(node.left), self.visit(node.right)
+        return node
+
+    def visit_UnaryOp(self, node):
+        if not isinstance(node.op, _UNARYOPS):
+            raise ValueError(f"operator {type(node.op).__name__} is not allowed")
+        node.operand = self.visit(node.operand)
+        return node
+
+    def visit_Compare(self, node):
+        raise ValueError("comparisons are only allowed as the condition of where(...)")
+
+    def _condition(self, node):
+        # first argument of where(...)
+        if not isinstance(node, ast.Compare):
+            return self.visit(node)
+        if not all(isinstance(op, _COMPARE) for op in node.ops):
+            raise ValueError("only <, <=, >, >= comparisons are allowed")
+        node.left = self.visit(node.left)
+        node.comparators = [self.visit(c) for c in node.comparators]
+        return node
+
+    def visit_Attribute(self, node):
+        # np.sin(...) -> sin(...)
+        if isinstance(node.value, ast.Name) and node.value.id in ("np", "numpy") \
+                and (node.attr in FUNCTIONS or node.attr in CONSTANTS):
+            return ast.copy_location(ast.Name(node.attr, ast.Load()), node)
+        raise ValueError("attribute access is not allowed, except np.<function>")
+
+    def visit_Call(self, node):
+        func = self.visit(node.func)
+        if not (isinstance(func, ast.Name) and func.id in FUNCTIONS) or node.keywords:
+            raise ValueError("only calls of math functions with positional arguments are allowed")
+        node.func = func
+        node.args = [self._condition(arg) if func.id == "where" and i == 0 else self.visit(arg)
+                     for i, arg in enumerate(node.args)]
+        return node
+
+    def visit_Subscript(self, node):
+        # PK[0]: variable with a constant integer index
+        index = node.slice
+        if not (isinstance(node.value, ast.Name) and isinstance(index, ast.Constant)
+                and isinstance(index.value, int) and not isinstance(index.value, bool)):
+            raise ValueError("only subscripts like PK[0] are allowed")
+        node.value = self.visit_Name(node.value)
+        return node
+
+
+class Expr:
+    """
+    A compiled expression, call it with the variables as keyword arguments.
+    """
+    def __init__(self, expr, code, names):
+        self.expr = expr
+        self._code = code
+        self.names = names # variables used by the expression
+
+    def __call__(self, **variables):
+        missing = self.names - variables.keys()
+        if missing:
+            raise ValueError(f"missing variables {sorted(missing)} for {self.expr!r}")
+        scope = {"__builtins__": {}, **FUNCTIONS, **CONSTANTS}
+        with np.errstate(all="ignore"):
+            return np.asarray(eval(self._code, scope, variables), dtype=np.float64)
+
+    def __repr__(self):
+        return f"Expr({self.expr!r})"
+
+
+# %%
+# *********************************************************************
+def compile_expr(expr, variables=None):
+    """
+    Parse, check and compile an expression string.
+    variables: allowed variable names (e.g. SAFE_DIST_VARS), None: any name
+    Raises ValueError if the expression is invalid.
+    """
+    return _compile(expr, None if variables is None else frozenset(variables))
+
+
+@lru_cache(maxsize=1024)
+def _compile(expr, variables):
+    if not isinstance(expr, str):
+        raise ValueError(f"expression must be a string, got {type(expr).__name__}")
+    try:
+        tree = ast.parse(expr.strip(), mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"invalid expression {expr!r}: {e.msg}") from None
+    checker = _Checker(variables)
+    try:
+        tree = ast.fix_missing_locations(checker.visit(tree))
+    except ValueError as e:
+        raise ValueError(f"invalid expression {expr!r}: {e}") from None
+    return Expr(expr, compile(tree, "<expr>", "eval"), frozenset(checker.names))
+
+
+def evaluate(expr, **variables):
+    return compile_expr(expr)(**variables)
+
+
+def validate_expr(expr, variables=None):
+    """
+    Error message (str) of an invalid expression, None if valid.
+    """
+    try:
+        compile_expr(expr, variables)
+    except ValueError as e:
+        return str(e)
+    return None
+
+
+def eval_md_expr(expr, md):
+    """
+    Evaluate a safe distance expression of md (str or number) on an array of md.
+    """
+    md = np.asarray(md, dtype=np.float64)
+    if not isinstance(expr, str):
+        return np.full(md.shape, float(expr))
+    return np.broadcast_to(compile_expr(expr, SAFE_DIST_VARS)(md=md), md.shape)
@@ -0,0 +1,227 @@
+"""
+incremental re-planning of a 1-site field: only the changed wells are sent again.
+
+The planner keeps the last solved input and result (with the per-well contours,
+getContours=1). For a new input, the wells are compared one by one on
+    PTM, VTM, PKM, VKM, DLSM, rM, ObjM, lay_conM, neconM
+Any other change (n, anticol_con, XRange, resolution, ...) needs a full recompute.
+
+The server plans every well of the input it gets (get_1site indices only picks the
+wells it returns), so the changed wells are sent as an input of their own
+(sharding.subset_input), k wells instead of n:
+1. the changed wells alone, getContours=1: their new cost contours, which don't
+   depend on the other wells. They replace the old ones in CostNWells, and CostASite
+   is rebuilt as the sum of the well contours (NaN where any well can't reach).
+2. The site gap is estimated on the grid: the updated CostASite at the lowest node
+   of the solved field minus its new lowest node, relative to the latter (site_gap).
+   Above max_gap the site would move, and the whole field is recomputed.
+3. Otherwise the site stays where it is: the changed wells alone again, with their
+   KOP pinned at the site (free PKM x, y only) and getContours=0; their trajectories
+   replace the old ones. The other wells keep theirs (from the same site).
+That is two requests of k wells against one of n, so the changed wells are sent
+again only if 2k < n; otherwise, or if the sub-input would not see the whole field,
+it is a full get_1site straight away:
+    anticol_con set: the changed wells are not checked against the others
+    XRange/YRange not set: the contour grid would follow the changed targets only
+The merged result is an approximation: the server optimises the site off the grid
+nodes (the Demo sites are not grid nodes), so a full recompute would also move the
+site a little for the new field. The site gap (report["site_gap"]) estimates what a
+new site could save on the grid. The time saved, and the cost of the approximation,
+against a full run are measured by benchmarks/bench_incremental.py (--server for
+the real server).
+
+Usage:
+    planner = IncrementalPlanner(state_path="field_state.json")
+    output = planner.plan(input_data) # first time: full get_1site
+    input_data['FIELDOPT INPUT BLOCK']['PTM']['VALUE'][7] = [...] # move a target
+    output = planner.plan(input_data) # only well 7 is sent
+    print(planner.report)
+"""
+import copy
+import json
+import os
+import time
+
+import numpy as np
+
+from tools.input2json import to_jsonable
+from tools.sharding import _field_range, subset_input
+
+well_keys = ("PTM", "VTM", "PKM", "VKM", "DLSM", "rM", "ObjM", "lay_conM", "neconM")
+
+
+def _well_value(block, key, w):
+    value = block[key]['VALUE'] if key in block else None
+    if value is None: # None for all wells
+        return None
+    return value[w] if w < len(value) else None
+
+
+def changed_wells(old_input, new_input):
+    """
+    Indices of the wells whose own parameters differ, None if anything else differs
+    (then the whole field must be recomputed).
+    """
+    old, new = old_input['FIELDOPT INPUT BLOCK'], new_input['FIELDOPT INPUT BLOCK']
+    if old.keys() != new.keys():
+        return None
+    for key in old:
+        if key not in well_keys and old[key] != new[key]:
+            return None
+    for key in well_keys:
+        if key in new and (old[key]['VALUE'] is None) != (new[key]['VALUE'] is None):
+            return None
+    n = new['n']['VALUE']
+    return [w for w in range(n)
+            if any(_well_value(old, key, w) != _well_value(new, key, w) for key in well_keys)]
+
+
+def site_gap(old_cost, new_cost):
+    """
+    (new cost at the lowest node of old_cost - lowest new cost)/lowest new cost,
+    for site costs on the same grid nodes. inf if that node is infeasible in
+    new_cost (or no node is feasible).
+    The solved site itself is off the grid nodes, often next to (or among) nodes
+    the grid marks infeasible, so the gap is taken at the grid's own best node.
+    """
+    old_cost = np.asarray(old_cost, dtype=np.float64)
+    new_cost = np.asarray(new_cost, dtype=np.float64)
+    if np.isnan(old_cost).all() or np.isnan(new_cost).all():
+        return np.inf
+    best = np.nanmin(new_cost)
+    at_site = new_cost[np.nanargmin(old_cost)]
+    if np.isnan(at_site):
+        return np.inf
+    return (at_site - best)/abs(best)
+
+
+# %%
+# *********************************************************************
+class IncrementalPlanner:
+    def __init__(self,
+                 url=None, # get_1site url, default: API.url_1site
+                 state_path=None, # json file keeping the last solved input and result, None: memory only
+                 timeout=300,
+                 cache=None, # ResponseCache, see API.get_1site
+                 compress=None,
+                 max_gap=0.005, # relative site gap above which the whole field is recomputed
+                 ):
+        if url is None:
+            from API import url_1site
+            url = url_1site
+        self.url = url
+        self.state_path = state_path
+        self.timeout = timeout
+        self.cache = cache
+        self.compress = compress
+        self.max_gap = max_gap
+        self.input = None # last solved input
+        self.output = None # last result (response content)
+        self.report = None # what the last plan() did: mode, changed, requests, elapsed, site_gap
+        self._requests = 0
+        if state_path is not None and os.path.exists(state_path):
+            with open(state_path) as f:
+                state = json.load(f)
+            self.input, self.output = state["input"], state["output"]
+
+    # ==================================================================================
+    def plan(self, input_data):
+        """
+        Result (response content dict) for input_data, recomputing only what changed.
+        None if a request failed (the error is printed by API.get_1site).
+        """
+        tic = time.time()
+        input_data = copy.deepcopy(input_data)
+        input_data.pop("other", None)
+        changed = None if self.output is None else changed_wells(self.input, input_data)
+
+        self._requests = 0
+        self._gap = None
+        if changed == []:
+            self.report = {"mode": "cached", "changed": [], "requests": 0, "elapsed": time.time() - tic}
+            return self.output
+        if changed is not None:
+            output = self._incremental(input_data, changed)
+            if output is not None:
+                self.report = {"mode": "incremental", "changed": changed, "requests": self._requests,
+                               "elapsed": time.time() - tic, "site_gap": self._gap}
+                return self._save(input_data, output)
+
+        output = self._request(input_data)
+        if output is None:
+            return None
+        self.report = {"mode": "full", "changed": changed, "requests": self._requests,
+                       "elapsed": time.time() - tic, "site_gap": self._gap}
+        return self._save(input_data, output)
+
+    # ==================================================================================
+    def _request(self, input_data, getContours=1):
+        from API import get_1site
+        self._requests += 1
+        content = get_1site(copy.deepcopy(input_data), getContours=getContours,
+                            filepath=None, url=self.url, timeout=self.timeout,
+                            cache=self.cache, compress=self.compress)
+        if content is None or content.get("status") != "success":
+            return None
+        return content
+
+    def _incremental(self, input_data, changed):
+        """
+        Merged result (an approximation, see the module doc), None if a full
+        recompute is needed (not cheaper, site would move, or a request failed).
+        """
+        block = input_data['FIELDOPT INPUT BLOCK']
+        if not 2*len(changed) < block['n']['VALUE']:
+            return None # two requests of k wells, not cheaper than one of n
+        if block.get('anticol_con', {}).get('VALUE') is not None:
+            return None
+        if None in _field_range(block['XRange']['VALUE']) + _field_range(block['YRange']['VALUE']):
+            return None
+        old = self.output["data"]
+        if not old["CostNWells"]["cost"]:
+            print("no per-well contours in the last result, recomputing the whole field")
+            return None
+        old_wells = np.array(old["CostNWells"]["cost"], dtype=np.float64)
+
+        # 1. new contours of the changed wells
+        sub = self._request(subset_input(input_data, changed))
+        if sub is None:
+            return None
+        contours = sub["data"]["CostNWells"]
+        if contours["X"] != old["CostNWells"]["X"] or contours["Y"] != old["CostNWells"]["Y"]:
+            print("the contour grid changed, recomputing the whole field")
+            return None
+        new_wells = old_wells.copy()
+        new_wells[changed] = np.array(contours["cost"], dtype=np.float64)
+        new_site = new_wells.sum(axis=0) # NaN where any well can't reach
+
+        # 2. the site stays if its node is still close to the best one
+        self._gap = site_gap(old_wells.sum(axis=0), new_site)
+        if not self._gap <= self.max_gap:
+            print(f"site gap {self._gap:.2%} > {self.max_gap:.2%}, recomputing the whole field")
+            return None
+
+        # 3. changed wells from the same site
+        site = [old["Trajectories"][0]['X'][0], old["Trajectories"][0]['Y'][0]]
+        PKM = [block['PKM']['VALUE'][w] for w in changed]
+        PKM = [site + [PK[2]] if PK[0] is None and PK[1] is None else PK for PK in PKM]
+        sub_traj = self._request(subset_input(input_data, changed, PKM=PKM), getContours=0)
+        if sub_traj is None:
+            return None
+
+        trajectories = list(old["Trajectories"])
+        for w, trajectory in zip(changed, sub_traj["data"]["Trajectories"]):
+            trajectories[w] = trajectory
+        data = dict(old)
+        data["Trajectories"] = trajectories
+        data["CostNWells"] = {**old["CostNWells"], "cost": to_jsonable(new_wells)}
+        data["CostASite"] = {**old["CostASite"], "cost": to_jsonable(new_site)}
+        return {**self.output, "data": data}
+
+    def _save(self, input_data, output):
+        self.input, self.output = input_data, output
+        if self.state_path is not None:
+            with open(self.state_path, "w") as f:
+                json.dump({"input": input_data, "output": output}, f)
+        return output
+
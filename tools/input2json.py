@@ -1,6 +1,11 @@
 import json 
 import numpy as np
 import os
+
+try: # optional, faster JSON encoding
+    import orjson
+except ImportError:
+    orjson = None
     
 class NumpyEncoder(json.JSONEncoder):
     def default(self, obj):
@@ -25,6 +30,44 @@ class NumpyEncoder(json.JSONEncoder):
             return None
         return obj
 
+
+def to_jsonable(obj):
+    """
+    Convert numpy arrays/scalars in obj to Python lists/scalars, np.nan -> None.
+    Each array is converted in one vectorized pass, instead of element by element.
+    """
+    if isinstance(obj, np.ndarray):
+        if obj.dtype.kind == 'f':
+            mask = np.isnan(obj)
+            if mask.any():
+                out = obj.astype(object)
+                out[mask] = None
+                return out.tolist()
+        return obj.tolist()
+    if isinstance(obj, dict):
+        return {key: to_jsonable(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [to_jsonable(item) for item in obj]
+    if isinstance(obj, np.generic):
+        obj = obj.item()
+    if isinstance(obj, float) and obj != obj: # np.nan
+        return None
+    return obj
+
+
+def encode_json(obj, backend="auto"):
+    """
+    Encode a JSON-able obj (e.g. from to_jsonable) to bytes.
+    backend: "orjson", "json", or "auto" (orjson if installed)
+    Both backends write NaN as null (never the invalid JSON token NaN).
+    """
+    if backend == "orjson" or (backend == "auto" and orjson is not None):
+        if orjson is None:
+            raise ImportError("backend='orjson' requires the orjson package (pip install orjson)")
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(to_jsonable(obj), cls=NumpyEncoder, allow_nan=False).encode("utf-8")
+
+
 def input2json (n, # number of wells
                 
                 PTM, # shape:(n, 3)
@@ -59,8 +102,11 @@ def input2json (n, # number of wells
                 cluster_min= None,
                 cluster_max= None,
 
-                # file path for saving Json
+                # file path for saving Json, None: don't save
                 filepath = "input.json",
+
+                backend = "auto", # JSON encoder: "orjson", "json", or "auto" (orjson if installed)
+                return_bytes = 0, # 1: return (dict, encoded bytes)
                ):
     
     json_dict = \
@@ -273,24 +319,27 @@ def input2json (n, # number of wells
             }
         }
     
-    out_json=json.dumps(json_dict, cls=NumpyEncoder)
-
+    # numpy -> Python, np.nan -> None, and encode only once
+    json_dict=to_jsonable(json_dict)
+    out_json=encode_json(json_dict, backend=backend)
 
-    try:
+    if filepath is not None:
         try:
-            # if path doesn't exist, create it
-            os.makedirs(os.path.dirname(filepath), exist_ok=True)
-        except Exception as e: # filepath is a single file name
-            pass
-
-        with open(filepath, "w") as outfile:
-            outfile.write(out_json)
-        print(f"=====file {str(filepath)} written successfully=====")
-        print("===================================")
-    except Exception as e:
-        print("======Error in opening file========")
-        print(str(e))
-
-    # convert the str to dict
-    return json.loads(out_json)
-    
\ No newline at end of file
+            try:
+                # if path doesn't exist, create it
+                os.makedirs(os.path.dirname(filepath), exist_ok=True)
+            except Exception as e: # filepath is a single file name
+                pass
+
+            with open(filepath, "wb") as outfile:
+                outfile.write(out_json)
+            print(f"=====file {str(filepath)} written successfully=====")
+            print("===================================")
+        except Exception as e:
+            print("======Error in opening file========")
+            print(str(e))
+
+    if return_bytes==1:
+        # the encoded bytes can be reused, e.g. to send or to hash the input
+        return json_dict, out_json
+    return json_dict
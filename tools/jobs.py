@@ -0,0 +1,210 @@
+"""
+submit/poll mode for long API runs (e.g. anticollision get_1well, large get_ksites).
+
+submit() starts the request in a detached background process and returns a Job
+at once. The request has no client-side timeout by default, and the background
+process keeps running if the notebook kernel crashes or restarts.
+Everything lives in a job directory, whose path is the persistable handle:
+    job.json      url, settings, submit time
+    input.json    request content, with the "other" block
+    heartbeat     touched by the background process while it is running
+    output.json   response content, when done
+    error.txt     error message, when failed
+
+The job directory is named by the hash of url + input (same as ResponseCache),
+so submitting the same problem again returns the job already running/done
+instead of starting a new one. A failed or lost job is started again.
+
+Usage:
+    job = submit(url_1well, input_data, job_root="api_jobs")
+    handle = job.handle # save it anywhere
+    ...
+    job = Job(handle) # e.g. after a kernel restart
+    output = job.wait() # poll with backoff until done
+"""
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+rootpath = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if rootpath not in sys.path:
+    sys.path.append(rootpath)
+
+from tools.response_cache import ResponseCache
+
+heartbeat_interval = 5 # s, how often the background process touches the heartbeat
+heartbeat_timeout = 30 # s, no heartbeat for this long: the process is gone
+
+
+class JobError(RuntimeError):
+    pass
+
+
+# %%
+# *********************************************************************
+def submit(url, # API server url
+           input_data, # formatted json data
+           index=None, # index of well for 1well
+           getContour=0,
+           indices=None, # indices of wells for 1site & ksites
+           getContours=0,
+
+           job_root="api_jobs", # directory for the job directories
+           timeout=None, # request timeout (s), None: wait as long as the server needs
+           compress=None, # None, "gzip" or "zstd": compress the request body
+           ):
+    """
+    Start a request in a background process and return its Job.
+    If the same request is already running or done, return that Job; if it failed
+    or was lost, start it again.
+    """
+    from API import set_other
+
+    input_data = dict(input_data)
+    set_other(url, input_data,
+              index=index, getContour=getContour,
+              indices=indices, getContours=getContours)
+
+    job_dir = os.path.abspath(os.path.join(job_root, ResponseCache.key(url, input_data)))
+    if os.path.exists(os.path.join(job_dir, "job.json")):
+        job = Job(job_dir)
+        state = job.poll()
+        if state in ("running", "done"):
+            print(f"job already submitted: {job.handle}")
+            return job
+        # the previous attempt failed or died without a result, start it again
+        print(f"previous job {state}, submitting it again: {job.handle}")
+
+    os.makedirs(job_dir, exist_ok=True)
+    for name in ("output.json", "error.txt", "heartbeat"):
+        if os.path.exists(os.path.join(job_dir, name)):
+            os.remove(os.path.join(job_dir, name))
+    with open(os.path.join(job_dir, "input.json"), "w", encoding="utf-8") as f:
+        json.dump(input_data, f)
+    with open(os.path.join(job_dir, "job.json"), "w", encoding="utf-8") as f:
+        json.dump({"url": url, "timeout": timeout, "compress": compress,
+                   "submitted": time.time()}, f, indent=2)
+    _touch(os.path.join(job_dir, "heartbeat"))
+
+    # detached from this process, so it survives a kernel crash/restart
+    kwargs = {}
+    if os.name == "nt":
+        kwargs["creationflags"] = subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+    else:
+        kwargs["start_new_session"] = True
+    subprocess.Popen([sys.executable, os.path.abspath(__file__), job_dir],
+                     stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                     stderr=subprocess.DEVNULL, close_fds=True, **kwargs)
+    print(f"job submitted: {job_dir}")
+    return Job(job_dir)
+
+
+# %%
+# *********************************************************************
+class Job:
+    def __init__(self, handle): # handle: job directory
+        self.handle = os.path.abspath(handle)
+        with open(self._path("job.json"), "r", encoding="utf-8") as f:
+            self.info = json.load(f)
+
+    def _path(self, name):
+        return os.path.join(self.handle, name)
+
+    def poll(self):
+        """
+        "done", "failed", "running", or "lost" (background process gone without a result)
+        """
+        if os.path.exists(self._path("output.json")):
+            return "done"
+        if os.path.exists(self._path("error.txt")):
+            return "failed"
+        try:
+            age = time.time() - os.path.getmtime(self._path("heartbeat"))
+        except OSError:
+            return "lost"
+        return "running" if age < heartbeat_timeout else "lost"
+
+    def result(self):
+        """
+        Response content (dict) of a finished job. Raises JobError otherwise.
+        """
+        state = self.poll()
+        if state == "done":
+            with open(self._path("output.json"), "r", encoding="utf-8") as f:
+                return json.load(f)
+        if state == "failed":
+            with open(self._path("error.txt"), "r", encoding="utf-8") as f:
+                raise JobError(f.read())
+        raise JobError(f"job is {state}: {self.handle}")
+
+    def wait(self,
+             max_wait=None, # s, None: wait until done
+             interval=1.0, # first polling interval (s)
+             max_interval=30.0, # longest polling interval (s)
+             backoff=1.5, # the interval grows by this factor after each poll
+             ):
+        """
+        Poll with backoff until the job is done, then return the response content.
+        """
+        tic = time.time()
+        while self.poll() == "running":
+            if max_wait is not None and time.time() - tic + interval > max_wait:
+                raise JobError(f"job still running after {max_wait} s: {self.handle}")
+            time.sleep(interval)
+            interval = min(interval*backoff, max_interval)
+        return self.result()
+
+    def elapsed(self):
+        return time.time() - self.info["submitted"]
+
+    def __repr__(self):
+        return f"Job({self.handle!r}, state={self.poll()!r})"
+
+
+# %%
+# *********************************************************************
+def _touch(path):
+    with open(path, "a"):
+        os.utime(path)
+
+
+def _write(path, text):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path) # readers never see a partial file
+
+
+def run_job(job_dir):
+    """
+    Body of the background process: send the request, write output.json or error.txt.
+    """
+    from API import post_request
+
+    job = Job(job_dir)
+    with open(job._path("input.json"), "r", encoding="utf-8") as f:
+        input_data = json.load(f)
+
+    stop = threading.Event()
+    def heartbeat():
+        while not stop.wait(heartbeat_interval):
+            _touch(job._path("heartbeat"))
+    threading.Thread(target=heartbeat, daemon=True).start()
+
+    try:
+        response = post_request(job.info["url"], input_data,
+                                timeout=job.info["timeout"],
+                                compress=job.info["compress"])
+        content = response.json() # check it's valid JSON before marking as done
+        _write(job._path("output.json"), json.dumps(content))
+    except Exception as e:
+        _write(job._path("error.txt"), f"{type(e).__name__}: {e}")
+    finally:
+        stop.set()
+
+
+if __name__ == "__main__":
+    run_job(sys.argv[1])
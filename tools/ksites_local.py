@@ -0,0 +1,220 @@
+"""
+local K-sites re-optimization on per-well cost contours.
+
+With the per-well contours of a field (CostNWells, getContours=1) on one grid,
+cost[w, node] is the cost of well w drilled from a site at that node (NaN: not
+reachable). Changes of the economic parameters of get_ksites
+    cst_Site: drill site preparation cost
+    slot: available slot numbers in one cluster, a descending list
+    cst_WH: wellhead (template) cost of each slot number
+    cluster_min, cluster_max: number of sites
+can then be re-solved locally. The field cost of a layout is
+    sum of the well costs from their sites
+    + cst_Site per used site
+    + cst_WH of the smallest template (slot >= wells of the site) per used site
+
+For each number of sites k, a vectorized k-medoids runs over the grid nodes:
+    greedy start: add the node that lowers the summed well costs the most
+    assignment: wells -> sites with at most max(slot) wells per site
+                (linear_sum_assignment with one column per slot)
+    update: each site moves to the node with the lowest summed cost of its wells
+until the sites stop moving, then the best single-site move is tried (and kept if
+it lowers the cost) until none helps. The best k is returned.
+This is a local heuristic: use it to screen economic what-ifs, and confirm the
+chosen case with get_ksites.
+
+Usage:
+    ks = KSitesLocal(output["data"]["CostNWells"])
+    layout = ks.solve(cst_Site=500, slot=[6,5,4,3,2,1], cst_WH=[70,70,70,70,70,20],
+                      cluster_min=2, cluster_max=6)
+    layout = ks.solve_input(input_data) # parameters from the input block
+"""
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+from tools.cost_grid import CostContour
+
+_BIG = 1e12 # cost of a well that can't be reached from a node
+
+
+# %%
+# *********************************************************************
+class KSitesLocal:
+    def __init__(self, cost_n_wells): # CostNWells: dict, Contour (tools.results) or CostContour
+        if isinstance(cost_n_wells, CostContour):
+            grid = cost_n_wells
+        elif isinstance(cost_n_wells, dict):
+            grid = CostContour.from_dict(cost_n_wells)
+        else:
+            grid = CostContour.from_contour(cost_n_wells)
+        if grid.cost.ndim != 3:
+            raise ValueError("one contour per well is needed (CostNWells with getContours=1)")
+        self.grid = grid
+        cost = np.asarray(grid.cost, dtype=np.float64).reshape(grid.cost.shape[0], -1)
+        # nodes no well can use are dropped
+        self.nodes = np.flatnonzero(~np.isnan(cost).all(axis=0))
+        cost = cost[:, self.nodes]
+        self.reachable = ~np.isnan(cost)
+        self.cost = np.where(self.reachable, cost, _BIG) # (n, nodes)
+        self.n = cost.shape[0]
+
+    # ==================================================================================
+    def solve(self,
+              cst_Site=0.0,
+              slot=None, # e.g. [6,5,4,3,2,1]; None: no limit
+              cst_WH=None, # e.g. [70,70,70,70,70,20], template cost of each slot
+              cluster_min=1,
+              cluster_max=None, # None: cluster_min
+              max_iter=30,
+              ):
+        """
+        return: dict of the best layout
+            k: number of used sites
+            sites: (k, 2) site locations [x, y]
+            assignment: (n,) site of each well
+            well_cost: (n,) cost of each well from its site
+            wells_per_site: (k,)
+            cost: total field cost, cost_wells, cost_sites, cost_WH
+            feasible: every well reaches its site
+            per_k: list of the layouts for each number of sites tried
+        """
+        cap, wh = _templates(slot, cst_WH, self.n)
+        cluster_max = cluster_min if cluster_max is None else cluster_max
+        k_min = max(int(cluster_min), int(np.ceil(self.n/cap)), 1)
+        per_k = []
+        sites = None
+        for k in range(k_min, int(cluster_max) + 1):
+            sites = self._greedy(k, sites)
+            sites, assignment = self._kmedoids(sites, cap, max_iter)
+            per_k.append(self._layout(sites, assignment, cst_Site, wh))
+        if not per_k:
+            raise ValueError(f"{self.n} wells don't fit in {cluster_max} sites of {cap} slots")
+        best = min(per_k, key=lambda layout: (not layout["feasible"], layout["cost"]))
+        return {**best, "per_k": per_k}
+
+    def solve_input(self, input_data, max_iter=30):
+        """
+        solve with cst_Site, slot, cst_WH, cluster_min and cluster_max of the input block.
+        """
+        block = input_data['FIELDOPT INPUT BLOCK']
+        value = lambda key: block[key]['VALUE'] if key in block else None
+        return self.solve(cst_Site=value('cst_Site') or 0.0,
+                          slot=value('slot'), cst_WH=value('cst_WH'),
+                          cluster_min=value('cluster_min') or 1,
+                          cluster_max=value('cluster_max'),
+                          max_iter=max_iter)
+
+    # ==================================================================================
+    def _greedy(self, k, sites=None):
+        # add sites one by one (keeping the sites of the previous k), each at the node
+        # that lowers sum_w min(current_w, cost[w, node]) the most
+        sites = [] if sites is None else list(sites)
+        current = self.cost[:, sites].min(axis=1) if sites else np.full(self.n, np.inf)
+        while len(sites) < k:
+            total = np.minimum(current[:, None], self.cost).sum(axis=0)
+            total[sites] = np.inf
+            node = int(np.argmin(total))
+            sites.append(node)
+            current = np.minimum(current, self.cost[:, node])
+        return np.array(sites, dtype=np.intp)
+
+    def _assign(self, sites, cap):
+        # min-cost assignment with capacities: one column per (site, slot)
+        C = np.repeat(self.cost[:, sites], cap, axis=1)
+        rows, cols = linear_sum_assignment(C)
+        assignment = np.empty(self.n, dtype=np.intp)
+        assignment[rows] = cols//cap
+        return assignment
+
+    def _kmedoids(self, sites, cap, max_iter):
+        sites, assignment = self._medoids(sites, cap, max_iter)
+        for _ in range(max_iter):
+            # best single-site move (for the uncapacitated cost), kept if it also
+            # lowers the capacitated cost
+            current = self.cost[np.arange(self.n), sites[assignment]].sum()
+            best, move = np.inf, None
+            for i in range(len(sites)):
+                others = np.delete(sites, i)
+                rest = self.cost[:, others].min(axis=1) if others.size else np.full(self.n, np.inf)
+                total = np.minimum(rest[:, None], self.cost).sum(axis=0)
+                total[sites] = np.inf
+                node = int(np.argmin(total))
+                if total[node] < best:
+                    best, move = total[node], (i, node)
+            if move is None:
+                break
+            new_sites = sites.copy()
+            new_sites[move[0]] = move[1]
+            new_sites, new_assignment = self._medoids(new_sites, cap, max_iter)
+            if self.cost[np.arange(self.n), new_sites[new_assignment]].sum() >= current - 1e-9:
+                break
+            sites, assignment = new_sites, new_assignment
+        return sites, assignment
+
+    def _medoids(self, sites, cap, max_iter):
+        assignment = self._assign(sites, cap)
+        for _ in range(max_iter):
+            # summed cost of each cluster's wells at every node, all clusters at once
+            onehot = np.zeros((len(sites), self.n))
+            onehot[assignment, np.arange(self.n)] = 1.0
+            total = onehot @ self.cost
+            new_sites = sites.copy()
+            used = onehot.any(axis=1)
+            new_sites[used] = np.argmin(total[used], axis=1)
+            if len(np.unique(new_sites)) < len(new_sites): # two sites on one node
+                new_sites = sites
+            new_assignment = self._assign(new_sites, cap)
+            if np.array_equal(new_sites, sites) and np.array_equal(new_assignment, assignment):
+                break
+            sites, assignment = new_sites, new_assignment
+        return sites, assignment
+
+    def _layout(self, sites, assignment, cst_Site, wh):
+        # drop empty sites, then cost the layout
+        used = np.unique(assignment)
+        sites = sites[used]
+        assignment = np.searchsorted(used, assignment)
+        wells_per_site = np.bincount(assignment, minlength=len(sites))
+        well_cost = self.cost[np.arange(self.n), sites[assignment]]
+        feasible = bool(self.reachable[np.arange(self.n), sites[assignment]].all())
+        well_cost = np.where(well_cost >= _BIG, np.nan, well_cost)
+        x, y = self.grid.node_xy(self.nodes[sites])
+        cost_wells = float(np.nansum(well_cost))
+        cost_sites = float(cst_Site)*len(sites)
+        cost_WH = float(wh[wells_per_site].sum())
+        return {
+            "k": len(sites),
+            "sites": np.column_stack((x, y)),
+            "assignment": assignment,
+            "well_cost": well_cost,
+            "wells_per_site": wells_per_site,
+            "cost": cost_wells + cost_sites + cost_WH if feasible else np.inf,
+            "cost_wells": cost_wells,
+            "cost_sites": cost_sites,
+            "cost_WH": cost_WH,
+            "feasible": feasible,
+        }
+
+
+def _templates(slot, cst_WH, n):
+    """
+    Site capacity, and the wellhead cost of a site by its number of wells (0..capacity):
+    the cheapest template with enough slots.
+    """
+    if slot is None or len(slot) == 0:
+        return n, np.zeros(n + 1)
+    slot = np.asarray(slot, dtype=np.intp)
+    cst = np.zeros(len(slot)) if cst_WH is None else np.asarray(cst_WH, dtype=np.float64)
+    cap = int(slot.max())
+    wh = np.zeros(cap + 1)
+    for m in range(1, cap + 1):
+        wh[m] = cst[slot >= m].min()
+    return cap, wh
+
+
+def print_layout(layout):
+    print(f"{'k':>3} {'cost':>12} {'wells':>12} {'sites':>10} {'WH':>8}")
+    for L in layout.get("per_k", [layout]):
+        print(f"{L['k']:>3} {L['cost']:>12.1f} {L['cost_wells']:>12.1f} "
+              f"{L['cost_sites']:>10.1f} {L['cost_WH']:>8.1f}" + ("" if L['feasible'] else "  infeasible"))
+    print(f"best: {layout['k']} sites, wells per site {layout['wells_per_site'].tolist()}")
@@ -0,0 +1,240 @@
+"""
+local verification of the lay_conM layer constraints on returned trajectories.
+
+Each trajectory is interpolated where it first crosses each layer, a depth
+(Z = layer) or a surface given as scattered 3D points [[x, y, z], ...], on the
+minimum-curvature arc between the survey stations (the chord would cut the
+corner of a build section, and miss an active constraint by tens of m²). This gives
+the layer variables
+    P_L: point at the layer [x_L, y_L, z_L] (P_L[0] is x_L)
+    x_L, y_L, z_L, md_L: location and MD at the layer
+    inclD_L, aziD_L: inclination/azimuth (degrees) at the layer (azD_L: alias of aziD_L)
+    incl_L, az_L: the same in radians
+A constraint g is honoured if g >= 0 (e.g. "-inclD_L+36" means inclination <= 36°),
+and g is reported as the margin.
+
+The points are found well by well, all the layers of a well in one bisection. Each
+distinct constraint expression is then compiled once (tools.expressions) and
+evaluated in one call over the points of all the wells using it.
+
+Usage:
+    report = check_lay_conM(input_data, output)
+    pd.DataFrame(report)
+    [row for row in report if not row['satisfied']]
+"""
+import numpy as np
+from scipy.interpolate import LinearNDInterpolator
+from scipy.spatial import QhullError
+
+from tools.expressions import compile_expr, LAYER_VARS
+
+
+def _columns(trajectory):
+    # dict from the response or Trajectory (tools.results)
+    cols = {}
+    for key in ('X', 'Y', 'Z', 'MD', 'INCL', 'AZ'):
+        cols[key] = np.asarray(trajectory[key], dtype=np.float64) \
+            if key in trajectory and trajectory[key] is not None else None
+    return cols
+
+
+def _surface(layer):
+    """
+    Depth of a layer as a function of (x, y): a scalar depth, or scattered 3D points
+    [[x, y, z], ...] interpolated linearly (NaN outside their convex hull).
+    """
+    if np.ndim(layer) == 0:
+        depth = float(layer)
+        return lambda x, y: np.full(np.shape(x), depth)
+    points = np.asarray(layer, dtype=np.float64)
+    if points.ndim != 2 or points.shape[1] != 3 or points.shape[0] < 3:
+        raise ValueError(f"layer must be a depth or at least 3 points [[x, y, z], ...], "
+                         f"got an array of shape {points.shape}")
+    try:
+        surface = LinearNDInterpolator(points[:, :2], points[:, 2])
+    except QhullError as e:
+        raise ValueError(f"layer points don't span a surface (collinear x, y?): {e}") from None
+    return lambda x, y: surface(x, y)
+
+
+def _arc(t, s, p):
+    """
+    Position and unit tangent at the fraction p of the survey intervals [s, s+1],
+    on the minimum-curvature arc (see decimate.min_curvature_midpoints), or on the
+    chord if the trajectory has no INCL/AZ.
+    """
+    xyz = np.column_stack((t['X'], t['Y'], t['Z']))
+    x1, x2 = xyz[s], xyz[s+1]
+    if t['INCL'] is None or t['AZ'] is None:
+        chord = x2 - x1
+        with np.errstate(divide="ignore", invalid="ignore"):
+            tangent = chord/np.linalg.norm(chord, axis=1, keepdims=True)
+        return x1 + p[:, None]*chord, tangent
+    I = np.radians(t['INCL'])
+    A = np.radians(t['AZ'])
+    # unit tangent, Z upwards
+    tan = np.column_stack((np.sin(I)*np.sin(A), np.sin(I)*np.cos(A), -np.cos(I)))
+    t1, t2 = tan[s], tan[s+1]
+    dMD = t['MD'][s+1] - t['MD'][s]
+    beta = np.arccos(np.clip(np.einsum("ij,ij->i", t1, t2), -1.0, 1.0)) # dogleg angle
+
+    # straight interval
+    pos = x1 + (p*dMD)[:, None]*t1
+    tangent = t1.copy()
+    curved = beta > 1e-9
+    if curved.any():
+        b, q = beta[curved], p[curved]*beta[curved]
+        R = dMD[curved]/b
+        # integral of the slerp tangent from 0 to q
+        c1 = (np.cos(b - q) - np.cos(b))/np.sin(b)
+        c2 = (1 - np.cos(q))/np.sin(b)
+        pos[curved] = x1[curved] + R[:, None]*(c1[:, None]*t1[curved] + c2[:, None]*t2[curved])
+        tangent[curved] = (np.sin(b - q)[:, None]*t1[curved] + np.sin(q)[:, None]*t2[curved]) \
+            /np.sin(b)[:, None]
+    return pos, tangent
+
+
+def layer_points(trajectory,
+                 layers, # depths and/or scattered 3D points of a surface (see _surface)
+                 iterations=50, # bisection steps on the arc, 2**-50 of an interval
+                 ):
+    """
+    Layer variables where the trajectory first crosses each layer, on the
+    minimum-curvature arc between the survey stations.
+    Wells not reaching a layer (or outside the points of a surface) get NaN.
+
+    return: dict of (k,) arrays ((3, k) for P_L), keys as LAYER_VARS
+    """
+    t = _columns(trajectory)
+    surfaces = [_surface(layer) for layer in layers]
+    k = len(surfaces)
+
+    def height(xyz): # (k, m) Z above each layer surface, xyz: (k, m, 3)
+        return np.array([xyz[r, :, 2] - surfaces[r](xyz[r, :, 0], xyz[r, :, 1])
+                         for r in range(k)]).reshape(xyz.shape[:-1])
+
+    # first interval [s, s+1] crossing the layer
+    xyz = np.column_stack((t['X'], t['Y'], t['Z']))
+    h = height(np.broadcast_to(xyz, (k,) + xyz.shape))
+    h0, h1 = h[:, :-1], h[:, 1:]
+    crossing = (h0 >= 0) & (h1 <= 0) | (h0 <= 0) & (h1 >= 0)
+    reached = crossing.any(axis=1)
+    s = np.argmax(crossing, axis=1)
+
+    # bisection of the arc on the fraction p where the height changes sign
+    lo, hi = np.zeros(k), np.ones(k)
+    above = h0[np.arange(k), s] >= 0 # side of the interval start
+    for _ in range(iterations if reached.any() else 0):
+        mid = (lo + hi)/2
+        pos, _ = _arc(t, s, mid)
+        same = (height(pos[:, None, :])[:, 0] >= 0) == above
+        lo, hi = np.where(same, mid, lo), np.where(same, hi, mid)
+    p = (lo + hi)/2
+    pos, tangent = _arc(t, s, p)
+    pos[~reached] = np.nan
+
+    md = t['MD'][s] + p*(t['MD'][s+1] - t['MD'][s])
+    md[~reached] = np.nan
+    if t['INCL'] is None:
+        inclD = np.full(k, np.nan)
+    else:
+        inclD = np.where(reached, np.degrees(np.arccos(np.clip(-tangent[:, 2], -1.0, 1.0))), np.nan)
+    if t['AZ'] is None:
+        azD = np.full(k, np.nan)
+    else:
+        # azimuth of the tangent; on a vertical tangent, interpolated across 360 -> 0
+        AZ = t['AZ']
+        d = (AZ[s+1] - AZ[s] + 180) % 360 - 180
+        horizontal = np.hypot(tangent[:, 0], tangent[:, 1]) > 1e-12
+        azD = np.where(horizontal, np.degrees(np.arctan2(tangent[:, 0], tangent[:, 1])), AZ[s] + p*d) % 360
+        azD[~reached] = np.nan
+    x, y, z = pos.T
+    return {"P_L": np.stack([x, y, z]), "x_L": x, "y_L": y, "z_L": z,
+            "md_L": md,
+            "inclD_L": inclD, "aziD_L": azD, "azD_L": azD,
+            "incl_L": np.radians(inclD), "az_L": np.radians(azD)}
+
+
+# %%
+# *********************************************************************
+def check_layer_constraints(trajectories, # list of trajectories, dict or Trajectory
+                            lay_conM, # per well: None or [{'layer': depth or points, 'con': [str, ...]}, ...]
+                            indices=None, # well index of each trajectory, default 0, 1, ...
+                            tol=1e-3, # g >= -tol counts as satisfied (rounding of an active constraint)
+                            ):
+    """
+    return: list of dict per (well, layer, constraint):
+        well, layer, constraint, margin (g value), satisfied, reached,
+        x_L, y_L, md_L, inclD_L, aziD_L
+    """
+    indices = range(len(trajectories)) if indices is None else indices
+
+    # (well, layer) points, well by well
+    rows, point_vars, offset = [], [], 0
+    for traj, well in zip(trajectories, indices):
+        cons = lay_conM[well] if lay_conM is not None else None
+        if not cons:
+            continue
+        point_vars.append(layer_points(traj, [c['layer'] for c in cons]))
+        for k, c in enumerate(cons):
+            for expr in c.get('con') or []:
+                layer = c['layer'] if np.ndim(c['layer']) == 0 else f"surface ({len(c['layer'])} points)"
+                rows.append((well, layer, expr, offset + k))
+        offset += len(cons)
+    if not rows:
+        return []
+    # all the points as one column each, [..., offset]: P_L is (3, offset)
+    points = {name: np.concatenate([pv[name] for pv in point_vars], axis=-1) for name in point_vars[0]}
+
+    # one evaluation per distinct expression, over all its points
+    margin = np.empty(len(rows))
+    by_expr = {}
+    for r, row in enumerate(rows):
+        by_expr.setdefault(row[2], []).append(r)
+    for expr, rs in by_expr.items():
+        f = compile_expr(expr, LAYER_VARS)
+        cols = [rows[r][3] for r in rs]
+        margin[rs] = np.broadcast_to(f(**{name: points[name][..., cols] for name in f.names}), (len(rs),))
+
+    report = []
+    for r, (well, layer, expr, k) in enumerate(rows):
+        reached = not np.isnan(points['z_L'][k])
+        report.append({
+            "well": well,
+            "layer": layer,
+            "constraint": expr,
+            "margin": float(margin[r]),
+            "satisfied": bool(reached and margin[r] >= -tol),
+            "reached": reached,
+            **{name: float(points[name][k]) for name in ('x_L', 'y_L', 'md_L', 'inclD_L', 'aziD_L')},
+        })
+    return report
+
+
+def check_lay_conM(input_data, # formatted json data (with the "other" block from the request)
+                   output, # response content (dict) or Result
+                   tol=1e-3):
+    """
+    Same as check_layer_constraints, taking lay_conM and the well indices from the
+    input, and the trajectories from the output.
+    """
+    block = input_data['FIELDOPT INPUT BLOCK']
+    lay_conM = block['lay_conM']['VALUE']
+    data = output.data if hasattr(output, 'data') else output['data']
+    trajectories = data['Trajectories']
+
+    other = input_data.get('other', {})
+    if 'indices' in other:
+        indices = other['indices']
+    elif 'index' in other:
+        indices = [other['index']]
+    else:
+        indices = list(range(len(trajectories)))
+    return check_layer_constraints(trajectories, lay_conM, indices=indices, tol=tol)
+
+
+def print_report(report):
+    for row in report:
+        state = "ok" if row['satisfied'] else ("NOT REACHED" if not row['reached'] else "VIOLATED")
+        print(f"well #{row['well']}, layer {row['layer']}: {row['constraint']} = "
+              f"{row['margin']:.2f} [{state}]")
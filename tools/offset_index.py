@@ -0,0 +1,133 @@
+"""
+automatic offset-well prefiltering for anticollision, with a KD-tree over the
+offset survey nodes.
+
+The design envelope of the new well is a corridor around its nominal path:
+build from the KOP along VK with radius rM[0] until heading to the target, then
+hold to the target. The corridor half-width defaults to the landing radius
+rM[-1], which covers the landing turn to VT and moderate detours.
+
+An offset node is relevant if it is within the corridor widened by its safe distance:
+    distance to the nominal path <= width + safe
+    safe = max(SF, opt_factor) * (safeDist_offset(md_offset) + max safeDist_new(md_new))
+The KD-tree gives the nodes near samples of the nominal path, then the exact
+test runs on those nodes only.
+
+Usage:
+    index = OffsetIndex(Nodes_offset_list) # once per field
+    wells = index.query(PKM[0], PTM[0], VKM[0], rM[0],
+                        safeDist_offset_f="2.5+(md/300)**2",
+                        safeDist_new_f="2.5+(md/500)**2")
+    anticol_con = index.anticol_con(wells, "2.5+(md/300)**2", "2.5+(md/500)**2")
+"""
+import numpy as np
+from scipy.spatial import cKDTree
+
+from tools.expressions import eval_md_expr
+
+
+# %%
+# *********************************************************************
+class OffsetIndex:
+    def __init__(self, Nodes_offset_list): # list of (?, 4) arrays [x, y, z, MD]
+        self.Nodes_offset_list = [np.asarray(nodes, dtype=np.float64) for nodes in Nodes_offset_list]
+        nodes = np.concatenate(self.Nodes_offset_list, axis=0)
+        self.xyz = nodes[:, :3]
+        self.md = nodes[:, 3]
+        # offset well index of each node
+        self.well = np.repeat(np.arange(len(self.Nodes_offset_list)),
+                              [n.shape[0] for n in self.Nodes_offset_list])
+        self.tree = cKDTree(self.xyz)
+
+    @staticmethod
+    def nominal_path(PK, PT, VK, r_K, step=30.0):
+        """
+        Build-hold path from PK (direction VK, radius r_K) to PT, as (m, 3) points.
+        Straight line if PT is inside the turning circle (see tools.precheck).
+        """
+        PK, PT, VK = (np.asarray(v, dtype=np.float64) for v in (PK, PT, VK))
+        v = VK/np.linalg.norm(VK)
+        d = PT - PK
+        a = d @ v # along VK
+        b_vec = d - a*v
+        b = np.linalg.norm(b_vec) # perpendicular to VK
+        D2 = a**2 + (b - r_K)**2 # squared distance target - circle center
+        if b == 0 or D2 <= r_K**2:
+            return np.vstack((PK, PT))
+        u = b_vec/b
+        t = np.sqrt(D2 - r_K**2) # tangent length
+        theta = np.arctan2(b - r_K, a) + np.arctan2(r_K, t) # build angle
+        phi = np.linspace(0.0, theta, max(2, int(np.ceil(r_K*theta/step)) + 1))
+        arc = PK + np.outer(r_K*np.sin(phi), v) + np.outer(r_K*(1 - np.cos(phi)), u)
+        return np.vstack((arc, PT))
+
+    def query(self,
+              PK, PT, VK, # (3,) KOP location and direction, target location
+              r, # turning radius of the new well, [r_KOP, (r_Control), r_Target]
+              safeDist_offset_f=0.0, # str expression of md, or a number, for all offset wells
+              safeDist_new_f=0.0, # str expression of md, or a number
+              SF=1.0,
+              opt_factor=1.0,
+              width=None, # corridor half-width (m), default: r[-1]
+              ):
+        """
+        Indices of the offset wells that come within the widened corridor.
+        """
+        r = np.atleast_1d(np.asarray(r, dtype=np.float64))
+        width = r[-1] if width is None else width
+        path = self.nominal_path(PK, PT, VK, r[0])
+        seg_len = np.linalg.norm(np.diff(path, axis=0), axis=1)
+
+        # the new well's MD (from the surface) is at most |PK depth| + path length + detour
+        md_new = np.linspace(0.0, abs(path[0, 2]) + seg_len.sum() + 2*width, 64)
+        safe_new = eval_md_expr(safeDist_new_f, md_new).max()
+        factor = max(SF, opt_factor)
+        safe_max = factor*(eval_md_expr(safeDist_offset_f, self.md).max() + safe_new)
+
+        # candidates: nodes near samples of the path, samples at most `width` apart
+        n_sub = np.maximum(1, np.ceil(seg_len/width)).astype(int)
+        samples = np.vstack([path[i] + np.outer(np.arange(n_sub[i])/n_sub[i], path[i+1] - path[i])
+                             for i in range(len(seg_len))] + [path[-1:]])
+        hits = self.tree.query_ball_point(samples, 1.5*width + safe_max)
+        idx = np.unique(np.concatenate([np.asarray(h, dtype=np.intp) for h in hits]))
+        if idx.size == 0:
+            return []
+
+        # exact test on the candidates: distance to the nearest path segment
+        P = self.xyz[idx]
+        A, B = path[:-1], path[1:]
+        AB = B - A
+        L2 = np.maximum(np.einsum("ij,ij->i", AB, AB), 1e-12)
+        t = np.clip(np.einsum("pij,ij->pi", P[:, None, :] - A[None], AB)/L2, 0.0, 1.0)
+        dist = np.linalg.norm(P[:, None, :] - (A[None] + t[..., None]*AB[None]), axis=2).min(axis=1)
+        safe = factor*(eval_md_expr(safeDist_offset_f, self.md[idx]) + safe_new)
+        hit = dist <= width + safe
+        return np.unique(self.well[idx[hit]]).tolist()
+
+    def anticol_con(self,
+                    wells, # offset well indices, e.g. from query
+                    safeDist_offset_f="2.5+(md/300)**2",
+                    safeDist_new_f="2.5+(md/500)**2",
+                    opt_factor=2,
+                    SF=1,
+                    ):
+        """
+        anticol_con dict for input2json, with the selected offset wells.
+        """
+        return {
+            "Nodes_offset_list": [self.Nodes_offset_list[w] for w in wells],
+            "safeDist_offset_f_list": [safeDist_offset_f]*len(wells),
+            "safeDist_new_f_list": [safeDist_new_f]*len(wells),
+            "opt_factor_list": [opt_factor]*len(wells),
+            "SF_list": [SF]*len(wells),
+        }
+
+
+def survey_nodes(survey):
+    """
+    (?, 4) [x, y, z, MD] array from one survey dict (e.g. survey_data.json["SURVEY"][i]).
+    """
+    try:
+        return np.array([survey['X'], survey['Y'], survey['Z'], survey['MD']], dtype=np.float64).T
+    except KeyError:
+        return np.array([survey['EAST'], survey['NORTH'], survey['TVD'], survey['MD']], dtype=np.float64).T
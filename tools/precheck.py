@@ -0,0 +1,235 @@
+"""
+client-side feasibility pre-check of the well inputs, before sending a request.
+
+All checks are vectorized over the wells, so a field of hundreds of wells is
+checked in about a millisecond. Malformed inputs and geometrically impossible
+wells are reported without a server round-trip.
+
+Checks:
+    shape      PTM/VTM/PKM/VKM must be (n, 3), DLSM (n, 2) or (n, 3), rM same as DLSM,
+               per-well lists (tag, ObjM, neconM, lay_conM, cst_radiusM, MD_intervalM) of length n
+    value      NaN in PTM/VTM/VKM, NaN depth of PKM, zero-length VTM/VKM,
+               DLS or turning radius <= 0
+    expression ObjM/neconM/lay_conM/anticol_con strings must be valid (tools.expressions),
+               unknown variable names are warnings
+    geometry   (only when the KOP location is fully given)
+               the target must lie outside the turning circle of the KOP, i.e.,
+               reachable by the build arc (radius rM[:,0]) and then a straight line;
+               and the KOP must lie outside the turning circle of the target
+               (radius rM[:,-1], drilling direction reversed).
+               Inside these circles the well can only be reached by looping back.
+
+Usage:
+    report = check_wells(n, PTM, VTM, PKM, VKM, DLSM)
+    report['ok'] # (n,) bool, wells without errors
+    for issue in report['issues']:
+        print(issue)
+    print_report(report)
+"""
+import numpy as np
+
+from tools.expressions import (validate_expr, SAFE_DIST_VARS, LAYER_VARS,
+                               NECON_VARS, OBJ_VARS)
+
+
+def _issue(well, field, code, message, level="error"):
+    return {"well": well, "field": field, "code": code, "message": message, "level": level}
+
+
+def _as_array(value, dtype=np.float64):
+    if value is None:
+        return None
+    try:
+        return np.array(value, dtype=dtype)
+    except (TypeError, ValueError):
+        return None
+
+
+# %%
+# *********************************************************************
+def check_wells(n, # number of wells
+                PTM, VTM, PKM, VKM, # shape:(n, 3)
+                DLSM, # shape:(n, 2) or (n, 3)
+                rM=None, # same shape as DLSM, overwrites DLSM if provided
+                tag=None,
+                ObjM=None,
+                neconM=None,
+                lay_conM=None,
+                cst_radiusM=None,
+                MD_intervalM=None,
+                anticol_con=None,
+                ):
+    """
+    Check the arrays given to input2json.
+
+    return: dict
+        ok: (n,) bool array, True for wells without errors
+        issues: list of dict(well, field, code, message, level)
+                well is None for issues of the whole input
+    """
+    issues = []
+    n = int(n)
+    ok = np.ones(n, dtype=bool)
+
+    def flag(mask, field, code, message, level="error"):
+        # one issue per flagged well
+        for i in np.flatnonzero(mask):
+            issues.append(_issue(int(i), field, code, message, level))
+        if level == "error":
+            ok[mask] = False
+
+    # ---------------------------------------------------------------
+    # shapes
+    arrays = {}
+    for field, value in (("PTM", PTM), ("VTM", VTM), ("PKM", PKM), ("VKM", VKM)):
+        arr = _as_array(value)
+        if arr is None or arr.shape != (n, 3):
+            shape = None if arr is None else arr.shape
+            issues.append(_issue(None, field, "shape", f"{field} must have shape ({n}, 3), got {shape}"))
+        else:
+            arrays[field] = arr
+
+    DLS = _as_array(DLSM)
+    if DLS is None or DLS.ndim != 2 or DLS.shape[0] != n or DLS.shape[1] not in (2, 3):
+        shape = None if DLS is None else DLS.shape
+        issues.append(_issue(None, "DLSM", "shape", f"DLSM must have shape ({n}, 2) or ({n}, 3), got {shape}"))
+        DLS = None
+
+    r = _as_array(rM)
+    if rM is not None:
+        if r is None or DLS is None or r.shape != DLS.shape:
+            shape = None if r is None else r.shape
+            issues.append(_issue(None, "rM", "shape", f"rM must have the same shape as DLSM, got {shape}"))
+            r = None
+    elif DLS is not None:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            r = 30*180/DLS/np.pi
+
+    for field, value in (("tag", tag), ("ObjM", ObjM), ("neconM", neconM), ("lay_conM", lay_conM)):
+        if value is not None and len(value) != n:
+            issues.append(_issue(None, field, "shape", f"{field} must have {n} items, got {len(value)}"))
+    for field, value in (("cst_radiusM", cst_radiusM), ("MD_intervalM", MD_intervalM)):
+        # (None,) means "use the default"
+        if value is not None and len(value) not in (1, n):
+            issues.append(_issue(None, field, "shape", f"{field} must have 1 or {n} items, got {len(value)}"))
+
+    if any(issue["well"] is None for issue in issues):
+        ok[:] = False
+        return {"ok": ok, "issues": issues}
+
+    # ---------------------------------------------------------------
+    # values
+    PT, VT, PK, VK = arrays["PTM"], arrays["VTM"], arrays["PKM"], arrays["VKM"]
+    flag(np.isnan(PT).any(axis=1), "PTM", "nan", "target location has NaN")
+    flag(np.isnan(VT).any(axis=1), "VTM", "nan", "target direction has NaN")
+    flag(np.isnan(VK).any(axis=1), "VKM", "nan", "KOP direction has NaN")
+    flag(np.isnan(PK[:, 2]), "PKM", "nan", "KOP depth is NaN")
+
+    VT_len = np.linalg.norm(VT, axis=1)
+    VK_len = np.linalg.norm(VK, axis=1)
+    flag(VT_len == 0, "VTM", "zero_vector", "target direction is a zero-length vector")
+    flag(VK_len == 0, "VKM", "zero_vector", "KOP direction is a zero-length vector")
+
+    if rM is None:
+        bad_r = ~((DLS > 0) & np.isfinite(DLS)).all(axis=1) # also catches NaN
+        flag(bad_r, "DLSM", "non_positive", "DLS must be positive")
+    else:
+        bad_r = ~((r > 0) & np.isfinite(r)).all(axis=1)
+        flag(bad_r, "rM", "non_positive", "turning radius must be positive")
+
+    # ---------------------------------------------------------------
+    # geometry, for wells with a fully given KOP
+    known = ~np.isnan(PK).any(axis=1) & ok
+    if known.any():
+        with np.errstate(divide="ignore", invalid="ignore"):
+            d = PT - PK
+            # build arc from the KOP
+            inside_K = _inside_turning_circle(d, VK/VK_len[:, None], r[:, 0])
+            # landing arc at the target, going backwards
+            inside_T = _inside_turning_circle(-d, -VT/VT_len[:, None], r[:, -1])
+        flag(known & inside_K, "PTM", "too_close_to_kop",
+             "target is inside the turning circle of the KOP, unreachable with this DLS")
+        flag(known & inside_T & ~inside_K, "PKM", "too_close_to_target",
+             "KOP is inside the turning circle of the target, unreachable with this DLS")
+
+    # ---------------------------------------------------------------
+    # expression strings
+    for i, field, expr, variables in _expressions(n, ObjM, neconM, lay_conM, anticol_con):
+        error = validate_expr(expr, None)
+        if error is not None:
+            issues.append(_issue(i, field, "expression", error))
+            if i is None:
+                ok[:] = False
+            else:
+                ok[i] = False
+        elif validate_expr(expr, variables) is not None:
+            # the server may know more variables than the client
+            issues.append(_issue(i, field, "expression", validate_expr(expr, variables), level="warning"))
+
+    return {"ok": ok, "issues": issues}
+
+
+def _expressions(n, ObjM, neconM, lay_conM, anticol_con):
+    # (well, field, expression, variables) of all expression strings
+    for i in range(n):
+        if ObjM is not None and ObjM[i] is not None:
+            yield i, "ObjM", ObjM[i], OBJ_VARS
+        if neconM is not None and neconM[i] is not None:
+            for expr in neconM[i]:
+                yield i, "neconM", expr, NECON_VARS
+        if lay_conM is not None and lay_conM[i] is not None:
+            for layer in lay_conM[i]:
+                for expr in layer.get('con') or []:
+                    yield i, "lay_conM", expr, LAYER_VARS
+    if anticol_con is not None:
+        for key in ("safeDist_offset_f_list", "safeDist_new_f_list"):
+            for expr in anticol_con.get(key) or []:
+                if isinstance(expr, str):
+                    yield None, f"anticol_con.{key}", expr, SAFE_DIST_VARS
+
+
+def _inside_turning_circle(d, v, r):
+    """
+    Whether the points d (relative to the start, (n, 3)) are strictly inside the
+    circle of radius r tangent to the unit direction v, in the plane of d and v.
+    Such points can't be reached by an arc (curvature <= 1/r) and a straight line.
+    """
+    a = np.einsum("ij,ij->i", d, v) # along v
+    b = np.linalg.norm(d - a[:, None]*v, axis=1) # perpendicular to v
+    # distance to the circle center (0, r) in the (a, b) plane is < r
+    return a**2 + b**2 < 2*r*b*(1 - 1e-9)
+
+
+# %%
+# *********************************************************************
+def check_input_data(input_data):
+    """
+    Same as check_wells, for the formatted json data from input2json.
+    """
+    block = input_data['FIELDOPT INPUT BLOCK']
+    value = lambda key: block[key]['VALUE'] if key in block else None
+    anticol_con = {key: item['VALUE'] for key, item in block['anticol_con'].items()} \
+        if 'anticol_con' in block else None
+
+    def nan(arr): # null -> np.nan
+        if arr is None:
+            return None
+        return [[np.nan if v is None else v for v in row] if isinstance(row, list) else row
+                for row in arr]
+
+    return check_wells(value('n'),
+                       nan(value('PTM')), nan(value('VTM')), nan(value('PKM')), nan(value('VKM')),
+                       nan(value('DLSM')), rM=nan(value('rM')),
+                       tag=value('tag'), ObjM=value('ObjM'),
+                       neconM=value('neconM'), lay_conM=value('lay_conM'),
+                       cst_radiusM=value('cst_radiusM'), MD_intervalM=value('MD_intervalM'),
+                       anticol_con=anticol_con)
+
+
+def print_report(report):
+    if not report["issues"]:
+        print("pre-check passed")
+        return
+    for issue in report["issues"]:
+        well = "all wells" if issue["well"] is None else f"well #{issue['well']}"
+        print(f"[{issue['level']}] {well}, {issue['field']}: {issue['message']}")
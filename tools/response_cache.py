@@ -0,0 +1,143 @@
+"""
+on-disk cache of API responses, keyed by the content of the request.
+
+The key is the sha256 of the API url and the canonical JSON of input_data,
+including the "other" block (index/indices/getContour(s)) added by APIhandler.
+So the same problem sent to the same API always hits the same entry,
+no matter the key order in the input dict.
+
+Each entry is one JSON file in cache_dir. The file's modification time is
+refreshed on every hit and used as the "last used" time for LRU eviction:
+    entries older than max_age (s) are removed,
+    then the least recently used entries are removed until the total size
+    is below max_size (bytes).
+
+Usage:
+    cache = ResponseCache("api_cache", max_size=500e6, max_age=30*24*3600)
+    output = get_1well(input_data, cache=cache) # server
+    output = get_1well(input_data, cache=cache) # disk, in milliseconds
+    print(cache.stats())
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+
+
+class ResponseCache:
+    def __init__(self,
+                 cache_dir="api_cache", # directory for the cached responses
+                 max_size=None, # maximum total size of the cache (bytes), None: no limit
+                 max_age=None, # maximum age of an entry since last use (s), None: no limit
+                 ):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    # ------------------------------------------------------------------
+    @staticmethod
+    def key(url, input_data):
+        """
+        Canonical hash of the API url and the request content.
+        """
+        canonical = json.dumps([url, input_data], sort_keys=True,
+                               separators=(",", ":"), ensure_ascii=False)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + ".json")
+
+    # ------------------------------------------------------------------
+    def get(self, url, input_data):
+        """
+        Return the cached response content (dict), or None if not cached.
+        """
+        path = self._path(self.key(url, input_data))
+        try:
+            if self.max_age is not None and \
+                    time.time() - os.path.getmtime(path) > self.max_age:
+                os.remove(path) # expired
+                raise FileNotFoundError(path)
+            with open(path, "r", encoding="utf-8") as f:
+                content = json.load(f)
+            os.utime(path) # mark as recently used
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return content
+
+    def put(self, url, input_data, content):
+        """
+        Save the response content (dict) and evict old entries if needed.
+        """
+        path = self._path(self.key(url, input_data))
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(content, f, separators=(",", ":"))
+        os.replace(tmp, path) # atomic, readers never see a partial file
+        self.evict()
+
+    # ------------------------------------------------------------------
+    def _entries(self):
+        # [(last used time, size, path), ...], least recently used first
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(path)
+            except OSError: # removed by another thread/process
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        entries.sort()
+        return entries
+
+    def evict(self):
+        """
+        Remove entries by age, then by LRU order until within max_size.
+        """
+        if self.max_size is None and self.max_age is None:
+            return
+        entries = self._entries()
+        now = time.time()
+        total = sum(e[1] for e in entries)
+        for mtime, size, path in entries:
+            expired = self.max_age is not None and now - mtime > self.max_age
+            oversize = self.max_size is not None and total > self.max_size
+            if not (expired or oversize):
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+    def clear(self):
+        for _, _, path in self._entries():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def stats(self):
+        """
+        Hit/miss counters and the current cache size.
+        """
+        entries = self._entries()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits/lookups if lookups else 0.0,
+            "entries": len(entries),
+            "size": sum(e[1] for e in entries), # bytes
+        }
@@ -0,0 +1,343 @@
+"""
+compact binary store of API results, read with memory maps.
+
+The pretty-printed output.json of one 4-well get_1site run is ~340 KB, most of it
+the contour lists. A ResultStore keeps many runs in one directory, in a few
+append-only files:
+    traj.f64: the trajectory nodes of all wells, float64 rows [MD, X, Y, Z, INCL, AZ, DLS]
+              (NaN for a column the endpoint doesn't return, e.g. DLS of 1site)
+    wells.idx: one record per well: run, well index, tag, endpoint, offset and
+               number of rows in traj.f64, COST
+    grid.f32: the contour costs, float32 (ny, nx) or (n, ny, nx) blocks (NaN: infeasible)
+    grids.idx: one record per contour: run, name (CostASite, CostNWells, ...),
+               origin, step, shape, offset in grid.f32
+    runs.jsonl: one line per run: run id, endpoint, status, message, error_details,
+                source, and the other data as JSON (e.g. AnticolReport, CostKSites: None)
+Only runs.jsonl is parsed when the store is opened. The binary files are
+memory-mapped: reading one well of a 10,000-run store reads its index records and
+its own rows, nothing else.
+
+A run is in the store once its line is in runs.jsonl (written last). A store has one
+writer at a time (no locking): opening it for writing truncates the records of a run
+that was not committed (e.g. the writer crashed in add). Readers open it with
+readonly=1 any time, and ignore such records.
+
+Usage:
+    store = ResultStore("results_store") # ResultStore("results_store", readonly=1) to read only
+    store.add(content, run_id="case_12", tags=["A1", "A2"]) # or get_1site(..., store=store)
+    store.import_json("Demos/get_1site/ex1/output.json") # existing outputs, see convert()
+    store.find(tag="A1") # matching well records
+    traj = store.trajectory("case_12", tag="A1") # tools.results.Trajectory
+    grid = store.contour("case_12", "CostASite") # tools.cost_grid.CostContour (memmap)
+"""
+import glob
+import json
+import os
+
+import numpy as np
+
+from tools.cost_grid import CostContour
+from tools.results import Trajectory, Contour, Result
+
+columns = Trajectory.columns # MD, X, Y, Z, INCL, AZ, DLS
+
+well_dtype = np.dtype([("run", "<i4"), ("well", "<i4"), ("tag", "S32"), ("endpoint", "S8"),
+                       ("offset", "<i8"), ("length", "<i4"), ("cost", "<f8")])
+grid_dtype = np.dtype([("run", "<i4"), ("name", "S16"), ("x0", "<f8"), ("y0", "<f8"),
+                       ("dx", "<f8"), ("dy", "<f8"), ("n", "<i4"), ("ny", "<i4"), ("nx", "<i4"),
+                       ("offset", "<i8")])
+
+
+def guess_endpoint(content):
+    # output.json doesn't say which endpoint made it: 1well returns CostWells/Contours
+    data = content.get("data") or {}
+    if "CostWells" in data or "Contours" in data or "AnticolReport" in data:
+        return "1well"
+    if data.get("CostKSites") is not None:
+        return "ksites"
+    return "1site"
+
+
+# %%
+# *********************************************************************
+class ResultStore:
+    def __init__(self,
+                 path, # store directory, created if missing
+                 readonly=0, # 1: don't write, and don't truncate an uncommitted run
+                 ):
+        self.path = path
+        self.readonly = readonly
+        if readonly != 1:
+            os.makedirs(path, exist_ok=True)
+        self.runs = [] # run number -> {"run": id, "endpoint", "status", "message", ...}
+        self._number = {} # run id -> run number
+        runs_path = self._file("runs.jsonl")
+        committed = 0 # bytes of runs.jsonl up to the last complete line
+        if os.path.exists(runs_path):
+            with open(runs_path, "rb") as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break # cut by a crash
+                    committed += len(line)
+                    if line.strip():
+                        self._register(json.loads(line))
+        self._maps = {} # file name -> (size, memmap), remapped when the file grew
+        if readonly != 1:
+            self._truncate(committed)
+
+    def _truncate(self, committed):
+        # drop the records of a run whose line was not written (add writes it last)
+        n = len(self.runs)
+        files = (("wells.idx", well_dtype, "traj.f64", 8*len(columns)),
+                 ("grids.idx", grid_dtype, "grid.f32", 4))
+        for index_name, dtype, data_name, itemsize in files:
+            records = np.array(self._map(index_name, dtype)) # a copy, the file is truncated below
+            self._maps.pop(index_name, None)
+            keep = int(np.searchsorted(records["run"], n)) # records are in run order
+            end = 0
+            if keep > 0:
+                kept = records[:keep]
+                if dtype is well_dtype:
+                    end = int((kept["offset"] + kept["length"]).max())
+                else:
+                    size = np.maximum(kept["n"], 1).astype(np.int64)*kept["ny"]*kept["nx"]
+                    end = int((kept["offset"] + size).max())
+            for name, size in ((index_name, keep*dtype.itemsize), (data_name, end*itemsize)):
+                path = self._file(name)
+                if os.path.exists(path) and os.path.getsize(path) > size:
+                    print(f"{path}: dropping {os.path.getsize(path) - size} bytes of an uncommitted run")
+                    with open(path, "r+b") as f:
+                        f.truncate(size)
+        runs_path = self._file("runs.jsonl")
+        if os.path.exists(runs_path) and os.path.getsize(runs_path) > committed:
+            with open(runs_path, "r+b") as f:
+                f.truncate(committed)
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def _register(self, run):
+        self._number[run["run"]] = len(self.runs)
+        self.runs.append(run)
+
+    def _map(self, name, dtype, shape=None):
+        path = self._file(name)
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        if size == 0:
+            return np.zeros((0,) + (shape or ()), dtype=dtype)
+        cached = self._maps.get(name)
+        if cached is None or cached[0] != size:
+            rows = size//(np.dtype(dtype).itemsize*int(np.prod(shape or (1,))))
+            cached = (size, np.memmap(path, dtype=dtype, mode="r", shape=(rows,) + (shape or ())))
+            self._maps[name] = cached
+        return cached[1]
+
+    # ==================================================================================
+    def add(self,
+            content, # response content (dict) or Result
+            run_id=None, # unique name of the run, default: "run<number>"
+            endpoint=None, # "1well", "1site" or "ksites", default: guessed from the data keys
+            tags=None, # list of well tags, default: "well<index>"
+            source="", # e.g. the output.json it came from
+            ):
+        """
+        Append one result to the store. The data that are neither trajectories nor
+        contours (e.g. AnticolReport) are kept as JSON in the run line.
+
+        return: run id
+        """
+        if self.readonly == 1:
+            raise ValueError(f"store {self.path!r} is open read-only")
+        if isinstance(content, Result):
+            content = content.to_dict()
+        run_id = f"run{len(self.runs)}" if run_id is None else str(run_id)
+        if run_id in self._number:
+            raise ValueError(f"run {run_id!r} is already in the store")
+        endpoint = endpoint or guess_endpoint(content)
+        number = len(self.runs)
+        data = content.get("data") or {}
+        for tag in tags or []:
+            if tag is not None and len(str(tag).encode()) > well_dtype["tag"].itemsize:
+                raise ValueError(f"tag {tag!r} is longer than {well_dtype['tag'].itemsize} bytes")
+
+        # trajectories
+        trajectories = list(data.get("Trajectories") or [])
+        wells = np.zeros(len(trajectories), dtype=well_dtype)
+        offset = self._rows("traj.f64", 8*len(columns))
+        with open(self._file("traj.f64"), "ab") as f:
+            for w, traj in enumerate(trajectories):
+                if traj is None: # e.g. a failed shard, see tools.sharding
+                    wells[w] = (number, w, b"", endpoint.encode(), offset, 0, np.nan)
+                    continue
+                traj = traj if isinstance(traj, Trajectory) else Trajectory.from_dict(traj)
+                block = np.full((len(traj), len(columns)), np.nan)
+                for j, key in enumerate(columns):
+                    if getattr(traj, key) is not None:
+                        block[:, j] = getattr(traj, key)
+                f.write(block.tobytes())
+                tag = tags[w] if tags is not None and w < len(tags) and tags[w] is not None else f"well{w}"
+                wells[w] = (number, w, str(tag).encode(), endpoint.encode(), offset, len(traj),
+                            np.nan if traj.COST is None else traj.COST)
+                offset += len(traj)
+
+        # contours
+        grids, other = [], {}
+        offset = self._rows("grid.f32", 4)
+        with open(self._file("grid.f32"), "ab") as f:
+            for name, value in data.items():
+                if name == "Trajectories":
+                    continue
+                if not Contour.is_contour(value) or not value.get("cost") \
+                        or len(name.encode()) > grid_dtype["name"].itemsize:
+                    other[name] = value
+                    continue
+                try:
+                    grid = CostContour.from_dict(value)
+                except ValueError as e:
+                    print(f"{run_id} {name} not on a regular grid, kept as JSON: {e}")
+                    other[name] = value
+                    continue
+                cost = np.ascontiguousarray(grid.cost, dtype=np.float32)
+                n = cost.shape[0] if cost.ndim == 3 else 0
+                f.write(cost.tobytes())
+                grids.append((number, name.encode(), grid.origin[0], grid.origin[1],
+                              grid.step[0], grid.step[1], n, grid.shape[0], grid.shape[1], offset))
+                offset += cost.size
+
+        with open(self._file("wells.idx"), "ab") as f:
+            f.write(wells.tobytes())
+        with open(self._file("grids.idx"), "ab") as f:
+            f.write(np.array(grids, dtype=grid_dtype).tobytes())
+        run = {"run": run_id, "endpoint": endpoint, "status": content.get("status"),
+               "message": content.get("message", ""), "error_details": content.get("error_details"),
+               "source": source, "data": other}
+        # the run line goes last: a run is in the store once its line is written
+        with open(self._file("runs.jsonl"), "a") as f:
+            f.write(json.dumps(run) + "\n")
+        self._register(run)
+        return run_id
+
+    def _rows(self, name, itemsize):
+        path = self._file(name)
+        return os.path.getsize(path)//itemsize if os.path.exists(path) else 0
+
+    def import_json(self, filepath, run_id=None, endpoint=None, tags=None):
+        """
+        Add an existing output.json. The tags are read from the input.json next to it
+        (if any and not given). The run id defaults to the file path.
+        """
+        with open(filepath, encoding="utf-8") as f:
+            content = json.load(f)
+        if tags is None:
+            input_path = os.path.join(os.path.dirname(filepath),
+                                      os.path.basename(filepath).replace("output", "input"))
+            if input_path != filepath and os.path.exists(input_path):
+                with open(input_path, encoding="utf-8") as f:
+                    tags = json.load(f)['FIELDOPT INPUT BLOCK'].get('tag', {}).get('VALUE')
+        return self.add(content, run_id=filepath if run_id is None else run_id,
+                        endpoint=endpoint, tags=tags, source=filepath)
+
+    # ==================================================================================
+    def wells(self):
+        """
+        All well records (memory-mapped structured array, see well_dtype).
+        """
+        return self._map("wells.idx", well_dtype)
+
+    def find(self, tag=None, run=None, endpoint=None):
+        """
+        Well records matching all the given tag, run id and endpoint.
+        """
+        wells = self.wells()
+        mask = wells["run"] < len(self.runs) # not an uncommitted run
+        if tag is not None:
+            mask &= wells["tag"] == str(tag).encode()
+        if run is not None:
+            mask &= wells["run"] == self._number.get(str(run), -1)
+        if endpoint is not None:
+            mask &= wells["endpoint"] == endpoint.encode()
+        return np.asarray(wells[mask])
+
+    def trajectory(self, run, well=None, tag=None): # well index or tag
+        """
+        Trajectory of one well of one run, None if the well had no trajectory.
+        """
+        records = self.find(tag=tag, run=run)
+        if well is not None:
+            records = records[records["well"] == well]
+        if records.shape[0] == 0:
+            raise KeyError(f"no well {tag if well is None else well} in run {run!r}")
+        return self._trajectory(records[0])
+
+    def _trajectory(self, record):
+        if record["length"] == 0:
+            return None
+        traj = self._map("traj.f64", np.float64, (len(columns),))
+        rows = np.array(traj[record["offset"]:record["offset"] + record["length"]])
+        cols = {key: None if np.isnan(rows[:, j]).all() else rows[:, j]
+                for j, key in enumerate(columns)}
+        return Trajectory(COST=None if np.isnan(record["cost"]) else record["cost"], **cols)
+
+    def contour(self, run, name="CostASite"):
+        """
+        CostContour of one contour of one run; the cost is a read-only view of the store.
+        """
+        grids = self._map("grids.idx", grid_dtype)
+        match = np.flatnonzero((grids["run"] == self._number.get(str(run), -1)) &
+                               (grids["name"] == name.encode()))
+        if match.size == 0:
+            raise KeyError(f"no {name} in run {run!r}")
+        g = grids[match[0]]
+        shape = ((int(g["n"]),) if g["n"] > 0 else ()) + (int(g["ny"]), int(g["nx"]))
+        values = self._map("grid.f32", np.float32)
+        cost = values[g["offset"]:g["offset"] + int(np.prod(shape))].reshape(shape)
+        return CostContour((g["x0"], g["y0"]), (g["dx"], g["dy"]), cost)
+
+    def content(self, run):
+        """
+        The run as a response content dict (trajectories, contours and other data).
+        """
+        info = self.runs[self._number[str(run)]]
+        records = self.find(run=run)
+        data = {"Trajectories": [None if t is None else t.to_dict()
+                                 for t in (self._trajectory(r) for r in records)]}
+        data.update(info.get("data") or {})
+        grids = self._map("grids.idx", grid_dtype)
+        for g in grids[grids["run"] == self._number[str(run)]]:
+            name = g["name"].decode()
+            grid = self.contour(run, name)
+            cost = np.asarray(grid.cost, dtype=np.float64)
+            data[name] = Contour(grid.X.ravel(), grid.Y.ravel(),
+                                 cost.reshape(cost.shape[:-2] + (-1,))).to_dict()
+        return {"status": info["status"], "data": data, "message": info["message"],
+                "error_details": info.get("error_details")}
+
+    def __len__(self):
+        return len(self.runs)
+
+    def __repr__(self):
+        return f"ResultStore({self.path!r}, runs={len(self.runs)}, wells={self.wells().shape[0]})"
+
+
+# %%
+# *********************************************************************
+def convert(pattern, # glob of output.json files, e.g. "runs/**/output*.json"
+            store_path, # store directory
+            ):
+    """
+    Import existing JSON outputs into a store (files already in it are skipped).
+
+    return: ResultStore
+    """
+    store = ResultStore(store_path)
+    done = {run["source"] for run in store.runs}
+    paths = sorted(glob.glob(pattern, recursive=True))
+    json_size = 0
+    for filepath in paths:
+        if filepath in done:
+            continue
+        store.import_json(filepath)
+        json_size += os.path.getsize(filepath)
+    store_size = sum(os.path.getsize(store._file(name)) for name in os.listdir(store_path))
+    print(f"{len(paths)} files ({json_size/1024:.1f} KB imported), store {store_size/1024:.1f} KB")
+    return store
@@ -0,0 +1,196 @@
+"""
+typed, array-backed API results.
+
+The response content is decoded once (dict of lists) and converted to NumPy
+arrays, so the per-float Python objects can be freed right away:
+    Result: the whole response; Result.data mirrors response["data"]
+    Trajectory: one well trajectory, float64 arrays MD, X, Y, Z, INCL, AZ, DLS + COST
+    Contour: cost grid nodes, flat float64 arrays X, Y and cost
+             cost is (m,) for one contour (e.g. CostASite),
+             or (n, m) for one contour per well (e.g. CostNWells)
+             missing values (null) are np.nan
+             Contour.grid(): regular grid with lookups, see tools.cost_grid
+
+Pretty-printing and saving to JSON are done only when asked for:
+    result.pretty(), result.save(filepath), result.to_dict()
+
+Usage:
+    result = get_1site(input_data, result=1, filepath=None)
+    result.trajectories[0].Z
+    result.cost_a_site.cost
+"""
+import json
+import numpy as np
+
+from tools.input2json import to_jsonable
+
+
+def _array(values):
+    # list (with None for null) -> float64 array (with np.nan)
+    if values is None:
+        return None
+    return np.array(values, dtype=np.float64)
+
+
+# %%
+# *********************************************************************
+class Trajectory:
+    columns = ("MD", "X", "Y", "Z", "INCL", "AZ", "DLS")
+
+    def __init__(self, MD, X, Y, Z, INCL=None, AZ=None, DLS=None, COST=None):
+        self.MD = _array(MD)
+        self.X = _array(X)
+        self.Y = _array(Y)
+        self.Z = _array(Z)
+        self.INCL = _array(INCL)
+        self.AZ = _array(AZ)
+        self.DLS = _array(DLS)
+        self.COST = None if COST is None else float(COST)
+
+    @classmethod
+    def from_dict(cls, traj):
+        return cls(**{key: traj.get(key) for key in cls.columns + ("COST",)})
+
+    def to_dict(self):
+        out = {key: to_jsonable(getattr(self, key)) for key in self.columns
+               if getattr(self, key) is not None}
+        out["COST"] = self.COST
+        return out
+
+    def array(self):
+        """
+        [X, Y, Z, MD, (INCL, AZ, DLS)] as an (m, 4~7) array, the format PlotSurvey takes.
+        """
+        cols = [self.X, self.Y, self.Z, self.MD]
+        for col in (self.INCL, self.AZ, self.DLS):
+            if col is None:
+                break
+            cols.append(col)
+        return np.column_stack(cols)
+
+    def __getitem__(self, key): # trajectory['X'], same as the dict from the response
+        if key not in self.columns + ("COST",):
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key):
+        return key in self.columns + ("COST",) and getattr(self, key) is not None
+
+    def __len__(self):
+        return self.MD.shape[0]
+
+    def __repr__(self):
+        return f"Trajectory(nodes={len(self)}, MD={self.MD[-1]:.2f}, COST={self.COST})"
+
+
+# %%
+# *********************************************************************
+class Contour:
+    def __init__(self, X, Y, cost):
+        self.X = _array(X)
+        self.Y = _array(Y)
+        cost = _array(cost)
+        # empty cost list means "not computed" (e.g. getContours=0)
+        self.cost = None if cost is None or cost.size == 0 else cost
+
+    @classmethod
+    def from_dict(cls, contour):
+        return cls(contour.get("X"), contour.get("Y"), contour.get("cost"))
+
+    @staticmethod
+    def is_contour(value):
+        return isinstance(value, dict) and {"X", "Y", "cost"} <= value.keys()
+
+    def grid(self):
+        """
+        CostContour (tools.cost_grid) of this contour: regular grid, bilinear lookups, argmin.
+        """
+        from tools.cost_grid import CostContour
+        return CostContour.from_contour(self)
+
+    def to_dict(self):
+        return {"X": to_jsonable(self.X), "Y": to_jsonable(self.Y),
+                "cost": [] if self.cost is None else to_jsonable(self.cost)}
+
+    def __repr__(self):
+        shape = None if self.cost is None else self.cost.shape
+        return f"Contour(nodes={self.X.shape[0]}, cost shape={shape})"
+
+
+# %%
+# *********************************************************************
+class Result:
+    def __init__(self, status, data, message="", error_details=None):
+        self.status = status
+        self.data = data # dict, typed version of response["data"]
+        self.message = message
+        self.error_details = error_details
+
+    @classmethod
+    def from_dict(cls, content):
+        """
+        Convert the decoded response content (dict) to typed objects.
+        """
+        data = content.get("data")
+        if isinstance(data, dict):
+            typed = {}
+            for key, value in data.items():
+                if key == "Trajectories" and value is not None:
+                    typed[key] = [Trajectory.from_dict(t) for t in value]
+                elif Contour.is_contour(value):
+                    typed[key] = Contour.from_dict(value)
+                else: # e.g. AnticolReport, kept as it is
+                    typed[key] = value
+            data = typed
+        return cls(content.get("status"), data,
+                   message=content.get("message", ""),
+                   error_details=content.get("error_details"))
+
+    # ------------------------------------------------------------------
+    def _get(self, key):
+        return self.data.get(key) if isinstance(self.data, dict) else None
+
+    @property
+    def trajectories(self):
+        return self._get("Trajectories")
+
+    @property
+    def cost_a_site(self):
+        return self._get("CostASite")
+
+    @property
+    def cost_n_wells(self):
+        return self._get("CostNWells")
+
+    @property
+    def anticol_report(self):
+        return self._get("AnticolReport")
+
+    # ------------------------------------------------------------------
+    def to_dict(self):
+        """
+        JSON-able dict, same structure as the response content.
+        """
+        data = self.data
+        if isinstance(data, dict):
+            data = {}
+            for key, value in self.data.items():
+                if key == "Trajectories" and value is not None:
+                    data[key] = [t.to_dict() for t in value]
+                elif isinstance(value, Contour):
+                    data[key] = value.to_dict()
+                else:
+                    data[key] = value
+        return {"status": self.status, "data": data,
+                "message": self.message, "error_details": self.error_details}
+
+    def pretty(self, indent=2):
+        return json.dumps(self.to_dict(), indent=indent)
+
+    def save(self, filepath, indent=2):
+        with open(filepath, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=indent)
+
+    def __repr__(self):
+        keys = list(self.data.keys()) if isinstance(self.data, dict) else None
+        return f"Result(status={self.status!r}, data keys={keys})"
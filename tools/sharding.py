@@ -0,0 +1,248 @@
+"""
+spatial sharding of large field problems into parallel sub-requests.
+
+For fields of hundreds of wells, the wells are split by target location into
+compact clusters of at most max_wells (recursive bisection of the target X/Y along
+the wider direction, at the median). Each cluster is sent as its own problem with
+only its wells (API.get_batch, in parallel), see shard_inputs:
+    XRange/YRange: the bounding box of the shard targets plus a margin (default: the
+                   largest turning radius of its wells), within the field range and on
+                   the field grid, so the shard grids line up
+    cluster_min/cluster_max (get_ksites): split across the shards in proportion to
+                   their number of wells, at least 1 site per shard; more shards than
+                   cluster_max is rejected with ValueError
+and the results are stitched back:
+    Trajectories: in the original well order (None for the wells of a failed shard)
+    CostNWells: per-well contours on the union of the shard grids (getContours=1,
+                shard grids with the same resolution)
+    Shards: one dict per shard: indices (original well indices), status, message,
+            elapsed, and its own CostASite / CostKSites (each shard has its own site(s))
+
+The shards are independent problems: use it when the clusters are far enough apart
+that sharing a site across them isn't worth it, or to get a fast first layout.
+The speed-up is measured only on the stub server of benchmarks/bench_sharding.py,
+whose time is c*n**2 by construction; how the real server time grows with n has
+not been measured.
+
+Usage:
+    shards = partition_wells(PTM, max_wells=30)
+    output = solve_sharded(input_data, url=url_1site, max_wells=30, max_workers=8)
+    output["data"]["Shards"][0]["indices"]
+"""
+import time
+
+import numpy as np
+
+from tools.cost_grid import CostContour
+from tools.input2json import to_jsonable
+
+# inputs with one value per well
+well_keys = ("tag", "PTM", "VTM", "PKM", "VKM", "DLSM", "rM", "ObjM",
+             "MD_intervalM", "cst_radiusM", "neconM", "lay_conM")
+
+
+# %%
+# *********************************************************************
+def partition_wells(PTM, # (n, 3) target locations
+                    max_wells=30, # maximum number of wells per shard
+                    ):
+    """
+    return: list of index arrays, one per shard
+    """
+    xy = np.asarray(PTM, dtype=np.float64)[:, :2]
+    shards, stack = [], [np.arange(xy.shape[0])]
+    while stack:
+        idx = stack.pop()
+        if idx.size <= max_wells:
+            shards.append(idx)
+            continue
+        axis = int(np.argmax(np.ptp(xy[idx], axis=0)))
+        order = idx[np.argsort(xy[idx, axis], kind="stable")]
+        half = order.size//2
+        stack += [order[half:], order[:half]]
+    return shards
+
+
+def subset_input(input_data, indices, **values):
+    """
+    Input of the wells in indices only (other parameters unchanged, except the
+    VALUE of the keys given in values, e.g. XRange=[x0, x1]).
+    """
+    block = input_data['FIELDOPT INPUT BLOCK']
+    n = block['n']['VALUE']
+    sub = {}
+    for key, item in block.items():
+        value = item.get('VALUE') if isinstance(item, dict) else None
+        if key == 'n':
+            item = {**item, 'VALUE': len(indices)}
+        elif key in values:
+            item = {**item, 'VALUE': values[key]}
+        elif key in well_keys and isinstance(value, list) and len(value) == n:
+            item = {**item, 'VALUE': [value[i] for i in indices]}
+        sub[key] = item
+    return {**{k: v for k, v in input_data.items() if k not in ('FIELDOPT INPUT BLOCK', 'other')},
+            'FIELDOPT INPUT BLOCK': sub}
+
+
+def shard_inputs(input_data, # formatted json data
+                 shards, # list of index arrays, see partition_wells
+                 margin=None, # XRange/YRange margin around the targets (m), default: largest turning radius
+                 ):
+    """
+    One input per shard (see the module doc).
+
+    return: list of formatted json data
+    """
+    block = input_data['FIELDOPT INPUT BLOCK']
+    value = lambda key: block[key]['VALUE'] if key in block else None
+    PTM = np.asarray(value('PTM'), dtype=np.float64)
+    radius = _turning_radius(value('DLSM'), value('rM'))
+    step = value('resolution')
+    step = step[0] if isinstance(step, list) and len(step) == 1 else step # [None]: not set
+    step = 100.0 if step is None else float(step) # grid of the ranges only, resolution is unchanged
+    field = [_field_range(value('XRange')), _field_range(value('YRange'))]
+
+    cluster_min, cluster_max = value('cluster_min'), value('cluster_max')
+    sizes = [idx.size for idx in shards]
+    if cluster_max is not None:
+        if len(shards) > cluster_max:
+            raise ValueError(f"{len(shards)} shards for cluster_max={cluster_max} sites: each shard "
+                             f"needs a site, increase max_wells")
+        cluster_max = _split(cluster_max, sizes)
+        cluster_min = None if cluster_min is None else \
+            np.minimum(_split(cluster_min, sizes), cluster_max).tolist()
+
+    inputs = []
+    for s, idx in enumerate(shards):
+        m = np.nanmax(radius[idx]) if margin is None else margin
+        ranges = []
+        for axis, (lo, hi) in enumerate(field):
+            a, b = PTM[idx, axis].min() - m, PTM[idx, axis].max() + m
+            origin = 0.0 if lo is None else lo
+            # on the field grid
+            a, b = origin + np.floor((a - origin)/step)*step, origin + np.ceil((b - origin)/step)*step
+            if lo is not None:
+                a, b = (max(a, lo), min(b, hi)) if max(a, lo) < min(b, hi) else (lo, hi)
+            ranges.append([float(a), float(b)])
+        values = {'XRange': ranges[0], 'YRange': ranges[1]}
+        if cluster_max is not None:
+            values.update(cluster_max=cluster_max[s], cluster_min=None if cluster_min is None else cluster_min[s])
+        inputs.append(subset_input(input_data, idx, **values))
+    return inputs
+
+
+def _field_range(value):
+    # [lo, hi] of XRange/YRange, (None, None) if not set ([None])
+    if value is None or len(value) != 2 or None in value:
+        return None, None
+    return float(min(value)), float(max(value))
+
+
+def _turning_radius(DLSM, rM):
+    # (n,) largest turning radius of each well (m), rM overrides DLSM
+    if rM is not None:
+        return np.nanmax(np.asarray(rM, dtype=np.float64), axis=1)
+    return 30*180/np.pi/np.nanmin(np.asarray(DLSM, dtype=np.float64), axis=1)
+
+
+def _split(total, sizes):
+    """
+    total split in proportion to sizes, at least 1 each (largest remainder).
+    """
+    sizes = np.asarray(sizes, dtype=np.float64)
+    share = np.maximum(total - sizes.size, 0)*sizes/sizes.sum()
+    out = np.floor(share).astype(int)
+    out[np.argsort(out - share)[:int(round(share.sum())) - out.sum()]] += 1
+    return (out + 1).tolist()
+
+
+# %%
+# *********************************************************************
+def solve_sharded(input_data, # formatted json data
+                  url=None, # get_1site or get_ksites url, default: API.url_1site
+                  max_wells=30, # maximum number of wells per shard
+                  margin=None, # see shard_inputs
+                  getContours=0,
+                  max_workers=4, # shards running at the same time
+                  timeout=300,
+                  cache=None, # ResponseCache, see API.get_batch
+                  compress=None,
+                  ):
+    """
+    return: stitched response content (dict), status "success", "partial" (some
+            shards failed) or "error" (all failed)
+    """
+    from API import get_batch, url_1site
+    url = url_1site if url is None else url
+    block = input_data['FIELDOPT INPUT BLOCK']
+    shards = partition_wells(block['PTM']['VALUE'], max_wells=max_wells)
+
+    tic = time.time()
+    results = get_batch(shard_inputs(input_data, shards, margin=margin), url=url,
+                        getContours=getContours, max_workers=max_workers, timeout=timeout,
+                        cache=cache, compress=compress)
+    content = stitch(block['n']['VALUE'], shards, results, getContours=getContours)
+    content["elapsed"] = time.time() - tic
+    return content
+
+
+def stitch(n, shards, results, getContours=0):
+    """
+    One field result from the shard results of get_batch (see solve_sharded).
+    """
+    trajectories = [None]*n
+    shard_info, failed, contours = [], [], []
+    for idx, res in zip(shards, results):
+        out = res["output"]
+        ok = res["error"] is None and out is not None and out.get("status") == "success"
+        data = out.get("data") if ok else None
+        if ok:
+            for w, trajectory in zip(idx, data.get("Trajectories") or []):
+                trajectories[w] = trajectory
+            wells = data.get("CostNWells")
+            if getContours == 1 and wells and wells.get("cost"):
+                contours.append((idx, CostContour.from_dict(wells)))
+        else:
+            failed.append({"indices": idx.tolist(),
+                           "error": res["error"] or (out or {}).get("message")})
+        shard_info.append({"indices": idx.tolist(),
+                           "status": out.get("status") if out else "error",
+                           "message": res["error"] or (out or {}).get("message", ""),
+                           "elapsed": res["elapsed"],
+                           "CostASite": data.get("CostASite") if ok else None,
+                           "CostKSites": data.get("CostKSites") if ok else None})
+
+    data = {"Trajectories": trajectories,
+            "CostASite": None,
+            "CostKSites": None,
+            "CostNWells": _union_contours(n, contours) if contours else {"X": [], "Y": [], "cost": []},
+            "Shards": shard_info}
+    status = "success" if not failed else ("partial" if len(failed) < len(shards) else "error")
+    return {"status": status, "data": data,
+            "message": f"{len(shards)} shards, {len(failed)} failed",
+            "error_details": failed or None}
+
+
+def _union_contours(n, contours):
+    """
+    Per-well contours of all shards on the union of their grids (same step),
+    as flat X, Y, cost (n, m) lists. Wells without a contour are all NaN.
+    """
+    step = contours[0][1].step
+    if any(not np.allclose(grid.step, step) for _, grid in contours):
+        print("shard grids have different resolutions, CostNWells is kept per shard")
+        return {"X": [], "Y": [], "cost": []}
+    x0 = min(grid.origin[0] for _, grid in contours)
+    y0 = min(grid.origin[1] for _, grid in contours)
+    x1 = max(grid.x[-1] for _, grid in contours)
+    y1 = max(grid.y[-1] for _, grid in contours)
+    nx = int(round((x1 - x0)/step[0])) + 1
+    ny = int(round((y1 - y0)/step[1])) + 1
+    cost = np.full((n, ny, nx), np.nan, dtype=np.float32)
+    for idx, grid in contours:
+        ix = int(round((grid.origin[0] - x0)/step[0]))
+        iy = int(round((grid.origin[1] - y0)/step[1]))
+        cost[idx, iy:iy+grid.shape[0], ix:ix+grid.shape[1]] = grid.cost
+    union = CostContour((x0, y0), step, cost)
+    return {"X": union.X.ravel().tolist(), "Y": union.Y.ravel().tolist(),
+            "cost": to_jsonable(cost.reshape(n, -1).astype(np.float64))}
@@ -0,0 +1,170 @@
+"""
+local what-if relocation of a drill site, on the cost surfaces returned by get_1site.
+
+"What if the site can't be here?": exclusion circles/polygons (seabed infrastructure,
+exclusion zones, ...) remove grid nodes, and the best feasible site is the cheapest
+remaining node of CostASite. If only CostNWells is returned, the site cost is the
+sum of the well costs (NaN if any well can't reach the node).
+
+The grid nodes are sorted by cost once. A scenario only needs the first node of that
+order outside its exclusions, so the exclusion tests run on the cheapest nodes first,
+in chunks, for all the scenarios of a batch at once.
+
+Usage:
+    whatif = SiteWhatIf(output["data"]["CostASite"], output["data"]["CostNWells"])
+    whatif.relocate(circles=[(516500, 6782400, 300)])
+    whatif.batch([{"circles": [(516500, 6782400, 300)]},
+                  {"polygons": [[(516000, 6782000), (517000, 6782000), (516500, 6783000)]]}])
+"""
+import numpy as np
+
+from tools.cost_grid import CostContour, inside_polygon
+
+
+def _grid(contour):
+    # dict from the response, Contour (tools.results) or CostContour
+    if contour is None or isinstance(contour, CostContour):
+        return contour
+    if isinstance(contour, dict):
+        cost = contour.get("cost")
+        if cost is None or len(cost) == 0: # getContours=0
+            return None
+        return CostContour.from_dict(contour)
+    if contour.cost is None:
+        return None
+    return CostContour.from_contour(contour)
+
+
+# %%
+# *********************************************************************
+class SiteWhatIf:
+    def __init__(self,
+                 cost_a_site=None, # CostASite
+                 cost_n_wells=None, # CostNWells, optional: per-well costs at the new site
+                 chunk=256, # nodes tested per pass
+                 ):
+        self.site = _grid(cost_a_site)
+        self.wells = _grid(cost_n_wells)
+        if self.site is None and self.wells is None:
+            raise ValueError("no cost surface: CostASite or CostNWells (getContours=1) is needed")
+        if self.site is not None:
+            grid, cost = self.site, np.asarray(self.site.cost, dtype=np.float64).ravel()
+        else:
+            grid = self.wells
+            cost = np.asarray(self.wells.cost, dtype=np.float64).reshape(len(self.wells.cost), -1).sum(axis=0)
+        self.grid = grid
+        self.chunk = chunk
+
+        # feasible nodes, cheapest first
+        order = np.flatnonzero(np.isfinite(cost))
+        self.order = order[np.argsort(cost[order], kind="stable")]
+        self.cost = cost[self.order]
+        self.x, self.y = grid.node_xy(self.order)
+        if self.order.size == 0:
+            raise ValueError("no feasible node in the cost surface")
+
+    @property
+    def base(self):
+        """
+        Unrestricted best site: x, y, cost.
+        """
+        return float(self.x[0]), float(self.y[0]), float(self.cost[0])
+
+    def relocate(self,
+                 circles=None, # [(x, y, radius), ...]
+                 polygons=None, # [[(x, y), (x, y), ...], ...]
+                 ):
+        """
+        Best feasible site of one scenario.
+
+        return: dict(x, y, cost, delta, feasible[, well_cost, well_delta])
+        """
+        out = self.batch([{"circles": circles, "polygons": polygons}])
+        return {key: value[0] for key, value in out.items()}
+
+    def batch(self, scenarios): # list of dict(circles=..., polygons=...)
+        """
+        Best feasible site of every scenario.
+
+        return: dict of (S,) arrays
+            x, y, cost: best feasible site (NaN if every node is excluded)
+            delta: cost - unrestricted best cost
+            feasible: bool
+            well_cost, well_delta: (S, n) per-well costs at the site, if CostNWells is given
+        """
+        S = len(scenarios)
+        circles, polygons = _pack(scenarios)
+        best = np.full(S, -1, dtype=np.intp) # position in self.order
+        todo = np.arange(S)
+        for start in range(0, self.order.size, self.chunk):
+            if todo.size == 0: # all found, or no scenario
+                break
+            stop = min(start + self.chunk, self.order.size)
+            row = np.full(S, -1, dtype=np.intp)
+            row[todo] = np.arange(todo.size)
+            excluded = _excluded(self.x[start:stop], self.y[start:stop], row, circles, polygons)
+            ok = ~excluded
+            found = ok.any(axis=1)
+            best[todo[found]] = start + np.argmax(ok[found], axis=1)
+            todo = todo[~found]
+
+        feasible = best >= 0
+        k = np.where(feasible, best, 0)
+        out = {
+            "x": np.where(feasible, self.x[k], np.nan),
+            "y": np.where(feasible, self.y[k], np.nan),
+            "cost": np.where(feasible, self.cost[k], np.nan),
+            "feasible": feasible,
+        }
+        out["delta"] = out["cost"] - self.cost[0]
+        if self.wells is not None:
+            node = self.order[k]
+            wells = np.asarray(self.wells.cost, dtype=np.float64).reshape(len(self.wells.cost), -1)
+            out["well_cost"] = np.where(feasible[:, None], wells[:, node].T, np.nan)
+            out["well_delta"] = out["well_cost"] - wells[:, self.order[0]]
+        return out
+
+
+# %%
+# *********************************************************************
+def _pack(scenarios):
+    """
+    All circles (C, 3) [x, y, r] with their scenario (C,), and all polygons padded
+    to the same number of vertices (G, V, 2) with their scenario (G,).
+    Padding repeats the last vertex, so the extra edges are horizontal (no crossing).
+    """
+    circles = [(s, *c) for s, sc in enumerate(scenarios) for c in (sc.get("circles") or [])]
+    circles = np.array(circles, dtype=np.float64).reshape(-1, 4)
+    polys = [(s, np.asarray(p, dtype=np.float64)) for s, sc in enumerate(scenarios)
+             for p in (sc.get("polygons") or [])]
+    V = max((p.shape[0] for _, p in polys), default=0)
+    P = np.empty((len(polys), V, 2))
+    for g, (_, p) in enumerate(polys):
+        P[g, :p.shape[0]] = p
+        P[g, p.shape[0]:] = p[-1]
+    return (circles[:, 0].astype(np.intp), circles[:, 1:]), \
+           (np.array([s for s, _ in polys], dtype=np.intp), P)
+
+
+def _excluded(x, y, row, circles, polygons):
+    """
+    Excluded nodes (x, y) of the scenarios being solved.
+    row: (S,) row of each scenario in the output, -1 if not being solved
+
+    return: (rows, m) bool
+    """
+    excluded = np.zeros((int(row.max()) + 1, x.size), dtype=bool)
+
+    sid, C = circles
+    keep = row[sid] >= 0
+    if keep.any():
+        C = C[keep]
+        inside = (x[None] - C[:, 0:1])**2 + (y[None] - C[:, 1:2])**2 <= C[:, 2:3]**2
+        np.logical_or.at(excluded, row[sid[keep]], inside)
+
+    sid, P = polygons
+    keep = row[sid] >= 0
+    if keep.any():
+        inside = inside_polygon(x, y, P[keep]) # all polygons, one pass per edge
+        np.logical_or.at(excluded, row[sid[keep]], inside)
+    return excluded
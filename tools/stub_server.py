@@ -0,0 +1,131 @@
+"""
+local stand-in for the WelLayout API server, for testing and benchmarking
+the client side without touching the real (slow) server.
+
+It answers POST /api/v1/get_1well, /api/v1/get_1site and /api/v1/get_ksites
+with a canned response after a fixed delay, i.e., it simulates the server's
+computing time only. Requests are handled in parallel threads, like a server
+with unlimited workers.
+
+With gzip=True, it accepts gzip-compressed request bodies and
+gzip-compresses responses for clients sending "Accept-Encoding: gzip".
+With gzip=False, compressed request bodies are rejected with status 415.
+
+Usage:
+    server = StubServer(delay=0.5).start()
+    output = get_1well(input_data, url=server.url("get_1well"))
+    server.stop()
+"""
+import gzip as gzip_lib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# a minimal successful response, same structure as the real server's response
+default_response = {
+    "status": "success",
+    "data": {
+        "Trajectories": [
+            {"X": [0.0, 0.0], "Y": [0.0, 0.0], "Z": [0.0, -30.0], "MD": [0.0, 30.0],
+             "INCL": [0.0, 0.0], "AZ": [0.0, 0.0], "DLS": [0.0, 0.0], "COST": 30.0}
+            ],
+        "CostASite": None,
+        "CostKSites": None,
+        "CostWells": None,
+        "Contours": None,
+    },
+    "message": "",
+    "error_details": None,
+}
+
+
+class StubServer:
+    def __init__(self,
+                 delay=0.5, # simulated computing time per request (s)
+                 response=None, # dict (or bytes, sent as is), or callable(endpoint, input_data) -> dict/bytes
+                                # or (status code, dict/bytes)
+                 gzip=True, # support gzip request and response bodies
+                 host="127.0.0.1",
+                 port=0, # 0: pick a free port
+                 ):
+        self.delay = delay
+        self.response = default_response if response is None else response
+        self.gzip = gzip
+        self.n_requests = 0 # number of requests received
+        self.requests = [] # request bodies received (dict), for checking
+        self._lock = threading.Lock()
+
+        stub = self
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = self.rfile.read(length)
+                endpoint = self.path.rstrip("/").split("/")[-1]
+                encoding = self.headers.get("Content-Encoding")
+                if encoding:
+                    if not (stub.gzip and encoding == "gzip"):
+                        self._reply(415, {"status": "error", "data": None,
+                                          "message": f"unsupported Content-Encoding {encoding}",
+                                          "error_details": None})
+                        return
+                    body = gzip_lib.decompress(body)
+                try:
+                    input_data = json.loads(body)
+                except ValueError:
+                    self._reply(400, {"status": "error", "data": None,
+                                      "message": "invalid JSON", "error_details": None})
+                    return
+                with stub._lock:
+                    stub.n_requests += 1
+                    stub.requests.append(input_data)
+
+                time.sleep(stub.delay)
+                if callable(stub.response):
+                    content = stub.response(endpoint, input_data)
+                else:
+                    content = stub.response
+                code = 200
+                if isinstance(content, tuple): # (status code, content), e.g. a server error
+                    code, content = content
+                self._reply(code, content)
+
+            def _reply(self, code, content):
+                # bytes are sent as they are, e.g. to test a non-JSON reply
+                raw = isinstance(content, bytes)
+                data = content if raw else json.dumps(content).encode("utf-8")
+                self.send_response(code)
+                self.send_header("Content-Type", "text/plain" if raw else "application/json")
+                if stub.gzip and "gzip" in self.headers.get("Accept-Encoding", ""):
+                    data = gzip_lib.compress(data)
+                    self.send_header("Content-Encoding", "gzip")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args): # keep the console quiet
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = None
+
+    def url(self, endpoint="get_1well"):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/api/v1/{endpoint}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,262 @@
+"""
+lazy survey store: offset well surveys as compact structured arrays.
+
+Survey files name their columns in many ways (X/EAST, INCL/Inclination/...,
+AZ/AZIM_GN/...). The names are resolved once, when a well is read, to
+    X, Y, Z, MD: float64 (coordinates need the precision)
+    INCL, AZ, DLS: float32, NaN if the survey doesn't have the column
+and each well is one structured array of survey_dtype (44 bytes per node, instead of
+one Python float object per value).
+
+Sources:
+    SurveyStore.from_json(path): a survey_data.json file ({"tags": [...],
+        "SURVEY": [{...}, ...]} or a plain list of surveys). The file is scanned
+        once for the byte span of each well (no float parsing); a well is parsed
+        only when it is read, so large files are never fully in memory.
+    SurveyStore.from_surveys(surveys, tags): surveys already in memory
+    SurveyStore.load(path, mmap=1): binary store written by save(path), .npy nodes
+        of all wells + .json (tags, offsets); memory-mapped, nothing is parsed
+Reading:
+    store.well(i or tag): structured array of one well
+    store.array(i or tag): (m, 4~7) [X, Y, Z, MD, (INCL, AZ, DLS)], the format PlotSurvey takes
+    store.nodes(i or tag): (m, 4) [X, Y, Z, MD], the format of Nodes_offset_list
+    for tag, well in store: streams the wells one by one
+
+Usage:
+    store = SurveyStore.from_json("Demos/get_1well/ex2/survey_data.json")
+    store.save("offsets.npy") # once; then SurveyStore.load("offsets.npy")
+    PlotSurvey(store.well("#3"), name="#3")
+"""
+import json
+import os
+import re
+import shutil
+
+import numpy as np
+
+survey_dtype = np.dtype([("X", "<f8"), ("Y", "<f8"), ("Z", "<f8"), ("MD", "<f8"),
+                         ("INCL", "<f4"), ("AZ", "<f4"), ("DLS", "<f4")])
+
+# accepted column names, the first one found is used
+column_aliases = {
+    "X": ("X", "EAST"),
+    "Y": ("Y", "NORTH"),
+    "Z": ("Z", "TVD"),
+    "MD": ("MD",),
+    "INCL": ("INCL", "Inclination", "Incl", "Inc", "incl"),
+    "AZ": ("AZ", "Azimuth", "Az", "AZIM", "Azi", "azi", "AZIM_GN"),
+    "DLS": ("DLS", "dls", "Dls", "dls_deg", "DLS_deg"),
+}
+
+
+def resolve_columns(keys):
+    """
+    {canonical name: column name in the survey} for the columns found in keys.
+    Raises KeyError if X, Y, Z or MD is missing.
+    """
+    names = {}
+    for name, aliases in column_aliases.items():
+        for alias in aliases:
+            if alias in keys:
+                names[name] = alias
+                break
+    missing = [name for name in ("X", "Y", "Z", "MD") if name not in names]
+    if missing:
+        raise KeyError(f"survey has no {missing} column (keys: {list(keys)})")
+    return names
+
+
+def normalize(survey):
+    """
+    Structured array (survey_dtype) from a survey dict / DataFrame with any accepted
+    column names, or from an (m, 4~7) array [X, Y, Z, MD, (INCL, AZ, DLS)].
+    """
+    if isinstance(survey, np.ndarray) and survey.dtype == survey_dtype:
+        return survey
+    if isinstance(survey, np.ndarray) and survey.dtype.names is None:
+        out = np.full(survey.shape[0], np.nan, dtype=survey_dtype)
+        for j, name in enumerate(survey_dtype.names[:survey.shape[1]]):
+            out[name] = survey[:, j]
+        return out
+    keys = survey.dtype.names if isinstance(survey, np.ndarray) else survey.keys()
+    names = resolve_columns(keys)
+    out = np.full(len(survey[names["MD"]]), np.nan, dtype=survey_dtype)
+    for name, alias in names.items():
+        # np.array(..., float): null -> nan
+        out[name] = np.array(survey[alias], dtype=np.float64)
+    return out
+
+
+def survey_array(well):
+    """
+    (m, 4~7) float64 array [X, Y, Z, MD, (INCL, AZ, DLS)] of a structured well,
+    up to the first column that is all NaN (same as Trajectory.array).
+    """
+    cols = [well[name] for name in ("X", "Y", "Z", "MD")]
+    for name in ("INCL", "AZ", "DLS"):
+        if np.isnan(well[name]).all():
+            break
+        cols.append(well[name])
+    return np.column_stack(cols).astype(np.float64)
+
+
+# %%
+# *********************************************************************
+class SurveyStore:
+    def __init__(self, tags, reader, n):
+        self.tags = list(tags)
+        self._reader = reader # i -> structured array
+        self._n = n
+
+    @classmethod
+    def from_surveys(cls, surveys, tags=None):
+        wells = [normalize(s) for s in surveys]
+        tags = _default_tags(tags, len(wells))
+        return cls(tags, wells.__getitem__, len(wells))
+
+    @classmethod
+    def from_json(cls, path, chunk=1 << 20):
+        """
+        Lazy store on a survey JSON file (see the module doc). Only the byte spans
+        of the wells and the tags are read here.
+        """
+        spans, tags = _scan_json(path, chunk=chunk)
+
+        def read(i):
+            start, end = spans[i]
+            with open(path, "rb") as f:
+                f.seek(start)
+                return normalize(json.loads(f.read(end - start)))
+        return cls(_default_tags(tags, len(spans)), read, len(spans))
+
+    @classmethod
+    def load(cls, path, mmap=1): # mmap==1: memory-map the nodes (read only)
+        stem = os.path.splitext(path)[0]
+        with open(stem + ".json") as f:
+            meta = json.load(f)
+        nodes = np.load(stem + ".npy", mmap_mode="r" if mmap == 1 else None)
+        offsets = meta["offsets"]
+        return cls(meta["tags"], lambda i: nodes[offsets[i]:offsets[i + 1]], len(offsets) - 1)
+
+    def save(self, path):
+        """
+        Save all wells to path (.npy nodes, survey_dtype) and the .json next to it
+        (tags, offsets). The wells are written one at a time.
+        """
+        stem = os.path.splitext(path)[0]
+        lengths = [0]
+        # nodes to a raw file first, the .npy header needs the total length
+        with open(stem + ".npy.tmp", "wb") as f:
+            for i in range(len(self)):
+                well = self.well(i)
+                f.write(np.ascontiguousarray(well, dtype=survey_dtype).tobytes())
+                lengths.append(well.shape[0])
+        with open(stem + ".npy", "wb") as f, open(stem + ".npy.tmp", "rb") as raw:
+            np.lib.format.write_array_header_1_0(
+                f, {"descr": np.lib.format.dtype_to_descr(survey_dtype),
+                    "fortran_order": False, "shape": (int(sum(lengths)),)})
+            shutil.copyfileobj(raw, f)
+        os.remove(stem + ".npy.tmp")
+        with open(stem + ".json", "w") as f:
+            json.dump({"tags": self.tags, "offsets": np.cumsum(lengths).tolist()}, f)
+
+    # ==================================================================================
+    def index(self, key): # well index (int) or tag
+        if isinstance(key, (int, np.integer)):
+            if not -self._n <= key < self._n:
+                raise IndexError(f"well {key} out of range [0, {self._n})")
+            return int(key) % self._n
+        try:
+            return self.tags.index(key)
+        except ValueError:
+            raise KeyError(f"no well tagged {key!r}")
+
+    def well(self, key):
+        """
+        Structured array (survey_dtype) of one well, by index or tag.
+        """
+        return self._reader(self.index(key))
+
+    def array(self, key):
+        return survey_array(self.well(key))
+
+    def nodes(self, key):
+        well = self.well(key)
+        return np.column_stack([well["X"], well["Y"], well["Z"], well["MD"]]).astype(np.float64)
+
+    def __iter__(self):
+        for i in range(self._n):
+            yield self.tags[i], self.well(i)
+
+    def __len__(self):
+        return self._n
+
+    def __repr__(self):
+        return f"SurveyStore(wells={self._n})"
+
+
+def _default_tags(tags, n):
+    if tags is None or len(tags) != n:
+        return [f"#{i+1}" for i in range(n)]
+    return [str(tag) for tag in tags]
+
+
+# a complete string, or one cut at the end of the chunk, or a bracket
+_token = re.compile(rb'"(?:[^"\\]|\\.)*(?:"|\\?\Z)|[\[\]{}]')
+
+
+def _scan_json(path, chunk=1 << 20):
+    """
+    Byte spans (start, end) of the surveys in a survey JSON file, and its tags
+    (None if not in the file), from the brackets and strings only.
+    Raises ValueError if the file has no survey list (a dict without "SURVEY").
+    """
+    spans, tags_span = [], None
+    depth, key, start = 0, None, None
+    in_surveys = None # depth of the surveys array
+    carry, base = b"", 0 # unfinished string from the last chunk, its file position
+    with open(path, "rb") as f:
+        while True:
+            data = f.read(chunk)
+            buf = carry + data
+            carry = b""
+            for m in _token.finditer(buf):
+                token = m.group()
+                pos = base + m.start()
+                if token[:1] == b'"':
+                    if data and (len(token) < 2 or not token.endswith(b'"') or token.endswith(b'\\"')
+                                 and m.end() == len(buf)):
+                        carry = buf[m.start():] # finish it with the next chunk
+                        break
+                    if depth == 1:
+                        key = token[1:-1]
+                    continue
+                if token in (b"[", b"{"):
+                    depth += 1
+                    if in_surveys is None and token == b"[" and (depth == 1 or key == b"SURVEY"):
+                        in_surveys = depth
+                    elif in_surveys is not None and depth == in_surveys + 1:
+                        start = pos
+                    elif depth == 2 and key == b"tags" and token == b"[":
+                        tags_span = [pos, None]
+                else:
+                    if in_surveys is not None and depth == in_surveys + 1 and start is not None:
+                        spans.append((start, pos + 1))
+                        start = None
+                    elif depth == in_surveys:
+                        in_surveys = -1 # done, don't match again
+                    elif depth == 2 and tags_span is not None and tags_span[1] is None:
+                        tags_span[1] = pos + 1
+                    depth -= 1
+            if not data:
+                break
+            base += len(buf) - len(carry)
+
+    if in_surveys is None:
+        raise ValueError(f'{path}: no survey list, expected a list or a dict with a "SURVEY" list')
+    tags = None
+    if tags_span is not None and tags_span[1] is not None:
+        with open(path, "rb") as f:
+            f.seek(tags_span[0])
+            tags = json.loads(f.read(tags_span[1] - tags_span[0]))
+    return spans, tags
@@ -0,0 +1,199 @@
+"""
+parameter sweeps over API inputs, with deduplication, concurrency and resume.
+
+A sweep is a base set of input2json arguments and a grid of parameters to vary, e.g.
+    params = {"DLSM": [np.full((1, 2), d) for d in (2.0, 2.5, 3.0)],
+              "resolution": [50, 100],
+              "PKM": [np.array([[x, y, -400.0]]) for x, y in candidates]}
+Every combination (cartesian product) is one point. Identical inputs (same request
+content, see ResponseCache.key) are sent only once. The points run through
+API.get_batch in chunks, and after each chunk the table is saved, so an interrupted
+sweep resumes where it stopped (points already in the table are not sent again).
+
+The results are one columnar table (dict of NumPy arrays, one row per point):
+    <param>: the parameter value, (points,) or (points, ...) for arrays
+    key: request hash, status, error, elapsed
+    cost: sum of the trajectories' COST, md: sum of their total MD,
+    max_dls, max_incl, site_x, site_y (start of the first trajectory), n_traj
+saved as .npz (np.savez), or as Parquet with to_dataframe().to_parquet(...).
+
+Usage:
+    sweep = Sweep(base_kwargs, params, url=url_1well, index=0, path="sweep.npz")
+    table = sweep.run()
+    df = sweep.to_dataframe()
+"""
+import itertools
+import json
+import os
+import time
+
+import numpy as np
+
+from tools.input2json import input2json, to_jsonable
+from tools.response_cache import ResponseCache
+
+summary_columns = ("status", "error", "elapsed", "cost", "md", "max_dls", "max_incl",
+                   "site_x", "site_y", "n_traj")
+
+
+def expand_grid(params):
+    """
+    All combinations of params {name: [values]}, as a list of {name: value}.
+    """
+    names = list(params)
+    return [dict(zip(names, values)) for values in itertools.product(*(params[k] for k in names))]
+
+
+def summarize(content, error=None, elapsed=np.nan):
+    """
+    One table row (dict) from a response content.
+    """
+    row = {"status": "error", "error": error or "", "elapsed": elapsed,
+           "cost": np.nan, "md": np.nan, "max_dls": np.nan, "max_incl": np.nan,
+           "site_x": np.nan, "site_y": np.nan, "n_traj": 0}
+    if content is None:
+        return row
+    row["status"] = content.get("status") or "error"
+    if row["status"] != "success":
+        row["error"] = row["error"] or str(content.get("message") or "")
+    trajectories = (content.get("data") or {}).get("Trajectories") or []
+    if trajectories:
+        def last(t, key):
+            return t[key][-1] if t.get(key) else np.nan
+        def top(key):
+            values = [v for t in trajectories for v in (t.get(key) or []) if v is not None]
+            return float(np.max(values)) if values else np.nan
+        row.update(cost=float(np.nansum([t.get("COST") if t.get("COST") is not None else np.nan
+                                         for t in trajectories])),
+                   md=float(np.nansum([last(t, "MD") for t in trajectories])),
+                   max_dls=top("DLS"), max_incl=top("INCL"),
+                   site_x=trajectories[0]["X"][0], site_y=trajectories[0]["Y"][0],
+                   n_traj=len(trajectories))
+    return row
+
+
+# %%
+# *********************************************************************
+class Sweep:
+    def __init__(self,
+                 base, # dict of input2json arguments (n, PTM, VTM, PKM, VKM, DLSM, ...)
+                 params, # {input2json argument: [values]}, swept as a grid
+                 url=None, # API url, default: API.url_1well
+                 index=None, getContour=0, # for 1well
+                 indices=None, getContours=0, # for 1site & ksites
+                 path="sweep.npz", # table file of this sweep, also used to resume; None: memory only
+                 max_workers=4,
+                 chunk=None, # points sent between two saves, default: 4*max_workers
+                 timeout=300,
+                 cache=None, # ResponseCache, see API.get_batch
+                 compress=None,
+                 ):
+        if url is None:
+            from API import url_1well
+            url = url_1well
+        self.url = url
+        self.request = dict(index=index, getContour=getContour, indices=indices, getContours=getContours)
+        self.path = path
+        self.max_workers = max_workers
+        self.chunk = chunk or 4*max_workers
+        self.timeout, self.cache, self.compress = timeout, cache, compress
+
+        self.params = params
+        self.points = expand_grid(params)
+        self.inputs = {} # key -> input, one per distinct request
+        self.keys = []
+        for point in self.points:
+            input_data = input2json(**{**base, **point}, filepath=None)
+            key = ResponseCache.key(url, {"input": input_data, "other": self.request})
+            self.inputs.setdefault(key, input_data)
+            self.keys.append(key)
+        self.results = {} # key -> summary row
+        if path is not None and os.path.exists(path):
+            self._load(path)
+
+    # ==================================================================================
+    def run(self, retry_failed=0): # 1: send again the points that failed before
+        """
+        Send the points not in the table yet, saving the table after each chunk.
+
+        return: table (dict of arrays)
+        """
+        from API import get_batch
+        todo = [key for key in self.inputs
+                if key not in self.results or (retry_failed == 1 and self.results[key]["status"] != "success")]
+        print(f"{len(self.points)} points, {len(self.inputs)} distinct, {len(todo)} to run")
+        tic = time.time()
+        for start in range(0, len(todo), self.chunk):
+            keys = todo[start:start + self.chunk]
+            outs = get_batch([self.inputs[key] for key in keys], url=self.url,
+                             max_workers=self.max_workers, timeout=self.timeout,
+                             cache=self.cache, compress=self.compress, **self.request)
+            for key, out in zip(keys, outs):
+                self.results[key] = summarize(out["output"], out["error"], out["elapsed"])
+            if self.path is not None:
+                self.save(self.path)
+            print(f"{min(start + self.chunk, len(todo))}/{len(todo)} done, {time.time() - tic:.1f} s")
+        return self.table()
+
+    def table(self):
+        """
+        Columnar table, one row per point (NaN / "pending" for points not run yet).
+        """
+        table = {}
+        for name in self.params:
+            table[name] = _column([point[name] for point in self.points])
+        table["key"] = np.array(self.keys)
+        pending = summarize(None)
+        pending["status"] = "pending"
+        rows = [self.results.get(key, pending) for key in self.keys]
+        for col in summary_columns:
+            values = [row[col] for row in rows]
+            table[col] = np.array(values, dtype=str if isinstance(values[0], str) else np.float64)
+        return table
+
+    def save(self, path):
+        """
+        Save the table as .npz (written to a temporary file first).
+        """
+        tmp = path + ".tmp.npz"
+        np.savez(tmp, **self.table())
+        os.replace(tmp, path)
+
+    def to_dataframe(self):
+        """
+        pandas DataFrame of the table, array parameters split in columns (name[0], name[1], ...).
+        Save it with df.to_parquet(path) (needs pyarrow or fastparquet).
+        """
+        import pandas as pd
+        columns = {}
+        for name, col in self.table().items():
+            if col.ndim == 1:
+                columns[name] = col
+            else:
+                flat = col.reshape(col.shape[0], -1)
+                for j in range(flat.shape[1]):
+                    columns[f"{name}[{j}]"] = flat[:, j]
+        return pd.DataFrame(columns)
+
+    def _load(self, path):
+        with np.load(path) as saved:
+            table = {name: saved[name] for name in saved.files}
+        for r, key in enumerate(table["key"]):
+            if table["status"][r] == "pending":
+                continue
+            self.results[str(key)] = {col: (str(table[col][r]) if table[col].dtype.kind == "U"
+                                            else float(table[col][r])) for col in summary_columns}
+        print(f"resumed: {len(self.results)} distinct points already done in {path}")
+
+
+def _column(values):
+    """
+    Parameter values -> array column: numbers (points,), same-shape arrays (points, ...),
+    anything else as JSON strings.
+    """
+    values = [to_jsonable(v) for v in values]
+    try:
+        col = np.array(values, dtype=np.float64)
+        return col
+    except (TypeError, ValueError):
+        return np.array([json.dumps(v) for v in values])